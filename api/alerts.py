@@ -0,0 +1,243 @@
+"""
+Despachador de alertas por webhook
+Las emociones negativas se encolan sin bloquear el stream; una tarea
+aparte las agrupa, respeta un límite de envíos y reintenta con backoff
+usando una sola sesión HTTP con pool de conexiones
+
+Pruebas con un servidor HTTP local: python -m pytest tests/test_alerts.py
+"""
+
+import asyncio
+import os
+import random
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from detector import metrics
+
+load_dotenv()
+
+# ======================== CONFIGURACIÓN ========================
+
+ALERT_WEBHOOK_URL = os.getenv('ALERT_WEBHOOK_URL', 'http://192.168.100.100:5678/webhook/emotion-alert')
+ALERT_EMOTIONS = [e.strip() for e in os.getenv('ALERT_EMOTIONS', 'Enojo,Tristeza,Miedo').split(',') if e.strip()]
+ALERT_QUEUE_SIZE = int(os.getenv('ALERT_QUEUE_SIZE', 100))
+ALERT_RATE_PER_MINUTE = float(os.getenv('ALERT_RATE_PER_MINUTE', 30))
+ALERT_COALESCE_WINDOW = float(os.getenv('ALERT_COALESCE_WINDOW', 2.0))  # segundos
+ALERT_MAX_RETRIES = int(os.getenv('ALERT_MAX_RETRIES', 3))
+ALERT_TIMEOUT = float(os.getenv('ALERT_TIMEOUT', 2.0))                  # segundos
+
+ALERT_BURST = 5             # envíos seguidos permitidos antes de aplicar el límite
+RETRY_BASE_DELAY = 0.5      # segundos, se duplica en cada reintento
+
+# ======================== LÍMITE DE ENVÍOS ========================
+
+class TokenBucket:
+    """Token bucket: `rate` envíos por segundo con ráfagas de hasta `burst`"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated: Optional[float] = None
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if self._updated is not None:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+# ======================== DESPACHADOR ========================
+
+class AlertDispatcher:
+    """
+    Envía alertas al webhook sin bloquear a quien las genera.
+
+    - submit() no espera: si la cola está llena la alerta se descarta.
+    - Las alertas que llegan juntas (o mientras se espera un turno del
+      límite de envíos) se agrupan en un solo POST.
+    - Los errores de red y las respuestas 5xx se reintentan con backoff
+      exponencial; los 4xx no.
+    """
+
+    def __init__(self, url: str = ALERT_WEBHOOK_URL,
+                 emotions: List[str] = ALERT_EMOTIONS,
+                 queue_size: int = ALERT_QUEUE_SIZE,
+                 rate_per_minute: float = ALERT_RATE_PER_MINUTE,
+                 coalesce_window: float = ALERT_COALESCE_WINDOW,
+                 max_retries: int = ALERT_MAX_RETRIES,
+                 timeout: float = ALERT_TIMEOUT):
+        """
+        Args:
+            url: Webhook destino (vacío = alertas desactivadas)
+            emotions: Emociones que disparan alerta
+            queue_size: Alertas en espera antes de descartar
+            rate_per_minute: Envíos máximos por minuto
+            coalesce_window: Segundos que se esperan para agrupar alertas
+            max_retries: Reintentos por envío
+            timeout: Timeout de cada POST
+        """
+        self.url = url
+        self.emotions = set(emotions)
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._bucket = TokenBucket(rate_per_minute / 60.0, ALERT_BURST)
+        self._task: Optional[asyncio.Task] = None
+
+        # Una sesión reutilizada: conexiones keep-alive entre envíos
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+        self.submitted = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retries = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url)
+
+    def should_alert(self, emotion: str) -> bool:
+        return self.enabled and emotion in self.emotions
+
+    def submit(self, emotion: str, confidence: float, metadata: Optional[Dict] = None) -> bool:
+        """
+        Encola una alerta (llamar desde el event loop)
+
+        Returns:
+            False si se descartó por cola llena o alertas desactivadas
+        """
+        if not self.enabled:
+            return False
+
+        alert = {
+            "emotion": emotion,
+            "confidence": confidence * 100,
+            "timestamp": datetime.now().isoformat()
+        }
+        if metadata:
+            alert.update(metadata)
+
+        try:
+            self._queue.put_nowait(alert)
+            self.submitted += 1
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    def start(self):
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0):
+        """Intenta enviar lo pendiente y detiene la tarea"""
+        if self._task and not self._task.done():
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._session.close()
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'queued': self._queue.qsize(),
+            'submitted': self.submitted,
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'retries': self.retries
+        }
+
+    # ---------- Internos ----------
+
+    async def _run(self):
+        while True:
+            alerts = [await self._queue.get()]
+            try:
+                # Esperar turno y la ventana de agrupación; lo que llegue
+                # mientras tanto viaja en el mismo POST
+                await self._bucket.acquire()
+                await asyncio.sleep(self.coalesce_window)
+                while not self._queue.empty():
+                    alerts.append(self._queue.get_nowait())
+
+                await self._send(self._payload(alerts))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Error enviando webhook: {e}")
+            finally:
+                for _ in alerts:
+                    self._queue.task_done()
+
+    def _payload(self, alerts: List[Dict]) -> Dict:
+        """
+        Una alerta: mismo formato de siempre. Varias: los campos de la
+        más reciente más 'count' y la lista completa en 'alerts'.
+        """
+        if len(alerts) == 1:
+            return alerts[0]
+
+        self.coalesced += len(alerts) - 1
+        payload = dict(alerts[-1])
+        payload['count'] = len(alerts)
+        payload['alerts'] = alerts
+        return payload
+
+    async def _send(self, payload: Dict):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await asyncio.to_thread(self._post, payload)
+                self.sent += 1
+                return
+            except requests.HTTPError as e:
+                # 4xx: reintentar no va a cambiar la respuesta
+                if e.response is not None and e.response.status_code < 500:
+                    self.failed += 1
+                    metrics.WEBHOOK_FAILURES.inc()
+                    print(f"⚠️ Webhook rechazó la alerta: {e}")
+                    return
+                error = e
+            except requests.RequestException as e:
+                error = e
+
+            if attempt < self.max_retries:
+                self.retries += 1
+                delay = RETRY_BASE_DELAY * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+        self.failed += 1
+        metrics.WEBHOOK_FAILURES.inc()
+        print(f"⚠️ Error enviando webhook: {error}")
+
+    def _post(self, payload: Dict):
+        """POST bloqueante (hilo auxiliar)"""
+        response = self._session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
@@ -1,12 +1,16 @@
 """
 Backend API para el Dashboard de Emociones
 FastAPI + WebSocket para streaming en tiempo real
+
+Importar este módulo no carga OpenCV, NumPy ni TensorFlow ni se conecta
+a MongoDB: eso corre en segundo plano al arrancar (ver api/startup.py)
+y su estado se consulta en /api/ready.
 """
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
 from fastapi import Request
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime, timedelta
@@ -14,25 +18,78 @@ import sys
 import os
 import json
 import asyncio
-import cv2
-import numpy as np
-from typing import List
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
 
 # Agregar path para imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from detector.database import EmotionDatabase
+from detector.database import EmotionDatabase, validate_range
+from detector.async_database import AsyncEmotionDatabase
+from detector import metrics
+from api.video_clients import VideoConnectionManager
+from api.alerts import AlertDispatcher
+from api.stats import StatsPublisher, TTLCache
+from api.startup import StartupState
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # ======================== CONFIGURACIÓN ========================
 
+# Cargar el modelo al arrancar (false = con el primer cliente de video)
+MODEL_WARMUP = os.getenv('MODEL_WARMUP', 'true').lower() == 'true'
+
+# ======================== APLICACIÓN ========================
+
+# Componentes que se inician en segundo plano (estado en /api/ready)
+startup = StartupState('database', 'writer', 'model')
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Arranque y cierre de la aplicación
+
+    El arranque no espera a MongoDB ni al modelo: la API responde REST
+    de inmediato y cada componente avisa en /api/ready cuando está listo.
+    """
+    # MongoDB se reintenta con backoff hasta conectar (STARTUP_RETRY_*)
+    startup.start('database', connect_database, retry=True)
+    startup.start('writer', connect_writer, retry=True)
+    if MODEL_WARMUP:
+        startup.start('model', load_model)
+    alert_dispatcher.start()
+    
+    print("\n" + "="*60)
+    print("🚀 DASHBOARD DE EMOCIONES INICIADO")
+    print("="*60)
+    print(f"📊 API disponible en: http://localhost:8000")
+    print(f"🎨 Dashboard disponible en: http://localhost:8000")
+    print(f"📡 WebSocket Video: ws://localhost:8000/ws/video")
+    print(f"📈 WebSocket Data: ws://localhost:8000/ws/data")
+    print(f"🩺 Estado de arranque: http://localhost:8000/api/ready")
+    print("="*60 + "\n")
+    
+    yield
+    
+    await startup.cancel()
+    await stats_publisher.stop()
+    if video_producer:
+        await video_producer.stop()
+        video_producer.shutdown()
+    await alert_dispatcher.stop()
+    if db:
+        db.close()
+    if adb:
+        adb.close()
+    print("\n👋 Dashboard cerrado correctamente\n")
+
 app = FastAPI(
     title="Emotion Detector Dashboard",
     description="Dashboard en tiempo real para detección de emociones con IA",
-    version="2.0"
+    version="2.0",
+    lifespan=lifespan
 )
 
 # CORS (para desarrollo)
@@ -48,8 +105,16 @@ app.add_middleware(
 templates = Jinja2Templates(directory="templates")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Base de datos
-db = EmotionDatabase()
+# Base de datos: escrituras (cola + spool) con pymongo, lecturas con motor.
+# Ambas se crean y conectan al arrancar, en segundo plano.
+db: Optional[EmotionDatabase] = None
+adb: Optional[AsyncEmotionDatabase] = None
+
+# Caché compartido por /ws/data y los endpoints REST
+STATS_CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', 5))
+STATS_RECONCILE_INTERVAL = float(os.getenv('STATS_RECONCILE_INTERVAL', 60))
+CHANGE_STREAM_ENABLED = os.getenv('MONGODB_CHANGE_STREAM', 'auto') != 'off'
+stats_cache = TTLCache(ttl=STATS_CACHE_TTL)
 
 # Lista de conexiones WebSocket activas
 active_connections: List[WebSocket] = []
@@ -65,16 +130,116 @@ class ConnectionManager:
         self.active_connections.append(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        if websocket in self.active_connections:
+            self.active_connections.remove(websocket)
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
+        # Copia de la lista: un envío fallido desconecta al cliente
+        for connection in list(self.active_connections):
             try:
                 await connection.send_json(message)
             except:
-                pass
+                self.disconnect(connection)
 
 manager = ConnectionManager()
+video_manager = VideoConnectionManager()
+
+# Productor único de video: una cámara y un modelo para todos los clientes
+# Alertas por webhook (cola propia, no bloquea el stream)
+alert_dispatcher = AlertDispatcher()
+
+# Se crea cuando el modelo está cargado (api.stream importa OpenCV)
+video_producer = None
+
+def writer_backlog() -> bool:
+    """Emociones aún sin escribir en MongoDB (cola del escritor o spool)"""
+    if db is None:
+        return False
+    stats = db.writer_stats()
+    return bool(stats['pending'] or stats['spool']['bytes'])
+
+# Publicador único de actualizaciones en vivo para /ws/data
+stats_publisher = StatsPublisher(None, stats_cache, manager, interval=STATS_RECONCILE_INTERVAL,
+                                 backlog=writer_backlog)
+
+# Gauges calculados al momento del scrape (sin costo en el camino caliente)
+metrics.INFERENCE_QUEUE_DEPTH.set_function(lambda: video_producer.executor.queue_depth if video_producer else 0)
+metrics.WEBSOCKET_CLIENTS.labels(channel='video').set_function(lambda: len(video_manager.active_connections))
+metrics.WEBSOCKET_CLIENTS.labels(channel='data').set_function(lambda: len(manager.active_connections))
+
+# ======================== ARRANQUE ========================
+
+async def connect_database():
+    """
+    Lecturas (motor). El publicador de /ws/data arranca después del
+    primer ping, aunque falle: sus reconciliaciones se recuperan solas
+    cuando MongoDB vuelve
+    """
+    global adb
+    if adb is None:
+        adb = AsyncEmotionDatabase()  # sin MONGODB_URI falla aquí y se informa en /api/ready
+        stats_publisher.db = adb
+    try:
+        adb.close()  # cliente del intento anterior, si lo hubo
+        await adb.connect()
+    finally:
+        stats_publisher.start()
+
+async def connect_writer():
+    """Escrituras (pymongo, cola + spool); se conecta en un hilo"""
+    global db
+    # Si falla (MongoDB caído) se reintenta desde startup con backoff
+    db = await asyncio.to_thread(EmotionDatabase)
+    
+    # Las escrituras nuevas invalidan el caché de estadísticas
+    loop = asyncio.get_running_loop()
+    db.add_flush_listener(lambda documents: loop.call_soon_threadsafe(stats_cache.invalidate))
+    
+    # Nuevas detecciones → deltas en /ws/data
+    db.events.subscribe(lambda event: loop.call_soon_threadsafe(stats_publisher.on_event, event))
+    if CHANGE_STREAM_ENABLED:
+        db.start_change_stream()
+
+async def load_model():
+    """
+    Importa el pipeline de video (OpenCV, NumPy) y carga el modelo
+    (TensorFlow) con su predicción de calentamiento, fuera del event loop
+    """
+    def load():
+        import api.stream  # OpenCV, NumPy y el pipeline de video
+        from detector.emotion_model import get_engine
+        get_engine().load()
+    
+    await asyncio.to_thread(load)
+
+async def get_video_producer():
+    """
+    Productor de video, creado con el primer cliente
+
+    Si el modelo aún carga, el cliente espera a esa misma carga.
+
+    Returns:
+        El productor, o None si el modelo o MongoDB no pudieron iniciarse
+    """
+    global video_producer
+    startup.start('model', load_model)
+    if not await startup.wait('model') or not await startup.wait('writer'):
+        return None
+    
+    if video_producer is None:
+        from api.stream import VideoStreamProducer
+        video_producer = VideoStreamProducer(db, video_manager, alert_dispatcher)
+    return video_producer
+
+def database_unavailable() -> Optional[dict]:
+    """
+    Respuesta de error mientras las lecturas de MongoDB no están listas
+    (en lugar de datos vacíos con success: True)
+    """
+    if startup.is_ready('database'):
+        return None
+    info = startup.stats()['database']
+    return {"success": False, "error": f"MongoDB no disponible: {info.get('error', info['status'])}"}
 
 # ======================== RUTAS HTML ========================
 
@@ -88,8 +253,11 @@ async def dashboard(request: Request):
 @app.get("/api/emotions/recent")
 async def get_recent_emotions(limit: int = 50):
     """Obtiene las emociones más recientes"""
+    error = database_unavailable()
+    if error:
+        return error
     try:
-        emotions = db.get_recent_emotions(limit=limit)
+        emotions = await stats_publisher.get_recent(limit=limit)
         return {"success": True, "data": emotions, "count": len(emotions)}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -97,8 +265,11 @@ async def get_recent_emotions(limit: int = 50):
 @app.get("/api/emotions/stats")
 async def get_emotion_stats(hours: int = 24):
     """Obtiene estadísticas de emociones"""
+    error = database_unavailable()
+    if error:
+        return error
     try:
-        stats = db.get_emotion_stats(hours=hours)
+        stats = await stats_publisher.get_stats(hours=hours)
         return {"success": True, "data": stats}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -106,11 +277,15 @@ async def get_emotion_stats(hours: int = 24):
 @app.get("/api/emotions/hourly")
 async def get_hourly_distribution(date: str = None):
     """Obtiene distribución horaria de emociones"""
+    error = database_unavailable()
+    if error:
+        return error
     try:
         if not date:
             date = datetime.now().strftime('%Y-%m-%d')
         
-        hourly = db.get_hourly_distribution(date=date)
+        hourly = await stats_cache.get(('hourly', date),
+                                       lambda: adb.get_hourly_distribution(date=date))
         return {"success": True, "data": hourly, "date": date}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -118,8 +293,11 @@ async def get_hourly_distribution(date: str = None):
 @app.get("/api/emotions/by-date")
 async def get_emotions_by_date(date: str):
     """Obtiene todas las emociones de una fecha específica"""
+    error = database_unavailable()
+    if error:
+        return error
     try:
-        emotions = db.get_emotions_by_date(date=date)
+        emotions = await adb.get_emotions_by_date(date=date)
         return {"success": True, "data": emotions, "count": len(emotions)}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -127,37 +305,97 @@ async def get_emotions_by_date(date: str):
 @app.get("/api/emotions/weekly")
 async def get_weekly_stats():
     """Obtiene estadísticas de la última semana"""
+    error = database_unavailable()
+    if error:
+        return error
     try:
-        # Obtener datos de los últimos 7 días
-        weekly_data = {}
+        # Una sola agregación para los últimos 7 días
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        summary = await adb.get_range_summary(
+            start=today - timedelta(days=6),
+            end=today + timedelta(days=1),
+            granularity='day'
+        )
         
+        # Del día más reciente al más antiguo
+        weekly_data = {}
         for i in range(7):
-            date = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
-            emotions = db.get_emotions_by_date(date)
-            
-            # Contar emociones por día
-            emotion_counts = {}
-            for emotion_doc in emotions:
-                emotion = emotion_doc['emotion']
-                emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-            
-            weekly_data[date] = {
-                'total': len(emotions),
-                'emotions': emotion_counts
-            }
+            date = (today - timedelta(days=i)).strftime('%Y-%m-%d')
+            weekly_data[date] = summary.get(date, {'total': 0, 'emotions': {}})
         
         return {"success": True, "data": weekly_data}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+@app.get("/api/emotions/range")
+async def get_range_summary(start: str, end: str, granularity: str = 'day'):
+    """
+    Resumen de emociones entre dos fechas 'YYYY-MM-DD' (ambas inclusive)
+    agrupado por 'day' o 'hour'; el rango máximo depende de la granularidad
+    """
+    try:
+        start_date = datetime.strptime(start, '%Y-%m-%d')
+        end_date = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)
+        validate_range(start_date, end_date, granularity)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+    
+    error = database_unavailable()
+    if error:
+        return error
+    try:
+        summary = await adb.get_range_summary(start_date, end_date, granularity)
+        return {"success": True, "data": summary, "granularity": granularity}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@app.get("/api/stream/stats")
+async def get_stream_stats():
+    """Estado del productor de video: cola de inferencia y frames descartados"""
+    data = video_producer.stats() if video_producer else {'running': False}
+    data['stats_cache'] = stats_cache.stats()
+    data['live_updates'] = stats_publisher.stats()
+    data['alerts'] = alert_dispatcher.stats()
+    return {"success": True, "data": data}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Métricas en formato Prometheus"""
+    exposition = metrics.render()
+    if exposition is None:
+        return PlainTextResponse("prometheus_client no está instalado\n", status_code=503)
+    body, content_type = exposition
+    return Response(content=body, media_type=content_type)
+
+@app.get("/api/ready")
+async def readiness():
+    """
+    Estado del arranque: MongoDB (lecturas y escrituras) y modelo
+
+    Responde 503 mientras algún componente no esté listo. Con
+    MODEL_WARMUP=false el modelo no cuenta (se carga con el primer video).
+    """
+    required = ('database', 'writer', 'model') if MODEL_WARMUP else ('database', 'writer')
+    ready = startup.is_ready(*required)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "components": startup.stats(),
+            "timestamp": datetime.now().isoformat()
+        }
+    )
+
 @app.get("/api/health")
 async def health_check():
     """Verifica el estado de la API y MongoDB"""
     try:
-        db_status = db.test_connection()
+        db_status = await adb.test_connection() if adb else False
         return {
             "status": "healthy" if db_status else "degraded",
             "database": "connected" if db_status else "disconnected",
+            "writer": db.writer_stats() if db else None,
+            "pool": adb.pool_stats() if adb else None,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -170,178 +408,65 @@ async def health_check():
 # ======================== WEBSOCKET PARA VIDEO ========================
 
 @app.websocket("/ws/video")
-async def websocket_video_endpoint(websocket: WebSocket):
-    """WebSocket para streaming de video en tiempo real"""
-    await manager.connect(websocket)
+async def websocket_video_endpoint(websocket: WebSocket, format: str = "binary"):
+    """
+    WebSocket para streaming de video en tiempo real
+    
+    Usa /ws/video?format=json para el protocolo legacy (hex en JSON).
+    Cada cliente recibe el frame más reciente con calidad, resolución y
+    FPS ajustados a su latencia de envío (api/video_clients.py).
+    """
+    await video_manager.connect(websocket, binary=(format != "json"))
+    
+    producer = await get_video_producer()
+    if producer is None:
+        video_manager.disconnect(websocket)
+        await websocket.close(code=1011, reason="Modelo o base de datos no disponibles")
+        return
+    producer.start()
     
-    # Cargar modelo DeepFace
     try:
-        from deepface import DeepFace
-        
-        # Inicializar cámara
-        cap = cv2.VideoCapture(0)
-        face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
-        
-        frame_count = 0
-        last_emotion = None
-        session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        emotion_map = {
-            'angry': 'Enojo',
-            'disgust': 'Asco',
-            'fear': 'Miedo',
-            'happy': 'Felicidad',
-            'sad': 'Tristeza',
-            'surprise': 'Sorpresa',
-            'neutral': 'Neutral'
-        }
-        
-        try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                frame_count += 1
-                
-                # Reducir resolución para mejor performance
-                frame = cv2.resize(frame, (640, 480))
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                
-                # Detectar rostros
-                faces = face_cascade.detectMultiScale(gray, 1.3, 5, minSize=(30, 30))
-                
-                emotion_data = None
-                
-                if len(faces) > 0 and frame_count % 15 == 0:  # Cada 15 frames
-                    largest_face = max(faces, key=lambda face: face[2] * face[3])
-                    x, y, w, h = largest_face
-                    
-                    face_roi = gray[y:y+h, x:x+w]
-                    face_roi_rgb = cv2.cvtColor(face_roi, cv2.COLOR_GRAY2RGB)
-                    face_roi_rgb = cv2.resize(face_roi_rgb, (48, 48))
-                    
-                    try:
-                        result = DeepFace.analyze(
-                            face_roi_rgb,
-                            actions=['emotion'],
-                            enforce_detection=False,
-                            silent=True
-                        )
-                        
-                        if isinstance(result, list):
-                            result = result[0]
-                        
-                        emotion_dict = result['emotion']
-                        dominant_emotion_en = result['dominant_emotion']
-                        emotion_es = emotion_map.get(dominant_emotion_en, 'Neutral')
-                        confidence = emotion_dict[dominant_emotion_en] / 100.0
-                        
-                        if emotion_es != last_emotion and confidence > 0.5:
-                            # Guardar en MongoDB
-                            all_emotions = {
-                                emotion_map.get(k, k): v/100.0 
-                                for k, v in emotion_dict.items()
-                            }
-                            
-                            metadata = {
-                                'session_id': session_id,
-                                'all_emotions': all_emotions,
-                                'source': 'dashboard_stream'
-                            }
-                            
-                            db.insert_emotion(emotion_es, confidence, metadata)
-                             # 🔔 Enviar alerta a n8n si es emoción negativa
-                            if emotion_es in ['Enojo', 'Tristeza', 'Miedo']:
-                                try:
-                                    import requests
-                                    webhook_url = "http://192.168.100.100:5678/webhook/emotion-alert"
-                                    payload = {
-                                        "emotion": emotion_es,
-                                        "confidence": confidence * 100,
-                                        "timestamp": datetime.now().isoformat()
-                                    }
-                                    
-                                    requests.post(webhook_url, json=payload, timeout=2)
-                                except Exception as e:
-                                    print(f"⚠️ Error enviando webhook: {e}")
-                            
-                            emotion_data = {
-                                'emotion': emotion_es,
-                                'confidence': confidence,
-                                'all_emotions': all_emotions
-                            }
-                            
-                            last_emotion = emotion_es
-                    
-                    except Exception as e:
-                        print(f"Error en detección: {e}")
-                
-                # Codificar frame a JPEG
-                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-                frame_base64 = buffer.tobytes()
-                
-                # Enviar frame y datos de emoción
-                await websocket.send_json({
-                    'type': 'frame',
-                    'frame': frame_base64.hex(),
-                    'emotion': emotion_data
-                })
-                
-                await asyncio.sleep(0.033)  # ~30 FPS
-                
-        except WebSocketDisconnect:
-            manager.disconnect(websocket)
-        finally:
-            cap.release()
-            
+        # El productor envía los frames; aquí solo esperamos la desconexión
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
         print(f"Error en WebSocket: {e}")
-        manager.disconnect(websocket)
+    finally:
+        # El productor se detiene solo cuando no quedan suscriptores
+        video_manager.disconnect(websocket)
 
 # ======================== WEBSOCKET PARA DATOS ========================
 
 @app.websocket("/ws/data")
 async def websocket_data_endpoint(websocket: WebSocket):
-    """WebSocket para actualizar datos en tiempo real"""
+    """
+    WebSocket para actualizar datos en tiempo real
+    
+    Al conectar se envía un snapshot completo; después el StatsPublisher
+    difunde deltas. El cliente puede enviar {"type": "resync"} para
+    recibir otro snapshot (p. ej. si detecta un salto en 'seq').
+    """
     await manager.connect(websocket)
     
     try:
+        await stats_publisher.send_snapshot(websocket)
+        
         while True:
-            # Enviar estadísticas actualizadas cada 5 segundos
-            stats = db.get_emotion_stats(hours=24)
-            await websocket.send_json({
-                'type': 'stats_update',
-                'data': stats
-            })
-            
-            await asyncio.sleep(5)
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+            except ValueError:
+                continue
+            if isinstance(message, dict) and message.get('type') == 'resync':
+                await stats_publisher.send_snapshot(websocket)
             
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
-# ======================== STARTUP/SHUTDOWN ========================
-
-@app.on_event("startup")
-async def startup_event():
-    """Evento al iniciar la aplicación"""
-    print("\n" + "="*60)
-    print("🚀 DASHBOARD DE EMOCIONES INICIADO")
-    print("="*60)
-    print(f"📊 API disponible en: http://localhost:8000")
-    print(f"🎨 Dashboard disponible en: http://localhost:8000")
-    print(f"📡 WebSocket Video: ws://localhost:8000/ws/video")
-    print(f"📈 WebSocket Data: ws://localhost:8000/ws/data")
-    print("="*60 + "\n")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Evento al cerrar la aplicación"""
-    db.close()
-    print("\n👋 Dashboard cerrado correctamente\n")
-
 if __name__ == "__main__":
     import uvicorn
     
@@ -0,0 +1,117 @@
+"""
+Arranque en segundo plano de la API
+La API acepta peticiones REST apenas se importa; la conexión a MongoDB
+y la carga del modelo (OpenCV + TensorFlow) corren después como tareas
+y su estado se consulta en /api/ready
+"""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ======================== ESTADO ========================
+
+PENDING = 'pending'
+LOADING = 'loading'
+READY = 'ready'
+ERROR = 'error'
+
+STARTUP_RETRY_DELAY = float(os.getenv('STARTUP_RETRY_DELAY', 2.0))       # primer reintento (segundos)
+STARTUP_RETRY_MAX_DELAY = float(os.getenv('STARTUP_RETRY_MAX_DELAY', 60.0))
+
+
+class StartupState:
+    """
+    Estado de cada componente que se inicia en segundo plano.
+
+    Cada componente pasa por pending → loading → ready (o error) y
+    guarda cuánto tardó desde que arrancó la aplicación. wait() permite
+    que quien lo necesite (p. ej. el primer cliente de video) espere a
+    que termine de cargar en lugar de cargarlo otra vez.
+
+    Un componente que falla queda en error (wait() devuelve False) y,
+    con retry, se vuelve a intentar con backoff exponencial hasta
+    `max_delay`. Sin retry, start() lo relanza al volver a llamarse.
+    """
+
+    def __init__(self, *components: str, retry_delay: float = STARTUP_RETRY_DELAY,
+                 max_delay: float = STARTUP_RETRY_MAX_DELAY):
+        self.started = time.monotonic()
+        self.retry_delay = retry_delay
+        self.max_delay = max_delay
+        self._components = {name: {'status': PENDING, 'attempts': 0} for name in components}
+        self._done = {name: asyncio.Event() for name in components}
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def start(self, name: str, load: Callable[[], Awaitable], retry: bool = False):
+        """
+        Lanza la carga de un componente sin esperarla
+
+        No hace nada si ya está listo o si su carga (o su espera para
+        reintentar) sigue en curso; desde error vuelve a intentar.
+        """
+        info = self._components[name]
+        task = self._running.get(name)
+        busy = task and not task.done() and (info['status'] == LOADING or 'retry_in' in info)
+        if info['status'] == READY or busy:
+            return
+        info['status'] = LOADING
+        self._done[name].clear()
+        self._running[name] = asyncio.create_task(self._run(name, load, retry))
+
+    async def wait(self, name: str) -> bool:
+        """Espera a que el componente termine; True si quedó listo"""
+        await self._done[name].wait()
+        return self.is_ready(name)
+
+    def is_ready(self, *names: str) -> bool:
+        names = names or tuple(self._components)
+        return all(self._components[name]['status'] == READY for name in names)
+
+    async def cancel(self):
+        """Cancela las cargas y reintentos en curso (al cerrar la aplicación)"""
+        tasks = [task for task in self._running.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        return {name: dict(info) for name, info in self._components.items()}
+
+    # ---------- Internos ----------
+
+    async def _run(self, name: str, load: Callable[[], Awaitable], retry: bool):
+        info = self._components[name]
+        while True:
+            info['status'] = LOADING
+            info.pop('retry_in', None)
+            info['attempts'] += 1
+            self._done[name].clear()
+            start = time.monotonic()
+            try:
+                await load()
+                info['status'] = READY
+                info.pop('error', None)
+                print(f"✅ {name} listo en {time.monotonic() - start:.2f}s")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                info['status'] = ERROR
+                info['error'] = str(e)
+                print(f"❌ Error iniciando {name}: {e}")
+            finally:
+                info['seconds'] = round(time.monotonic() - start, 3)
+                info['ready_at'] = round(time.monotonic() - self.started, 3)
+                self._done[name].set()
+
+            if info['status'] == READY or not retry:
+                return
+            delay = min(self.retry_delay * 2 ** (info['attempts'] - 1), self.max_delay)
+            info['retry_in'] = delay
+            print(f"🔄 Reintentando {name} en {delay:.1f}s")
+            await asyncio.sleep(delay)
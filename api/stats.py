@@ -0,0 +1,325 @@
+"""
+Caché de estadísticas y publicador compartido
+Una sola tarea mantiene las estadísticas en vivo y envía deltas a todos
+los clientes de /ws/data; los endpoints REST leen el mismo caché
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+# ======================== CACHÉ ========================
+
+class TTLCache:
+    """
+    Caché con expiración por clave de consulta.
+
+    Las funciones de cálculo retornan un awaitable (AsyncEmotionDatabase).
+    Si varias peticiones piden la misma clave vencida a la vez, solo una
+    consulta MongoDB y el resto espera su resultado. La consulta corre en
+    su propia tarea: si la petición que la lanzó se cancela (cliente que
+    se desconecta), las demás reciben igual el resultado.
+    """
+
+    MAX_ENTRIES = 256   # claves guardadas (dependen de parámetros del cliente)
+
+    def __init__(self, ttl: float, max_entries: int = MAX_ENTRIES):
+        """
+        Args:
+            ttl: Segundos de validez de cada entrada
+            max_entries: Máximo de claves; al insertar se descartan las
+                vencidas y, si no alcanza, las más antiguas
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, tuple] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable]):
+        """
+        Retorna el valor en caché o lo calcula
+
+        Args:
+            key: Clave de la consulta (p. ej. ('stats', 24))
+            compute: Función que retorna la consulta a MongoDB (awaitable)
+        """
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            # Otra petición ya está calculando esta clave
+            self.hits += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(self._compute(key, compute))
+            # Evita el aviso si todos los que esperaban se cancelaron
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._inflight[key] = task
+
+        # shield: cancelar esta petición no cancela la consulta compartida
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: Hashable, compute: Callable[[], Awaitable]):
+        generation = self._generation
+        try:
+            value = await compute()
+        finally:
+            self._inflight.pop(key, None)
+
+        # Si hubo una invalidación mientras se calculaba, no guardar
+        if generation == self._generation:
+            self._store(key, value)
+        return value
+
+    def _store(self, key: Hashable, value):
+        now = time.monotonic()
+        self._entries.pop(key, None)
+        if len(self._entries) >= self.max_entries:
+            for expired in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+                del self._entries[expired]
+        while len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = (now + self.ttl, value)
+
+    def invalidate(self):
+        """Descarta todas las entradas (llamar desde el event loop)"""
+        self._entries.clear()
+        self._generation += 1
+
+    def stats(self) -> Dict:
+        return {
+            'ttl': self.ttl,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+# ======================== PUBLICADOR ========================
+
+class StatsPublisher:
+    """
+    Publicador único de actualizaciones en vivo para /ws/data.
+
+    - Al conectar (o al pedir resync) el cliente recibe un snapshot
+      completo: estadísticas de 24h y detecciones recientes.
+    - Cada detección nueva llega por el bus de eventos y actualiza los
+      contadores en memoria; se envían mensajes 'delta' pequeños con
+      los eventos nuevos y los contadores que cambiaron.
+    - Las ráfagas se agrupan: como máximo un delta cada COALESCE_WINDOW.
+    - Cada `interval` segundos se comparan los contadores con MongoDB
+      (ventana de 24h que avanza, detecciones de otros procesos) y las
+      diferencias se envían también como delta. Mientras el escritor
+      tenga emociones sin escribir, ningún contador baja por eso.
+    - El bus ya descarta los eventos repetidos (mismo _id).
+    """
+
+    PERIOD_HOURS = 24
+    COALESCE_WINDOW = 0.25   # segundos
+
+    def __init__(self, db, cache: TTLCache, manager, interval: float = 60.0,
+                 recent_limit: int = 10, backlog: Optional[Callable[[], bool]] = None):
+        """
+        Args:
+            interval: Segundos entre reconciliaciones con MongoDB
+            recent_limit: Detecciones recientes en el snapshot
+            backlog: True si hay emociones contadas en vivo que aún no
+                están en MongoDB (cola del escritor o spool)
+        """
+        self.db = db
+        self.cache = cache
+        self.manager = manager
+        self.interval = interval
+        self.recent_limit = recent_limit
+        self.backlog = backlog
+
+        self._task: Optional[asyncio.Task] = None
+        self._counters: Dict[str, Dict] = {}   # emoción -> {count, confidence_sum}
+        self._recent = deque(maxlen=recent_limit)
+        self._pending_events = []
+        self._changed = set()
+        self._flush_handle = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._seq = 0
+
+        self.deltas_sent = 0
+        self.snapshots_sent = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._flush_handle:
+            self._flush_handle.cancel()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def get_stats(self, hours: int = 24) -> Dict:
+        return await self.cache.get(('stats', hours),
+                                    lambda: self.db.get_emotion_stats(hours=hours))
+
+    async def get_recent(self, limit: int = 50):
+        return await self.cache.get(('recent', limit),
+                                    lambda: self.db.get_recent_emotions(limit=limit))
+
+    # ---------- Snapshot ----------
+
+    def _stats_message(self) -> Dict:
+        """Contadores en memoria con el formato de get_emotion_stats"""
+        emotions = {
+            emotion: self._format_counter(acc)
+            for emotion, acc in sorted(self._counters.items(),
+                                       key=lambda item: item[1]['count'], reverse=True)
+            if acc['count'] > 0
+        }
+        return {
+            'period_hours': self.PERIOD_HOURS,
+            'total_detections': sum(acc['count'] for acc in self._counters.values()),
+            'emotions': emotions,
+            'dominant_emotion': next(iter(emotions), None)
+        }
+
+    def snapshot(self) -> Dict:
+        """Mensaje con el estado completo actual"""
+        return {
+            'type': 'snapshot',
+            'seq': self._seq,
+            'stats': self._stats_message(),
+            'recent': list(self._recent)
+        }
+
+    async def send_snapshot(self, websocket):
+        """Snapshot para un solo cliente (al conectar o en resync)"""
+        await websocket.send_json(self.snapshot())
+        self.snapshots_sent += 1
+
+    # ---------- Eventos ----------
+
+    def on_event(self, event: Dict):
+        """Recibe un evento del bus (llamar desde el event loop)"""
+        if event.get('type') != 'emotion':
+            return
+
+        document = event['document']
+        acc = self._counters.setdefault(document['emotion'], {'count': 0, 'confidence_sum': 0.0})
+        acc['count'] += 1
+        acc['confidence_sum'] += document['confidence']
+        self._changed.add(document['emotion'])
+
+        self._recent.appendleft(document)
+        self._pending_events.append(document)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.COALESCE_WINDOW, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        """Envía un delta con todo lo acumulado desde el último"""
+        self._flush_handle = None
+        if not self._pending_events and not self._changed:
+            return
+
+        self._seq += 1
+        message = {
+            'type': 'delta',
+            'seq': self._seq,
+            'events': self._pending_events,
+            'counters': {
+                emotion: self._format_counter(self._counters.get(emotion))
+                for emotion in self._changed
+            },
+            'total_detections': sum(acc['count'] for acc in self._counters.values()),
+            'dominant_emotion': self._stats_message()['dominant_emotion']
+        }
+        self._pending_events = []
+        self._changed = set()
+
+        if self.manager.active_connections:
+            await self.manager.broadcast(message)
+            self.deltas_sent += 1
+
+    @staticmethod
+    def _format_counter(acc: Optional[Dict]) -> Dict:
+        if not acc or acc['count'] == 0:
+            return {'count': 0, 'avg_confidence': 0.0}
+        return {
+            'count': acc['count'],
+            'avg_confidence': round(acc['confidence_sum'] / acc['count'], 3)
+        }
+
+    # ---------- Reconciliación ----------
+
+    async def reconcile(self):
+        """
+        Ajusta los contadores en memoria a lo que dice MongoDB
+
+        Si una lectura falla la excepción sube (_run la informa) y los
+        contadores en vivo quedan como estaban.
+        """
+        stats = await self.get_stats(hours=self.PERIOD_HOURS)
+        recent = await self.get_recent(limit=self.recent_limit)
+
+        fresh = {
+            emotion: {
+                'count': data['count'],
+                'confidence_sum': data['avg_confidence'] * data['count']
+            }
+            for emotion, data in (stats.get('emotions') or {}).items()
+        }
+
+        # El snapshot aún no incluye lo pendiente de escribir: el mayor gana
+        if self.backlog and self.backlog():
+            for emotion, acc in self._counters.items():
+                if acc['count'] > fresh.get(emotion, {}).get('count', 0):
+                    fresh[emotion] = dict(acc)
+
+        for emotion in set(fresh) | set(self._counters):
+            old = self._counters.get(emotion, {}).get('count', 0)
+            new = fresh.get(emotion, {}).get('count', 0)
+            if old != new:
+                self._changed.add(emotion)
+
+        self._counters = fresh
+        self._recent = deque(jsonable_encoder(recent), maxlen=self.recent_limit)
+
+        if self._changed:
+            await self._flush()
+
+    def stats(self) -> Dict:
+        return {
+            'seq': self._seq,
+            'deltas_sent': self.deltas_sent,
+            'snapshots_sent': self.snapshots_sent,
+            'pending_events': len(self._pending_events)
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Error reconciliando estadísticas: {e}")
+
+            await asyncio.sleep(self.interval)
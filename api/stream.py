@@ -0,0 +1,319 @@
+"""
+Productor de video compartido para el Dashboard
+Una sola tarea captura la cámara, detecta rostros e infiere emociones,
+y entrega los frames a los clientes de /ws/video (cada uno con su
+slot y su nivel de calidad, ver api/video_clients.py)
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import cv2
+
+from detector import metrics
+from detector.capture import VideoSource, open_capture, parse_sources
+from detector.emotion_model import get_engine
+from detector.face_detection import FaceDetectionPipeline
+from detector.face_detectors import create_face_detector
+from detector.inference import InferenceExecutor, FrameDropped
+from detector.scheduler import InferenceScheduler
+from detector.tracking import FaceTracker
+from api.video_clients import QUALITY_TIERS, EncodedFrame
+
+# ======================== CONFIGURACIÓN ========================
+
+FRAME_INTERVAL = 0.033  # ~30 FPS
+DISPLAY_SIZE = (640, 480)  # Resolución máxima del video enviado al dashboard
+
+# Ejecutor de inferencia acotado
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', 1))
+INFERENCE_QUEUE_SIZE = int(os.getenv('INFERENCE_QUEUE_SIZE', 2))
+
+# ======================== CODIFICACIÓN ========================
+
+def encode_tiers(frame, tiers: Iterable[int]) -> Dict[int, EncodedFrame]:
+    """
+    Codifica el frame una vez por nivel pedido (hilo de captura)
+
+    Los niveles con la misma resolución comparten el redimensionado.
+    """
+    resized = {}
+    encoded = {}
+    for index in sorted(set(tiers)):
+        tier = QUALITY_TIERS[index]
+        height, width = frame.shape[:2]
+        if tier.size not in resized:
+            resized[tier.size] = frame if (width, height) == tier.size else \
+                cv2.resize(frame, tier.size, interpolation=cv2.INTER_AREA)
+
+        with metrics.timer(metrics.STAGE['encode']):
+            _, buffer = cv2.imencode('.jpg', resized[tier.size], [cv2.IMWRITE_JPEG_QUALITY, tier.quality])
+        encoded[index] = EncodedFrame(buffer.tobytes(), tier.size)
+    return encoded
+
+# ======================== PRODUCTOR ========================
+
+class VideoStreamProducer:
+    """
+    Dueño único de la cámara y del modelo.
+
+    Se inicia con el primer suscriptor de video y se detiene (liberando
+    la cámara) cuando ya no queda ninguno. Cada frame se procesa una
+    sola vez y se codifica una vez por nivel de calidad que algún
+    cliente necesite en ese momento; si a ningún cliente le toca un
+    frame (todos limitados por sus FPS) no se codifica.
+
+    Nada bloqueante corre en el event loop: captura, detección y
+    codificación van a un hilo dedicado, la inferencia a un ejecutor
+    acotado y MongoDB/webhook a hilos auxiliares.
+    """
+
+    def __init__(self, db, manager, alerts, source: Optional[VideoSource] = None):
+        self.db = db
+        self.manager = manager
+        self.alerts = alerts
+        # Primera fuente de CAMERA_SOURCES (o CAMERA_INDEX)
+        self.source = source or parse_sources()[0]
+        self._task: Optional[asyncio.Task] = None
+        self._tasks = set()
+
+        # Un solo hilo para la cámara: VideoCapture no es thread-safe
+        self._capture_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='capture')
+        self.executor = InferenceExecutor(max_workers=INFERENCE_WORKERS,
+                                          max_queue=INFERENCE_QUEUE_SIZE)
+
+        self.frames_captured = 0
+        self.frames_encoded = 0
+        self.encodes_skipped = 0
+        self.pipeline: Optional[FaceDetectionPipeline] = None
+        self.tracker: Optional[FaceTracker] = None
+        self.scheduler: Optional[InferenceScheduler] = None
+        self._last_emotions = {}  # Última emoción registrada por track_id
+        self._pending_emotion = None
+        self._session_id = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Inicia la tarea productora si no está corriendo"""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Detiene la tarea productora y libera la cámara"""
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def shutdown(self):
+        """Libera los hilos del productor (al cerrar la aplicación)"""
+        self.executor.shutdown()
+        self._capture_pool.shutdown(wait=False)
+
+    def stats(self) -> Dict:
+        """Estado del productor y del ejecutor de inferencia"""
+        return {
+            'running': self.running,
+            'source': self.source.source_id,
+            'subscribers': len(self.manager.active_connections),
+            'frames_captured': self.frames_captured,
+            'frames_encoded': self.frames_encoded,
+            'encodes_skipped': self.encodes_skipped,
+            'clients': self.manager.stats(),
+            'detection': self.pipeline.stats() if self.pipeline else None,
+            'tracking': self.tracker.stats() if self.tracker else None,
+            'scheduler': self.scheduler.stats() if self.scheduler else None,
+            'inference': self.executor.stats()
+        }
+
+    # ---------- Trabajo en hilos ----------
+
+    @staticmethod
+    def _capture(cap, tracker: FaceTracker):
+        """
+        Lee, detecta o sigue rostros y reduce para mostrar (hilo de captura)
+
+        Los rostros se detectan y recortan a resolución nativa (el
+        pipeline reduce internamente); solo el video enviado se reduce.
+
+        Returns:
+            (frame para mostrar, gris nativo, tracks nativos, (ancho, alto) nativos)
+        """
+        with metrics.timer(metrics.STAGE['capture']):
+            ret, frame = cap.read()
+        if not ret:
+            return None, None, [], None
+
+        with metrics.timer(metrics.STAGE['detect']):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+            # Rostros con track_id, de izquierda a derecha
+            tracks = tracker.update(gray, frame)
+
+        height, width = frame.shape[:2]
+        if (width, height) != DISPLAY_SIZE:
+            frame = cv2.resize(frame, DISPLAY_SIZE, interpolation=cv2.INTER_AREA)
+        return frame, gray, tracks, (width, height)
+
+    @staticmethod
+    def _classify(engine, face_rois):
+        """Clasifica y mide la duración (hilo de inferencia)"""
+        start = time.perf_counter()
+        results = engine.classify(face_rois)
+        duration = time.perf_counter() - start
+        metrics.STAGE['infer'].observe(duration)
+        return results, duration
+
+    # ---------- Corrutinas ----------
+
+    async def _handle_inference(self, future: asyncio.Future, tracks, frame_size):
+        """
+        Espera el resultado de la inferencia y registra cada rostro
+
+        Las cajas quedan en coordenadas del frame nativo junto con
+        `frame_size`; cada cliente las recibe escaladas a la resolución
+        de su nivel (ver api/video_clients.py).
+        """
+        try:
+            results, duration = await future
+        except FrameDropped:
+            return
+        except Exception as e:
+            print(f"Error en detección: {e}")
+            return
+
+        self.scheduler.record(duration)
+
+        face_results = []
+        changed = []
+        for face_index, ((track_id, (x, y, w, h)), (emotion_es, confidence, all_emotions)) in enumerate(zip(tracks, results)):
+            face_results.append({
+                'face_index': face_index,
+                'track_id': track_id,
+                'box': [int(x), int(y), int(w), int(h)],
+                'emotion': emotion_es,
+                'confidence': confidence,
+                'all_emotions': all_emotions
+            })
+
+            if emotion_es != self._last_emotions.get(track_id) and confidence > 0.5:
+                self._last_emotions[track_id] = emotion_es
+                changed.append(face_results[-1])
+
+        # Olvidar rostros que ya no se siguen
+        active_ids = {track_id for track_id, _ in tracks}
+        for track_id in list(self._last_emotions):
+            if track_id not in active_ids:
+                del self._last_emotions[track_id]
+
+        if not changed:
+            return
+
+        # El rostro más grande se muestra como emoción principal
+        main_face = max(face_results, key=lambda face: face['box'][2] * face['box'][3])
+        emotion_data = {
+            'emotion': main_face['emotion'],
+            'confidence': main_face['confidence'],
+            'all_emotions': main_face['all_emotions'],
+            'faces': face_results,
+            'frame_size': list(frame_size)
+        }
+        # Se envía junto con el siguiente frame
+        self._pending_emotion = emotion_data
+
+        for face in changed:
+            metadata = {
+                'session_id': self._session_id,
+                'source_id': self.source.source_id,
+                'face_index': face['face_index'],
+                'track_id': face['track_id'],
+                'all_emotions': face['all_emotions'],
+                'source': 'dashboard_stream'
+            }
+            with metrics.timer(metrics.STAGE['db_write']):
+                await asyncio.to_thread(self.db.insert_emotion, face['emotion'], face['confidence'], metadata)
+
+            # 🔔 Alerta si es emoción negativa (se encola, no bloquea)
+            if self.alerts.should_alert(face['emotion']):
+                self.alerts.submit(face['emotion'], face['confidence'], {'track_id': face['track_id']})
+
+    async def _run(self):
+        """Bucle de captura: envía trabajo a los hilos sin bloquear el loop"""
+        loop = asyncio.get_running_loop()
+
+        # Cargar el modelo (TensorFlow) fuera del event loop
+        engine = await loop.run_in_executor(self._capture_pool, get_engine().load)
+
+        # Detector de rostros configurado (FACE_DETECTOR), antes de abrir la cámara
+        try:
+            face_detector = await loop.run_in_executor(self._capture_pool, create_face_detector)
+        except Exception as e:
+            print(f"❌ Error cargando el detector de rostros: {e}")
+            return
+
+        cap = await loop.run_in_executor(self._capture_pool, open_capture, self.source)
+        # Detector sobre imagen reducida y ventanas alrededor de los últimos rostros
+        self.pipeline = FaceDetectionPipeline(face_detector.detect)
+        # La detección corre cada DETECT_EVERY frames; en el resto se siguen los rostros
+        self.tracker = FaceTracker(self.pipeline.detect)
+        # Inferir cuando los rostros cambian, dentro del presupuesto de cómputo
+        self.scheduler = InferenceScheduler()
+
+        self._last_emotions = {}
+        self._pending_emotion = None
+        self._session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        fps_meter = metrics.FpsMeter('stream')
+
+        try:
+            while self.manager.active_connections:
+                frame, gray, tracks, frame_size = await loop.run_in_executor(
+                    self._capture_pool, self._capture, cap, self.tracker
+                )
+                if frame is None:
+                    break
+
+                self.frames_captured += 1
+
+                if self.scheduler.should_run(gray, tracks):
+                    # Todos los rostros en un lote, recortados a resolución nativa
+                    face_rois = [gray[y:y+h, x:x+w] for _, (x, y, w, h) in tracks]
+
+                    future = self.executor.submit(self._classify, engine, face_rois)
+                    task = asyncio.create_task(self._handle_inference(future, tracks, frame_size))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+
+                # Un JPEG por nivel pedido, compartido por sus clientes
+                tiers = self.manager.wanted_tiers()
+                frames = None
+                if tiers:
+                    frames = await loop.run_in_executor(self._capture_pool, encode_tiers, frame, tiers)
+                    self.frames_encoded += 1
+                else:
+                    self.encodes_skipped += 1
+
+                # Solo llena los slots: los envíos corren en la tarea de cada cliente
+                emotion_data, self._pending_emotion = self._pending_emotion, None
+                self.manager.publish(frames, emotion_data)
+                fps_meter.tick()
+
+                await asyncio.sleep(FRAME_INTERVAL)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error en productor de video: {e}")
+        finally:
+            # Liberar en el hilo de captura, después de cualquier lectura en curso
+            self._capture_pool.submit(cap.release)
+            print("📹 Cámara liberada")
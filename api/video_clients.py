@@ -0,0 +1,288 @@
+"""
+Entrega de video por cliente para /ws/video
+Cada suscriptor tiene un slot con el último frame (los anteriores sin
+enviar se descartan) y su propia tarea de envío: un cliente lento ya no
+frena al productor ni a los demás. La calidad JPEG, la resolución y los
+FPS de cada cliente se ajustan según lo que tardan sus envíos.
+
+Sin OpenCV: la API lo importa al arrancar (la codificación está en
+api/stream.py).
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from dotenv import load_dotenv
+
+from detector import metrics
+
+load_dotenv()
+
+# ======================== CONFIGURACIÓN ========================
+
+class QualityTier(NamedTuple):
+    name: str
+    size: tuple      # (ancho, alto)
+    quality: int     # calidad JPEG
+    fps: float       # frames por segundo máximos
+
+
+# De mejor a peor; 'high' es la calidad que se enviaba antes a todos
+QUALITY_TIERS = (
+    QualityTier('high', (640, 480), 70, 30),
+    QualityTier('medium', (640, 480), 55, 20),
+    QualityTier('low', (480, 360), 45, 12),
+    QualityTier('minimal', (320, 240), 35, 6),
+)
+
+VIDEO_ADAPTIVE = os.getenv('VIDEO_ADAPTIVE', 'true').lower() == 'true'
+VIDEO_INITIAL_TIER = min(int(os.getenv('VIDEO_INITIAL_TIER', 0)), len(QUALITY_TIERS) - 1)
+
+LATENCY_ALPHA = 0.2     # peso de cada envío en la latencia promedio (EWMA)
+DEGRADE_RATIO = 0.8     # bajar de nivel si el envío ocupa >80% del intervalo entre frames
+UPGRADE_RATIO = 0.25    # subir si ocupa <25% del intervalo del nivel superior...
+UPGRADE_AFTER = 30      # ...durante esta cantidad de envíos seguidos
+ADAPT_COOLDOWN = 2.0    # segundos mínimos entre cambios de nivel
+
+# ======================== CODIFICACIÓN ========================
+
+class EncodedFrame:
+    """JPEG de un nivel, compartido por todos los clientes de ese nivel"""
+
+    __slots__ = ('jpeg', 'size', '_hex')
+
+    def __init__(self, jpeg: bytes, size: tuple):
+        self.jpeg = jpeg
+        self.size = size  # (ancho, alto) del JPEG
+        self._hex = None
+
+    @property
+    def hex(self) -> str:
+        """Hexadecimal para clientes legacy (se calcula una sola vez)"""
+        if self._hex is None:
+            self._hex = self.jpeg.hex()
+        return self._hex
+
+def scale_emotion(emotion: Optional[Dict], size: tuple) -> Optional[Dict]:
+    """
+    Cajas de los rostros en coordenadas de un frame de `size`
+
+    El productor las manda en coordenadas del frame nativo con
+    `frame_size`; cada cliente recibe las de la resolución que le llega.
+    """
+    if not emotion or not emotion.get('faces') or not emotion.get('frame_size'):
+        return emotion
+    width, height = emotion['frame_size']
+    sx, sy = size[0] / width, size[1] / height
+    faces = [dict(face, box=[int(face['box'][0] * sx), int(face['box'][1] * sy),
+                             int(face['box'][2] * sx), int(face['box'][3] * sy)])
+             for face in emotion['faces']]
+    return dict(emotion, faces=faces, frame_size=list(size))
+
+# ======================== SUSCRIPTOR ========================
+
+class VideoSubscriber:
+    """
+    Un cliente de /ws/video.
+
+    offer() deja el frame más reciente en el slot y nunca espera; la
+    tarea de envío toma lo que haya en el slot cuando termina el envío
+    anterior. La emoción se conserva aunque se descarte el frame.
+
+    - binary: JPEG crudo en mensajes binarios y la emoción como JSON aparte
+    - json (legacy): JPEG en hexadecimal dentro de un mensaje JSON
+
+    Las cajas de la emoción llegan escaladas al JPEG que se envía con
+    ella (o, sin frame, a la resolución del nivel del cliente).
+    """
+
+    def __init__(self, websocket, binary: bool = True,
+                 tier: int = VIDEO_INITIAL_TIER, adaptive: bool = VIDEO_ADAPTIVE):
+        self.websocket = websocket
+        self.binary = binary
+        self.tier = tier
+        self.adaptive = adaptive
+        self.closed = False
+
+        self._frames: Optional[Dict[int, EncodedFrame]] = None
+        self._emotion = None
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._sending = False
+
+        self._last_send = 0.0       # inicio del último envío de frame (monotonic)
+        self._last_change = 0.0     # último cambio de nivel
+        self._fast_sends = 0
+        self.latency: Optional[float] = None  # segundos, EWMA
+
+        self.sent = 0
+        self.dropped = 0
+        self.tier_changes = 0
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / QUALITY_TIERS[self.tier].fps
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self.closed = True
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    def wants_frame(self, now: float) -> bool:
+        """
+        Le toca un frame según los FPS de su nivel. Mientras envía no:
+        al terminar recibe el frame siguiente, que es más nuevo que
+        cualquiera que se le guarde ahora.
+        """
+        return not self.closed and not self._sending and now - self._last_send >= self.interval
+
+    def offer(self, frames: Optional[Dict[int, EncodedFrame]], emotion: Optional[Dict] = None):
+        """Reemplaza el frame pendiente (si lo había, se descarta) sin esperar"""
+        if frames is not None:
+            if self._frames is not None:
+                self.dropped += 1
+            self._frames = frames
+        if emotion is not None:
+            self._emotion = emotion
+        if self._frames is not None or (self._emotion is not None and self.binary):
+            self._ready.set()
+
+    def stats(self) -> Dict:
+        return {
+            'format': 'binary' if self.binary else 'json',
+            'tier': QUALITY_TIERS[self.tier].name,
+            'latency_ms': round(self.latency * 1000, 2) if self.latency is not None else None,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'tier_changes': self.tier_changes
+        }
+
+    # ---------- Internos ----------
+
+    def _pick(self, frames: Dict[int, EncodedFrame]) -> EncodedFrame:
+        """El JPEG de su nivel o, si cambió de nivel después de codificar, el más cercano"""
+        if self.tier in frames:
+            return frames[self.tier]
+        return frames[min(frames, key=lambda index: abs(index - self.tier))]
+
+    async def _run(self):
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+
+                frames, self._frames = self._frames, None
+                emotion = self._emotion
+                if frames is None and not self.binary:
+                    # Legacy: la emoción viaja con el siguiente frame
+                    continue
+                self._emotion = None
+
+                frame = self._pick(frames) if frames else None
+                size = frame.size if frame else QUALITY_TIERS[self.tier].size
+                emotion = scale_emotion(emotion, size)
+
+                start = time.monotonic()
+                self._sending = True
+                try:
+                    with metrics.timer(metrics.STAGE['send']):
+                        if self.binary:
+                            if emotion:
+                                await self.websocket.send_json({'type': 'emotion', 'emotion': emotion})
+                            if frame:
+                                await self.websocket.send_bytes(frame.jpeg)
+                        else:
+                            await self.websocket.send_json({
+                                'type': 'frame',
+                                'frame': frame.hex,
+                                'emotion': emotion
+                            })
+                finally:
+                    self._sending = False
+
+                if frames:
+                    self._last_send = start
+                    self.sent += 1
+                    self._record(time.monotonic() - start)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Conexión caída: el endpoint lo detecta y desconecta al cliente
+            self.closed = True
+
+    def _record(self, duration: float):
+        """Actualiza la latencia promedio y ajusta el nivel"""
+        if self.latency is None:
+            self.latency = duration
+        else:
+            self.latency += LATENCY_ALPHA * (duration - self.latency)
+
+        if not self.adaptive:
+            return
+
+        now = time.monotonic()
+        if now - self._last_change < ADAPT_COOLDOWN:
+            return
+
+        if self.latency > self.interval * DEGRADE_RATIO and self.tier < len(QUALITY_TIERS) - 1:
+            self._set_tier(self.tier + 1, now)
+        elif self.tier > 0 and self.latency < UPGRADE_RATIO / QUALITY_TIERS[self.tier - 1].fps:
+            self._fast_sends += 1
+            if self._fast_sends >= UPGRADE_AFTER:
+                self._set_tier(self.tier - 1, now)
+        else:
+            self._fast_sends = 0
+
+    def _set_tier(self, tier: int, now: float):
+        self.tier = tier
+        self.tier_changes += 1
+        self._fast_sends = 0
+        self._last_change = now
+
+# ======================== MANAGER ========================
+
+class VideoConnectionManager:
+    """Suscriptores de /ws/video, cada uno con su slot y su tarea de envío"""
+
+    def __init__(self):
+        self.subscribers: Dict[object, VideoSubscriber] = {}
+
+    @property
+    def active_connections(self) -> List:
+        return list(self.subscribers)
+
+    async def connect(self, websocket, binary: bool = True):
+        await websocket.accept()
+        subscriber = VideoSubscriber(websocket, binary=binary)
+        subscriber.start()
+        self.subscribers[websocket] = subscriber
+
+    def disconnect(self, websocket):
+        subscriber = self.subscribers.pop(websocket, None)
+        if subscriber:
+            subscriber.stop()
+
+    def wanted_tiers(self) -> Set[int]:
+        """
+        Niveles que hay que codificar para este frame: los de los
+        clientes a los que les toca uno. Vacío = no codificar nada.
+        """
+        now = time.monotonic()
+        return {s.tier for s in self.subscribers.values() if s.wants_frame(now)}
+
+    def publish(self, frames: Optional[Dict[int, EncodedFrame]], emotion_data: Optional[Dict] = None):
+        """Deja el frame a quienes les toca y la emoción a todos (no espera envíos)"""
+        now = time.monotonic()
+        for subscriber in list(self.subscribers.values()):
+            if subscriber.closed:
+                continue
+            wanted = frames is not None and subscriber.wants_frame(now)
+            subscriber.offer(frames if wanted else None, emotion_data)
+
+    def stats(self) -> List[Dict]:
+        return [subscriber.stats() for subscriber in self.subscribers.values()]
@@ -0,0 +1,132 @@
+"""
+Benchmark de concurrencia de la API: EmotionDatabase vs AsyncEmotionDatabase
+Levanta una app FastAPI mínima en otro proceso con las mismas consultas
+en dos variantes (pymongo llamado dentro de `async def`, como antes, y
+motor con await) y la carga con N clientes en paralelo
+
+Requiere MongoDB con datos (usa las variables del .env).
+
+Uso:
+    python benchmarks/bench_api_concurrency.py --clients 100 --requests 20
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HOST = '127.0.0.1'
+
+
+def serve(port: int):
+    """App de prueba (proceso aparte): sin caché, directo a la base"""
+    from contextlib import asynccontextmanager
+
+    import uvicorn
+    from fastapi import FastAPI
+
+    from detector.async_database import AsyncEmotionDatabase
+    from detector.database import EmotionDatabase
+
+    db = EmotionDatabase()
+    adb = AsyncEmotionDatabase()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await adb.connect()
+        yield
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.get("/sync/stats")
+    async def sync_stats():
+        return db.get_emotion_stats(hours=24)
+
+    @app.get("/sync/recent")
+    async def sync_recent():
+        return {"count": len(db.get_recent_emotions(limit=50))}
+
+    @app.get("/async/stats")
+    async def async_stats():
+        return await adb.get_emotion_stats(hours=24)
+
+    @app.get("/async/recent")
+    async def async_recent():
+        return {"count": len(await adb.get_recent_emotions(limit=50))}
+
+    uvicorn.run(app, host=HOST, port=port, log_level='warning')
+
+
+def wait_ready(base: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{base}/async/stats", timeout=5)
+            return
+        except requests.RequestException:
+            time.sleep(0.5)
+    raise RuntimeError("La app de prueba no respondió")
+
+
+def load(url: str, clients: int, per_client: int):
+    """Retorna (peticiones/s, p50 ms, p95 ms, errores)"""
+    def client():
+        session = requests.Session()
+        latencies, errors = [], 0
+        for _ in range(per_client):
+            t0 = time.perf_counter()
+            try:
+                session.get(url, timeout=30).raise_for_status()
+                latencies.append((time.perf_counter() - t0) * 1000)
+            except requests.RequestException:
+                errors += 1
+        session.close()
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(lambda _: client(), range(clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(l for lat, _ in results for l in lat)
+    errors = sum(e for _, e in results)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    median = statistics.median(latencies) if latencies else 0.0
+    return len(latencies) / elapsed, median, p95, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concurrencia de la API")
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=20, help="Peticiones por cliente")
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=serve, args=(args.port,), daemon=True)
+    server.start()
+    base = f"http://{HOST}:{args.port}"
+
+    try:
+        wait_ready(base)
+
+        print(f"\n{args.clients} clientes x {args.requests} peticiones")
+        print(f"{'Endpoint':16} {'req/s':>9} {'p50 (ms)':>10} {'p95 (ms)':>10} {'errores':>8}")
+        print("-" * 57)
+        for endpoint in ('stats', 'recent'):
+            for variant in ('sync', 'async'):
+                rps, p50, p95, errors = load(f"{base}/{variant}/{endpoint}", args.clients, args.requests)
+                print(f"{variant + '/' + endpoint:16} {rps:>9.1f} {p50:>10.1f} {p95:>10.1f} {errors:>8}")
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Latencia y memoria de los backends de EmotionEngine
+Cada backend corre en un proceso nuevo (la memoria de TensorFlow no se
+mezcla con la de los demás) sobre el mismo conjunto fijo de rostros.
+La paridad de las probabilidades la verifica
+tests/test_emotion_parity.py.
+
+Uso:
+    python detector/export_onnx.py --output models/emotion.onnx --int8 models/emotion_int8.onnx --calibration rostros/
+    python benchmarks/bench_emotion_backends.py --images rostros/ --iterations 200
+    python benchmarks/bench_emotion_backends.py --variants onnx opencv
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Variante → (backend, modelo)
+VARIANTS = {
+    'keras': ('keras', None),
+    'onnx': ('onnx', 'onnx'),
+    'opencv': ('opencv', 'onnx'),
+    'onnx-int8': ('onnx', 'int8'),
+    'opencv-int8': ('opencv', 'int8'),
+}
+FIXTURE_FACES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'fixtures', 'faces')
+
+# ======================== PROCESO HIJO ========================
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB en Linux
+
+
+def fixed_images(directory: str) -> List[np.ndarray]:
+    """Conjunto fijo: los recortes de la carpeta (por defecto los de los tests)"""
+    from detector.export_onnx import load_face_images
+    return load_face_images(directory)
+
+
+def run_child(args):
+    """Carga un backend y mide su latencia por tamaño de lote"""
+    from detector.emotion_model import EmotionEngine, preprocess_faces
+
+    backend, model = VARIANTS[args.child]
+    model_path = {'onnx': args.onnx, 'int8': args.int8}.get(model, args.onnx)
+
+    base_mb = peak_rss_mb()
+    start = time.perf_counter()
+    engine = EmotionEngine(backend=backend, model_path=model_path, threads=args.threads).load()
+    load_s = time.perf_counter() - start
+    loaded_mb = peak_rss_mb()
+
+    images = fixed_images(args.images)
+    latency = {}
+    for size in args.batch:
+        batch = preprocess_faces((images * size)[:size])
+        samples = []
+        for _ in range(args.iterations):
+            t0 = time.perf_counter()
+            engine.predict(batch)
+            samples.append((time.perf_counter() - t0) * 1000)
+        latency[str(size)] = {
+            'p50': float(np.percentile(samples, 50)),
+            'p95': float(np.percentile(samples, 95))
+        }
+
+    print(json.dumps({
+        'load_s': load_s,
+        'latency_ms': latency,
+        'base_mb': base_mb,
+        'load_mb': loaded_mb - base_mb,
+        'peak_mb': peak_rss_mb(),
+        'model_kb': os.path.getsize(model_path) / 1024 if backend != 'keras' else None
+    }))
+
+# ======================== PROCESO PRINCIPAL ========================
+
+def measure(variant: str, args) -> Dict:
+    command = [sys.executable, os.path.abspath(__file__), '--child', variant, '--images', args.images,
+               '--onnx', args.onnx, '--int8', args.int8, '--iterations', str(args.iterations),
+               '--threads', str(args.threads), '--batch', *map(str, args.batch)]
+
+    process = subprocess.run(command, capture_output=True, text=True)
+    if process.returncode != 0:
+        error = (process.stderr.strip().splitlines() or ['error desconocido'])[-1]
+        return {'error': error}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia y memoria por backend de emociones")
+    parser.add_argument('--images', default=FIXTURE_FACES, help="Carpeta con recortes de rostros (por defecto los de los tests)")
+    parser.add_argument('--onnx', default='models/emotion.onnx')
+    parser.add_argument('--int8', default='models/emotion_int8.onnx')
+    parser.add_argument('--variants', nargs='+', default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--threads', type=int, default=0)
+    parser.add_argument('--child', choices=list(VARIANTS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    results = {}
+    for variant in args.variants:
+        print(f"🔄 {variant}...")
+        results[variant] = measure(variant, args)
+
+    batch_cols = ''.join(f"{'b' + str(b) + ' p50':>10}{'p95':>8}" for b in args.batch)
+    print(f"\n{'Backend':12} {'carga (s)':>9} {'RAM (MB)':>9} {'modelo (KB)':>11}{batch_cols}")
+    print("-" * (44 + 18 * len(args.batch)))
+
+    for variant, data in results.items():
+        if 'error' in data:
+            print(f"{variant:12} ⚠️  {data['error'][:90]}")
+            continue
+
+        latency = ''.join(f"{data['latency_ms'][str(b)]['p50']:>10.2f}{data['latency_ms'][str(b)]['p95']:>8.2f}"
+                          for b in args.batch)
+        model_kb = f"{data['model_kb']:>11.0f}" if data['model_kb'] is not None else f"{'-':>11}"
+        print(f"{variant:12} {data['load_s']:>9.2f} {data['load_mb']:>9.0f} {model_kb}{latency}")
+
+    print(f"\nRAM: memoria agregada por importar y cargar el backend (pico de RSS). Latencias en ms por lote.")
+    print("Paridad de probabilidades: python -m pytest tests/test_emotion_parity.py")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark: DeepFace.analyze vs EmotionEngine
+Compara la ruta anterior (analyze por rostro) con predict_on_batch directo
+
+Uso:
+    python benchmarks/bench_emotion_engine.py --iterations 200 --faces 1 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector.emotion_model import EmotionEngine
+
+
+def time_calls(fn, iterations: int) -> float:
+    """Retorna milisegundos promedio por llamada"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de emociones")
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--faces', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help="Cantidad de rostros por frame")
+    args = parser.parse_args()
+
+    from deepface import DeepFace
+
+    rng = np.random.default_rng(0)
+
+    print("🔄 Cargando modelos...")
+    engine = EmotionEngine().load()
+    DeepFace.analyze(np.zeros((48, 48, 3), dtype=np.uint8), actions=['emotion'],
+                     enforce_detection=False, silent=True)
+
+    print(f"\n{'Rostros':>8} {'analyze (ms)':>14} {'engine (ms)':>13} {'speedup':>9}")
+    print("-" * 48)
+
+    for n_faces in args.faces:
+        rois = [rng.integers(0, 256, size=(96, 96), dtype=np.uint8) for _ in range(n_faces)]
+
+        def old_path():
+            # Ruta anterior: un DeepFace.analyze por rostro
+            for roi in rois:
+                rgb = cv2.resize(cv2.cvtColor(roi, cv2.COLOR_GRAY2RGB), (48, 48))
+                DeepFace.analyze(rgb, actions=['emotion'], enforce_detection=False, silent=True)
+
+        def new_path():
+            engine.classify(rois)
+
+        old_ms = time_calls(old_path, args.iterations)
+        new_ms = time_calls(new_path, args.iterations)
+        print(f"{n_faces:>8} {old_ms:>14.2f} {new_ms:>13.2f} {old_ms / new_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark de detectores de rostros
+Corre cada backend (haar, lbp, yunet, ssd) sobre el mismo conjunto de
+frames: latencia por frame (p50/p95), rostros por frame y coincidencia
+con un detector de referencia (IoU >= 0.5). Los rostros que la
+referencia no ve suelen ser falsos positivos, y cada uno dispara una
+inferencia.
+
+Uso:
+    python benchmarks/bench_face_detectors.py --source sesion.mp4 --frames 300
+    python benchmarks/bench_face_detectors.py --images rostros_y_escenas/ --reference yunet
+    python benchmarks/bench_face_detectors.py --source 0 --detectors haar lbp --width 640
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector.face_detectors import FACE_DETECTORS, create_face_detector
+from detector.tracking import iou
+
+MATCH_IOU = 0.5
+
+# ======================== FRAMES ========================
+
+def load_frames(args) -> List[np.ndarray]:
+    """Frames en gris de un video/cámara o de una carpeta de imágenes"""
+    frames = []
+    if args.images:
+        from detector.export_onnx import load_face_images
+        frames = load_face_images(args.images, args.frames)
+    else:
+        cap = cv2.VideoCapture(int(args.source) if args.source.isdigit() else args.source)
+        while len(frames) < args.frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        cap.release()
+
+    if args.width:
+        frames = [cv2.resize(f, (args.width, int(f.shape[0] * args.width / f.shape[1])),
+                             interpolation=cv2.INTER_AREA) if f.shape[1] != args.width else f
+                  for f in frames]
+    return frames
+
+# ======================== MEDICIÓN ========================
+
+def run(detector, frames: List[np.ndarray]) -> Dict:
+    detector.detect(frames[0])  # calentamiento
+
+    latencies, detections = [], []
+    for gray in frames:
+        start = time.perf_counter()
+        boxes = detector.detect(gray)
+        latencies.append((time.perf_counter() - start) * 1000)
+        detections.append(boxes)
+
+    return {
+        'p50': float(np.percentile(latencies, 50)),
+        'p95': float(np.percentile(latencies, 95)),
+        'detections': detections
+    }
+
+
+def agreement(detections: List[List], reference: List[List]) -> Dict:
+    """Rostros que coinciden con la referencia, que sobran y que faltan"""
+    matched = extra = missed = 0
+    for boxes, ref_boxes in zip(detections, reference):
+        remaining = list(ref_boxes)
+        for box in boxes:
+            best = max(remaining, key=lambda ref: iou(box, ref), default=None)
+            if best is not None and iou(box, best) >= MATCH_IOU:
+                remaining.remove(best)
+                matched += 1
+            else:
+                extra += 1
+        missed += len(remaining)
+    return {'matched': matched, 'extra': extra, 'missed': missed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de detectores de rostros")
+    parser.add_argument('--source', default='0', help="Índice de cámara o archivo de video")
+    parser.add_argument('--images', help="Carpeta de imágenes (en lugar de --source)")
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--width', type=int, default=640, help="Ancho de detección (0 = nativo)")
+    parser.add_argument('--detectors', nargs='+', default=list(FACE_DETECTORS), choices=FACE_DETECTORS)
+    parser.add_argument('--reference', choices=FACE_DETECTORS, help="Detector de referencia (por defecto el primero)")
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    if not frames:
+        print("❌ No se pudieron leer frames")
+        sys.exit(1)
+
+    results = {}
+    for name in args.detectors:
+        try:
+            detector = create_face_detector(name)
+        except Exception as e:
+            print(f"⚠️  {name}: {e}")
+            continue
+        results[name] = run(detector, frames)
+
+    if not results:
+        print("❌ Ningún detector pudo cargarse")
+        sys.exit(1)
+
+    reference = args.reference if args.reference in results else next(iter(results))
+    ref_detections = results[reference]['detections']
+
+    print(f"\n🎞️  {len(frames)} frames de {frames[0].shape[1]}x{frames[0].shape[0]}, referencia: {reference}")
+    print(f"\n{'Detector':10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'FPS':>8} {'rostros/frame':>14} "
+          f"{'coinciden':>10} {'sobran':>7} {'faltan':>7}")
+    print("-" * 82)
+    for name, data in results.items():
+        faces = sum(len(boxes) for boxes in data['detections']) / len(frames)
+        check = agreement(data['detections'], ref_detections)
+        print(f"{name:10} {data['p50']:>9.2f} {data['p95']:>9.2f} {1000 / data['p50']:>8.1f} {faces:>14.2f} "
+              f"{check['matched']:>10} {check['extra']:>7} {check['missed']:>7}")
+
+
+if __name__ == "__main__":
+    main()
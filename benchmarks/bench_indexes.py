@@ -0,0 +1,128 @@
+"""
+Benchmark de índices sobre una colección sembrada
+Mide la latencia de las consultas del dashboard sin índices y con los
+índices declarados en detector/database.py
+
+Usa colecciones temporales (<colección>_bench) que se borran al final.
+
+Uso:
+    python benchmarks/bench_indexes.py --documents 200000 --repeat 20
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import MongoClient, DESCENDING
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector.database import ensure_indexes, rollup_updates
+
+EMOTIONS = ['Enojo', 'Asco', 'Miedo', 'Felicidad', 'Tristeza', 'Sorpresa', 'Neutral']
+
+
+def seed(collection, rollups, documents: int, days: int):
+    """Siembra detecciones repartidas en los últimos N días"""
+    now = datetime.now()
+    batch = []
+    for i in range(documents):
+        ts = now - timedelta(seconds=random.uniform(0, days * 86400))
+        batch.append({
+            '_id': ObjectId(),
+            'emotion': random.choice(EMOTIONS),
+            'confidence': random.uniform(0.5, 1.0),
+            'timestamp': ts,
+            'date': ts.strftime('%Y-%m-%d'),
+            'time': ts.strftime('%H:%M:%S'),
+            'hour': ts.hour,
+            'day_of_week': ts.strftime('%A'),
+            'metadata': {'session_id': f"session_{i // 500}", 'source': 'benchmark'}
+        })
+        if len(batch) == 10000:
+            collection.insert_many(batch, ordered=False)
+            rollups.bulk_write(rollup_updates(batch), ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        rollups.bulk_write(rollup_updates(batch), ordered=False)
+
+
+def queries(collection, rollups):
+    """Mismas formas de consulta que EmotionDatabase"""
+    now = datetime.now()
+    today = now.strftime('%Y-%m-%d')
+    start = (now - timedelta(hours=24)).replace(minute=0, second=0, microsecond=0)
+    return {
+        'recent (sort timestamp)': lambda: list(collection.find().sort('timestamp', DESCENDING).limit(50)),
+        'by_date (date + sort)': lambda: list(collection.find({'date': today}).sort('timestamp', DESCENDING)),
+        'session_id': lambda: list(collection.find({'metadata.session_id': 'session_42'})),
+        'raw stats 24h ($match)': lambda: list(collection.aggregate([
+            {'$match': {'timestamp': {'$gte': now - timedelta(hours=24)}}},
+            {'$group': {'_id': '$emotion', 'count': {'$sum': 1}}}
+        ])),
+        'rollup stats 24h': lambda: list(rollups.find({'bucket': {'$gte': start}})),
+    }
+
+
+def measure(fn, repeat: int) -> float:
+    """Mediana en milisegundos"""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Benchmark de índices de MongoDB")
+    parser.add_argument('--uri', default=os.getenv('MONGODB_URI', 'mongodb://localhost:27017'))
+    parser.add_argument('--database', default=os.getenv('MONGODB_DATABASE', 'Emotions'))
+    parser.add_argument('--documents', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri, serverSelectionTimeoutMS=5000)
+    db = client[args.database]
+    base = os.getenv('MONGODB_COLLECTION', 'emotions_log')
+    collection = db[f'{base}_bench']
+    rollups = db[f'{base}_bench_hourly']
+
+    try:
+        collection.drop()
+        rollups.drop()
+
+        print(f"🌱 Sembrando {args.documents} documentos en {args.days} días...")
+        seed(collection, rollups, args.documents, args.days)
+
+        before = {name: measure(fn, args.repeat) for name, fn in queries(collection, rollups).items()}
+
+        print("🔧 Creando índices...")
+        ensure_indexes(collection, rollups)
+
+        after = {name: measure(fn, args.repeat) for name, fn in queries(collection, rollups).items()}
+
+        print(f"\n{'Consulta':28} {'sin índice':>12} {'con índice':>12} {'mejora':>8}")
+        print("-" * 64)
+        for name in before:
+            speedup = before[name] / after[name] if after[name] else float('inf')
+            print(f"{name:28} {before[name]:>10.2f}ms {after[name]:>10.2f}ms {speedup:>7.1f}x")
+
+    finally:
+        collection.drop()
+        rollups.drop()
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark de ingesta de varias cámaras
+Corre detector/multicam.py con 1, 2, 4... copias de la misma fuente
+(un proceso de captura cada una, un único servicio de inferencia) y
+mide frames/s totales, rostros clasificados por segundo, tamaño medio
+del lote, frames descartados y núcleos de CPU usados. Sin MongoDB: los
+resultados solo se cuentan.
+
+Con un video en --realtime cada copia se comporta como una cámara a su
+FPS; sin él se mide el máximo que da la máquina.
+
+Uso:
+    python benchmarks/bench_multicam.py --source sesion.mp4 --cameras 1 2 4 --duration 20
+    python benchmarks/bench_multicam.py --source rtsp://127.0.0.1:8554/sala1 --cameras 1 4
+    python benchmarks/bench_multicam.py --source sesion.mp4 --realtime --cameras 4 8
+"""
+
+import argparse
+import os
+import resource
+import sys
+import time
+from typing import Dict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector.capture import parse_sources
+from detector.emotion_model import get_engine
+from detector.multicam import MULTICAM_MAX_BATCH, MULTICAM_MAX_WAIT, MultiCameraManager
+
+
+def cpu_seconds() -> float:
+    """CPU del proceso y de los hijos ya terminados"""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def run(source: str, cameras: int, args, engine) -> Dict:
+    sources = parse_sources([source] * cameras)
+    classified = {'faces': 0}
+
+    def count(message, results):
+        classified['faces'] += len(results)
+
+    manager = MultiCameraManager(sources, count, engine=engine, realtime=args.realtime, loop=True,
+                                 max_batch=args.max_batch, max_wait=args.max_wait)
+    cpu_start = cpu_seconds()
+    manager.start()
+
+    # Descartar el arranque de los procesos (import de OpenCV, detector)
+    time.sleep(args.warmup)
+    before = {source_id: dict(status) for source_id, status in manager.poll().items()}
+    faces_before = classified['faces']
+    started = time.perf_counter()
+
+    while manager.running and time.perf_counter() - started < args.duration:
+        time.sleep(0.5)
+        manager.poll()
+    status = {source_id: dict(data) for source_id, data in manager.poll().items()}
+    elapsed = time.perf_counter() - started
+    faces = classified['faces'] - faces_before
+
+    manager.stop()
+    cpu = cpu_seconds() - cpu_start
+
+    frames = sum(status[s]['frames'] - before[s]['frames'] for s in status)
+    dropped = sum(status[s]['dropped'] - before[s]['dropped'] for s in status)
+    batches = sum(status[s]['batches'] - before[s]['batches'] for s in status)
+    errors = [data['error'] for data in status.values() if data.get('error')]
+    inference = manager.service.stats()
+
+    return {
+        'cameras': cameras,
+        'fps_total': frames / elapsed,
+        'fps_per_camera': frames / elapsed / cameras,
+        'faces_per_s': faces / elapsed,
+        'avg_batch': inference['avg_batch'],
+        'inference_ms': inference['avg_inference_ms'],
+        'latency_ms': inference['avg_latency_ms'],
+        'dropped_pct': dropped / (dropped + batches) * 100 if dropped + batches else 0.0,
+        'cores': cpu / (elapsed + args.warmup),
+        'errors': errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ingesta multicámara")
+    parser.add_argument('--source', required=True, help="Video, URL RTSP o índice de cámara")
+    parser.add_argument('--cameras', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--duration', type=float, default=20.0, help="Segundos medidos por corrida")
+    parser.add_argument('--warmup', type=float, default=3.0, help="Segundos descartados al inicio")
+    parser.add_argument('--realtime', action='store_true', help="Leer el video a su FPS")
+    parser.add_argument('--max-batch', type=int, default=MULTICAM_MAX_BATCH)
+    parser.add_argument('--max-wait', type=float, default=MULTICAM_MAX_WAIT)
+    args = parser.parse_args()
+
+    print("🔄 Cargando modelo...")
+    engine = get_engine().load()
+
+    results = []
+    for cameras in args.cameras:
+        print(f"🔄 {cameras} cámara(s)...")
+        result = run(args.source, cameras, args, engine)
+        if result['errors']:
+            print(f"⚠️  {result['errors'][0]}")
+        results.append(result)
+
+    print(f"\n{'Cámaras':>8} {'FPS total':>10} {'FPS/cám':>8} {'rostros/s':>10} {'lote':>6} "
+          f"{'infer (ms)':>11} {'latencia (ms)':>14} {'descarte':>9} {'núcleos':>8}")
+    print("-" * 92)
+    for r in results:
+        print(f"{r['cameras']:>8} {r['fps_total']:>10.1f} {r['fps_per_camera']:>8.1f} {r['faces_per_s']:>10.1f} "
+              f"{r['avg_batch']:>6.1f} {r['inference_ms']:>11.1f} {r['latency_ms']:>14.1f} "
+              f"{r['dropped_pct']:>8.1f}% {r['cores']:>8.2f}")
+
+    print(f"\nCPU: {os.cpu_count()} núcleos. 'descarte': frames a clasificar que no entraron en la cola "
+          f"(el servicio de inferencia no da abasto).")
+
+
+if __name__ == "__main__":
+    main()
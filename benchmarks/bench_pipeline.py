@@ -0,0 +1,261 @@
+"""
+Benchmark por etapas del pipeline de detección
+Mide cada etapa por separado sobre frames grabados o sintéticos (sin
+cámara): decodificación, escala de grises, detección de rostros,
+preprocesado de ROIs, inferencia, imencode JPEG e insert_emotion contra
+un MongoDB local. Reporta p50/p95/p99 y FPS, y guarda/compara una
+línea base en JSON para detectar regresiones entre commits.
+
+Uso:
+    python benchmarks/bench_pipeline.py --frames 300 --save benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --source sesion.mp4 --compare benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --mongo-uri mongodb://localhost:27017 --skip-model
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector.emotion_model import EmotionEngine, preprocess_faces
+from detector.face_detectors import FACE_DETECTOR, FACE_DETECTORS, create_face_detector
+
+STAGES = ['decode', 'gray', 'detect', 'preprocess', 'inference', 'encode', 'db_insert']
+PER_FRAME_STAGES = ['decode', 'gray', 'detect', 'encode']  # las que corren en cada frame
+
+# ======================== FRAMES ========================
+
+def synthetic_frames(count: int, width: int, height: int) -> List[bytes]:
+    """
+    Frames JPEG reproducibles (semilla fija): ruido suave con
+    rectángulos que se mueven, para que decodificar y detectar no
+    sean triviales
+    """
+    rng = np.random.default_rng(42)
+    base = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        x = (i * 7) % max(1, width - 200)
+        cv2.rectangle(frame, (x, height // 4), (x + 160, height // 4 + 200), (200, 180, 160), -1)
+        cv2.circle(frame, (x + 50, height // 4 + 70), 12, (40, 40, 40), -1)
+        cv2.circle(frame, (x + 110, height // 4 + 70), 12, (40, 40, 40), -1)
+        frames.append(cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes())
+    return frames
+
+
+def recorded_frames(source: str, count: int) -> List[bytes]:
+    """Frames de un video, re-codificados a JPEG para medir la decodificación"""
+    cap = cv2.VideoCapture(source)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes())
+    cap.release()
+    return frames
+
+# ======================== MEDICIÓN ========================
+
+def percentiles(samples: List[float]) -> Dict:
+    values = np.asarray(samples) * 1000
+    return {
+        'n': len(samples),
+        'mean': round(float(values.mean()), 4),
+        'p50': round(float(np.percentile(values, 50)), 4),
+        'p95': round(float(np.percentile(values, 95)), 4),
+        'p99': round(float(np.percentile(values, 99)), 4)
+    }
+
+
+def timed(fn: Callable, samples: List[float]):
+    start = time.perf_counter()
+    result = fn()
+    samples.append(time.perf_counter() - start)
+    return result
+
+
+def open_database(args):
+    """
+    EmotionDatabase contra un MongoDB local (colección temporal) o
+    mongomock si se pide --mongomock
+    """
+    os.environ['MONGODB_URI'] = args.mongo_uri
+    os.environ['MONGODB_DATABASE'] = 'emotion_bench'
+    os.environ['MONGODB_COLLECTION'] = f"bench_{os.getpid()}"
+    os.environ['SPOOL_DIR'] = tempfile.mkdtemp(prefix='bench_spool_')
+
+    import detector.database as database
+    if args.mongomock:
+        import mongomock
+        database.MongoClient = mongomock.MongoClient
+    return database.EmotionDatabase()
+
+
+def run(args) -> Dict:
+    if args.source:
+        frames = recorded_frames(args.source, args.frames)
+    else:
+        frames = synthetic_frames(args.frames, args.width, args.height)
+    if not frames:
+        print("❌ No hay frames para medir")
+        sys.exit(1)
+
+    samples = {stage: [] for stage in STAGES}
+    face_detector = create_face_detector(args.detector)
+
+    engine = None
+    if not args.skip_model:
+        print("🔄 Cargando modelo...")
+        engine = EmotionEngine().load()
+
+    rng = np.random.default_rng(0)
+    rois = [rng.integers(0, 256, (120, 120), dtype=np.uint8) for _ in range(args.faces)]
+
+    # Calentamiento: cachés, asignaciones y primera llamada al modelo
+    warm = cv2.imdecode(np.frombuffer(frames[0], np.uint8), cv2.IMREAD_COLOR)
+    face_detector.detect(cv2.cvtColor(warm, cv2.COLOR_BGR2GRAY))
+
+    print(f"⏱️  {len(frames)} frames de {warm.shape[1]}x{warm.shape[0]}, {args.faces} rostro(s) por inferencia")
+    for data in frames:
+        frame = timed(lambda: cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR), samples['decode'])
+        gray = timed(lambda: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), samples['gray'])
+        faces = timed(lambda: face_detector.detect(gray), samples['detect'])
+
+        # ROIs detectados si los hay; si no, recortes fijos (frames sintéticos)
+        face_rois = [gray[y:y+h, x:x+w] for (x, y, w, h) in faces][:args.faces] or rois
+        batch = timed(lambda: preprocess_faces(face_rois), samples['preprocess'])
+        if engine is not None:
+            timed(lambda: engine.predict(batch), samples['inference'])
+
+        timed(lambda: cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70]), samples['encode'])
+
+    if args.mongo_uri or args.mongomock:
+        db = open_database(args)
+        try:
+            for _ in range(len(frames)):
+                timed(lambda: db.insert_emotion('Neutral', 0.9, {'source': 'benchmark'}),
+                      samples['db_insert'])
+            # Costo de escribir lo encolado (insert_many + rollups)
+            flush_start = time.perf_counter()
+            db.flush(timeout=60)
+            samples['db_flush_per_doc'] = [(time.perf_counter() - flush_start) / len(frames)]
+        finally:
+            db.collection.drop()
+            db.rollups.drop()
+            db.close()
+
+    stages = {stage: percentiles(values) for stage, values in samples.items() if values}
+    per_frame_ms = sum(stages[s]['mean'] for s in PER_FRAME_STAGES if s in stages)
+
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'source': args.source or f"synthetic {args.width}x{args.height}",
+            'frames': len(frames),
+            'faces': args.faces,
+            'detector': args.detector,
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'machine': platform.machine()
+        },
+        'stages': stages,
+        'fps': round(1000 / per_frame_ms, 2) if per_frame_ms else None
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return 'unknown'
+
+# ======================== REPORTE ========================
+
+def print_report(result: Dict):
+    print(f"\n{'Etapa':18} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10} {'FPS':>9}")
+    print("-" * 61)
+    for stage, data in result['stages'].items():
+        fps = 1000 / data['mean'] if data['mean'] else float('inf')
+        print(f"{stage:18} {data['p50']:>10.3f} {data['p95']:>10.3f} {data['p99']:>10.3f} {fps:>9.1f}")
+    if result['fps']:
+        print(f"\n🎞️  Pipeline por frame ({' + '.join(PER_FRAME_STAGES)}): {result['fps']:.1f} FPS")
+
+
+def compare(result: Dict, baseline: Dict, threshold: float) -> bool:
+    """
+    Compara p50 y p95 con la línea base
+
+    Returns:
+        True si ninguna etapa empeoró más que `threshold` (fracción)
+    """
+    print(f"\n📐 Comparación con {baseline['meta'].get('commit')} ({baseline['meta'].get('date')})")
+    print(f"{'Etapa':18} {'p50 base':>10} {'p50 ahora':>10} {'cambio':>9}")
+    print("-" * 51)
+
+    ok = True
+    for stage, data in result['stages'].items():
+        base = baseline['stages'].get(stage)
+        if not base or not base['p50']:
+            continue
+        change = data['p50'] / base['p50'] - 1
+        p95_change = data['p95'] / base['p95'] - 1 if base['p95'] else 0.0
+        regressed = change > threshold or p95_change > threshold
+        ok = ok and not regressed
+        flag = ' ❌' if regressed else ''
+        print(f"{stage:18} {base['p50']:>10.3f} {data['p50']:>10.3f} {change * 100:>+8.1f}%{flag}")
+
+    print("\n✅ Sin regresiones" if ok else f"\n❌ Regresión mayor a {threshold * 100:.0f}%")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark por etapas del pipeline")
+    parser.add_argument('--source', help="Video grabado (por defecto frames sintéticos)")
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--faces', type=int, default=1, help="Rostros por inferencia")
+    parser.add_argument('--detector', default=FACE_DETECTOR, choices=FACE_DETECTORS, help="Detector de rostros")
+    parser.add_argument('--skip-model', action='store_true', help="No medir la inferencia")
+    parser.add_argument('--mongo-uri', help="MongoDB local para medir insert_emotion")
+    parser.add_argument('--mongomock', action='store_true', help="Usar mongomock en lugar de un servidor")
+    parser.add_argument('--save', help="Guardar resultados como línea base JSON")
+    parser.add_argument('--compare', help="Línea base JSON con la cual comparar")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Regresión tolerada (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    if args.mongomock and not args.mongo_uri:
+        args.mongo_uri = 'mongodb://localhost:27017'
+
+    result = run(args)
+    print_report(result)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"\n💾 Línea base guardada en {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if not compare(result, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
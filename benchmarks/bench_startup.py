@@ -0,0 +1,156 @@
+"""
+Benchmark de tiempo de arranque
+Cada medición corre en un proceso nuevo (imports en frío):
+
+- CLI: import de detector/emotion_detector.py y load_emotion_model(),
+  separado en import de DeepFace/TensorFlow y construcción del modelo
+- API: import de api/main.py (y qué módulos pesados arrastra), tiempo
+  hasta la primera respuesta REST y hasta que /api/ready responde 200,
+  con el tiempo de cada componente que informa /api/ready
+
+Usa las variables del .env para MongoDB.
+
+Uso:
+    python benchmarks/bench_startup.py --runs 3
+    python benchmarks/bench_startup.py --skip-cli --port 8766
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('cv2', 'numpy', 'tensorflow', 'deepface')
+
+# ======================== MEDICIONES (proceso hijo) ========================
+
+CLI_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+import detector.emotion_detector as cli
+t1 = time.perf_counter()
+from deepface import DeepFace
+t2 = time.perf_counter()
+cli.load_emotion_model()
+t3 = time.perf_counter()
+print(json.dumps({{
+    'import_cli': t1 - t0,
+    'import_deepface': t2 - t1,
+    'load_emotion_model': t3 - t2,
+    'total': t3 - t0
+}}))
+"""
+
+API_IMPORT_SCRIPT = """
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+os.chdir({root!r})
+t0 = time.perf_counter()
+import api.main
+t1 = time.perf_counter()
+print(json.dumps({{
+    'import_api': t1 - t0,
+    'heavy_modules': [m for m in {heavy!r} if m in sys.modules]
+}}))
+"""
+
+
+def run_child(script: str) -> Dict:
+    """Ejecuta el script en un intérprete nuevo y lee la última línea JSON"""
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_cli() -> Dict:
+    return run_child(CLI_SCRIPT.format(root=ROOT))
+
+
+def measure_api(port: int, timeout: float) -> Dict:
+    """Arranca uvicorn y sondea hasta la primera respuesta y hasta ready"""
+    result = run_child(API_IMPORT_SCRIPT.format(root=ROOT, heavy=HEAVY_MODULES))
+
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api.main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    try:
+        deadline = start + timeout
+        first_response = None
+        while time.perf_counter() < deadline:
+            try:
+                response = requests.get(f"{base}/api/ready", timeout=1)
+            except requests.RequestException:
+                time.sleep(0.05)
+                continue
+
+            if first_response is None:
+                first_response = time.perf_counter() - start
+            body = response.json()
+            statuses = {c['status'] for c in body['components'].values()}
+            if response.status_code == 200 or statuses <= {'ready', 'error'}:
+                result.update({
+                    'first_response': first_response,
+                    'ready': time.perf_counter() - start if response.status_code == 200 else None,
+                    'components': body['components']
+                })
+                return result
+            time.sleep(0.1)
+        raise RuntimeError("La API no terminó de arrancar a tiempo")
+    finally:
+        server.terminate()
+        server.wait()
+
+# ======================== REPORTE ========================
+
+def summarize(name: str, runs: List[Dict], keys: List[str]):
+    print(f"\n{name}")
+    print(f"{'Fase':22} {'mediana (s)':>12} {'mín (s)':>9} {'máx (s)':>9}")
+    print("-" * 55)
+    for key in keys:
+        values = [run[key] for run in runs if run.get(key) is not None]
+        if not values:
+            print(f"{key:22} {'—':>12}")
+            continue
+        print(f"{key:22} {statistics.median(values):>12.3f} {min(values):>9.3f} {max(values):>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de tiempo de arranque")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--timeout', type=float, default=180.0, help="Segundos máximos por arranque de la API")
+    parser.add_argument('--skip-cli', action='store_true')
+    parser.add_argument('--skip-api', action='store_true')
+    args = parser.parse_args()
+
+    if not args.skip_cli:
+        cli_runs = [measure_cli() for _ in range(args.runs)]
+        summarize("🖥️  CLI (detector/emotion_detector.py)", cli_runs,
+                  ['import_cli', 'import_deepface', 'load_emotion_model', 'total'])
+
+    if not args.skip_api:
+        api_runs = [measure_api(args.port, args.timeout) for _ in range(args.runs)]
+        summarize("🌐 API (uvicorn api.main:app)", api_runs, ['import_api', 'first_response', 'ready'])
+
+        heavy = api_runs[-1]['heavy_modules']
+        print(f"\nMódulos pesados al importar api/main.py: {', '.join(heavy) if heavy else 'ninguno'}")
+        print("Componentes (última corrida, segundos desde el arranque):")
+        for component, info in api_runs[-1]['components'].items():
+            detail = info['error'][:80] if 'error' in info else f"{info.get('seconds', 0):.3f}s"
+            print(f"  {component:10} {info['status']:8} listo a los {info.get('ready_at', 0):.3f}s ({detail})")
+
+
+if __name__ == "__main__":
+    main()
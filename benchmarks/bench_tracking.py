@@ -0,0 +1,97 @@
+"""
+Benchmark de detección y seguimiento de rostros
+Compara detección Haar en cada frame a resolución nativa, detección sobre
+imagen reducida (FaceDetectionPipeline) y FaceTracker (detección cada K
+frames + seguimiento) sobre los mismos frames: FPS, CPU y llamadas a la
+cascada
+
+Uso:
+    python benchmarks/bench_tracking.py --source video_1080p.mp4 --frames 600
+    python benchmarks/bench_tracking.py --source 0 --detect-every 5 10 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector.face_detection import FaceDetectionPipeline
+from detector.face_detectors import FACE_DETECTOR, FACE_DETECTORS, create_face_detector
+from detector.tracking import FaceTracker
+
+
+def load_frames(source: str, count: int, width: int):
+    """Lee los frames una sola vez para que todos los modos vean lo mismo"""
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if width and frame.shape[1] != width:
+            height = int(frame.shape[0] * width / frame.shape[1])
+            frame = cv2.resize(frame, (width, height))
+        frames.append((frame, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)))
+    cap.release()
+    return frames
+
+
+def run(frames, tracker: FaceTracker):
+    """Retorna (FPS, % CPU, rostros promedio)"""
+    faces = 0
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for frame, gray in frames:
+        faces += len(tracker.update(gray, frame))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return len(frames) / wall, cpu / wall * 100, faces / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de seguimiento de rostros")
+    parser.add_argument('--source', default='0', help="Índice de cámara o archivo de video")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--width', type=int, default=0, help="Redimensionar la fuente (0 = nativo)")
+    parser.add_argument('--detection-width', type=int, default=640, help="Ancho de detección del pipeline")
+    parser.add_argument('--detect-every', type=int, nargs='+', default=[5, 10, 20])
+    parser.add_argument('--tracker', default='template', help="template | mosse | kcf | csrt")
+    parser.add_argument('--detector', default=FACE_DETECTOR, choices=FACE_DETECTORS, help="Detector de rostros")
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames, args.width)
+    if not frames:
+        print("❌ No se pudieron leer frames")
+        sys.exit(1)
+
+    detect = create_face_detector(args.detector).detect
+
+    def pipeline():
+        return FaceDetectionPipeline(detect, detection_width=args.detection_width).detect
+
+    modes = [
+        (f"{args.detector} nativo", FaceTracker(detect, enabled=False)),
+        (f"reducido {args.detection_width}px", FaceTracker(pipeline(), enabled=False)),
+    ]
+    for k in args.detect_every:
+        modes.append((f"{args.tracker} K={k}",
+                      FaceTracker(pipeline(), detect_every=k, tracker_type=args.tracker)))
+
+    print(f"🎞️  {len(frames)} frames de {frames[0][0].shape[1]}x{frames[0][0].shape[0]}")
+    print(f"\n{'Modo':18} {'FPS':>8} {'CPU':>7} {'rostros':>8} {'detecciones':>12}")
+    print("-" * 57)
+
+    baseline = None
+    for name, tracker in modes:
+        fps, cpu, faces = run(frames, tracker)
+        baseline = baseline or fps
+        print(f"{name:18} {fps:>8.1f} {cpu:>6.0f}% {faces:>8.2f} {tracker.detections:>12}"
+              f"  ({fps / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Acceso asíncrono a MongoDB para la API (motor)
+Mismas consultas que EmotionDatabase pero sin bloquear el event loop;
+EmotionDatabase (pymongo) sigue siendo la de la consola y la del
+escritor en segundo plano con spool
+"""
+
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import DESCENDING
+from dotenv import load_dotenv
+
+# Agregar el directorio padre al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector import metrics
+from detector.database import (
+    build_emotion_document, empty_range_summary, hourly_from_rollups,
+    merge_range_results, range_pipeline, rollup_updates, stats_start_bucket,
+    stringify_ids, summarize_rollups
+)
+
+load_dotenv()
+
+# ======================== CONFIGURACIÓN ========================
+
+MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', 50))
+MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', 5))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 2000))
+
+# ======================== BASE DE DATOS ========================
+
+class AsyncEmotionDatabase:
+    """
+    Versión asíncrona de EmotionDatabase sobre motor.
+
+    El pool de conexiones tiene tamaño explícito: hasta `max_pool_size`
+    consultas en paralelo; las demás esperan un socket libre hasta
+    `wait_queue_timeout_ms` y fallan en lugar de acumularse.
+
+    El cliente se crea en connect(), ya dentro del event loop.
+
+    Las lecturas relanzan los errores en lugar de devolver un resultado
+    vacío: así el caché no guarda "cero detecciones" ni la reconciliación
+    de /ws/data pisa los contadores en vivo cuando MongoDB falla.
+    """
+
+    def __init__(self, max_pool_size: int = MONGODB_MAX_POOL_SIZE,
+                 min_pool_size: int = MONGODB_MIN_POOL_SIZE,
+                 wait_queue_timeout_ms: int = MONGODB_WAIT_QUEUE_TIMEOUT_MS):
+        self.uri = os.getenv('MONGODB_URI')
+        self.db_name = os.getenv('MONGODB_DATABASE', 'Emotions')
+        self.collection_name = os.getenv('MONGODB_COLLECTION', 'emotions_log')
+        self.rollup_collection_name = os.getenv('MONGODB_ROLLUP_COLLECTION',
+                                                f'{self.collection_name}_hourly')
+
+        if not self.uri:
+            raise ValueError("⚠️  MONGODB_URI no está configurado en el archivo .env")
+
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.wait_queue_timeout_ms = wait_queue_timeout_ms
+
+        self.client = None
+        self.db = None
+        self.collection = None
+        self.rollups = None
+
+    async def connect(self):
+        """Crea el cliente y verifica la conexión"""
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        self.client = AsyncIOMotorClient(
+            self.uri,
+            maxPoolSize=self.max_pool_size,
+            minPoolSize=self.min_pool_size,
+            waitQueueTimeoutMS=self.wait_queue_timeout_ms,
+            serverSelectionTimeoutMS=5000,
+            connectTimeoutMS=10000
+        )
+        self.db = self.client[self.db_name]
+        self.collection = self.db[self.collection_name]
+        self.rollups = self.db[self.rollup_collection_name]
+
+        try:
+            await self.client.admin.command('ping')
+        except Exception:
+            self.close()
+            raise
+        print(f"✅ MongoDB asíncrono listo (pool {self.min_pool_size}-{self.max_pool_size})")
+
+    async def insert_emotion(self, emotion: str, confidence: float,
+                             metadata: Optional[Dict] = None) -> Optional[str]:
+        """
+        Inserta una detección y actualiza su bucket horario
+
+        A diferencia de EmotionDatabase.insert_emotion no hay cola ni
+        spool: la escritura se espera y un error se informa con None.
+        """
+        try:
+            document = build_emotion_document(emotion, confidence, metadata)
+            with metrics.mongo_timer('insert_one'):
+                await self.collection.insert_one(document)
+            with metrics.mongo_timer('rollup_update'):
+                await self.rollups.bulk_write(rollup_updates([document]), ordered=False)
+            return str(document['_id'])
+        except Exception as e:
+            print(f"⚠️  Error al insertar emoción: {e}")
+            return None
+
+    async def get_recent_emotions(self, limit: int = 50) -> List[Dict]:
+        try:
+            cursor = self.collection.find().sort('timestamp', DESCENDING).limit(limit)
+            with metrics.mongo_timer('find_recent'):
+                documents = await cursor.to_list(length=limit)
+            return stringify_ids(documents)
+        except Exception as e:
+            print(f"⚠️  Error al obtener emociones: {e}")
+            raise
+
+    async def get_emotions_by_date(self, date: str) -> List[Dict]:
+        try:
+            cursor = self.collection.find({'date': date}).sort('timestamp', DESCENDING)
+            with metrics.mongo_timer('find_by_date'):
+                documents = await cursor.to_list(length=None)
+            return stringify_ids(documents)
+        except Exception as e:
+            print(f"⚠️  Error al obtener emociones por fecha: {e}")
+            raise
+
+    async def get_emotion_stats(self, hours: int = 24) -> Dict:
+        try:
+            cursor = self.rollups.find({'bucket': {'$gte': stats_start_bucket(hours)}}, {'emotions': 1})
+            with metrics.mongo_timer('stats'):
+                buckets = await cursor.to_list(length=None)
+            return summarize_rollups(buckets, hours)
+        except Exception as e:
+            print(f"⚠️  Error al calcular estadísticas: {e}")
+            raise
+
+    async def get_hourly_distribution(self, date: Optional[str] = None) -> Dict:
+        try:
+            target_date = date or datetime.now().strftime('%Y-%m-%d')
+            cursor = self.rollups.find(
+                {'date': target_date},
+                {'hour': 1, 'emotions': 1}
+            ).sort('hour', 1)
+            with metrics.mongo_timer('hourly'):
+                buckets = await cursor.to_list(length=24)
+            return hourly_from_rollups(buckets)
+        except Exception as e:
+            print(f"⚠️  Error al obtener distribución horaria: {e}")
+            raise
+
+    async def get_range_summary(self, start: datetime, end: datetime,
+                                granularity: str = 'day') -> Dict:
+        summary = empty_range_summary(start, end, granularity)
+        try:
+            cursor = self.rollups.aggregate(range_pipeline(start, end, granularity))
+            with metrics.mongo_timer('range_summary'):
+                results = await cursor.to_list(length=None)
+            return merge_range_results(summary, results)
+        except Exception as e:
+            print(f"⚠️  Error al obtener resumen del rango: {e}")
+            raise
+
+    async def test_connection(self) -> bool:
+        try:
+            await self.client.admin.command('ping')
+            return True
+        except Exception as e:
+            print(f"❌ Error en conexión: {e}")
+            return False
+
+    def pool_stats(self) -> Dict:
+        return {
+            'max_pool_size': self.max_pool_size,
+            'min_pool_size': self.min_pool_size,
+            'wait_queue_timeout_ms': self.wait_queue_timeout_ms
+        }
+
+    def close(self):
+        if self.client:
+            self.client.close()
+            self.client = None
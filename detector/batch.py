@@ -0,0 +1,438 @@
+"""
+Análisis por lotes de grabaciones
+Procesa archivos de video y carpetas de imágenes con un pool de procesos
+(un modelo por proceso) y guarda los resultados en JSONL, Parquet o
+MongoDB. El avance se guarda en un checkpoint para poder reanudar.
+
+Uso:
+    python detector/batch.py sesion1.mp4 sesion2.mp4 --output resultados.jsonl
+    python detector/batch.py capturas/ --output resultados/ --format parquet
+    python detector/batch.py grabaciones/ --database --start-time 2024-05-01T10:00:00
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import cv2
+from bson import ObjectId
+
+# Agregar el directorio padre al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector.emotion_model import get_engine, sort_faces
+from detector.face_detection import FaceDetectionPipeline
+from detector.face_detectors import create_face_detector
+
+# ======================== CONFIGURACIÓN ========================
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v'}
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+CHUNK_FRAMES = 300      # frames de video por tarea
+CHUNK_IMAGES = 100      # imágenes por tarea
+DEFAULT_STRIDE = 5      # analizar 1 de cada N frames de video
+
+# ======================== TAREAS ========================
+
+def list_tasks(inputs: List[str], chunk_frames: int = CHUNK_FRAMES,
+               chunk_images: int = CHUNK_IMAGES) -> List[Dict]:
+    """
+    Divide las entradas en tareas independientes
+
+    Videos: rangos [start, end) de frames. Carpetas: grupos de imágenes
+    (y cada video que contengan). El id de cada tarea es estable entre
+    ejecuciones para que el checkpoint sirva al reanudar.
+    """
+    tasks = []
+
+    for path in inputs:
+        path = os.path.abspath(path)
+
+        if os.path.isdir(path):
+            names = sorted(os.listdir(path))
+            images = [os.path.join(path, n) for n in names
+                      if os.path.splitext(n)[1].lower() in IMAGE_EXTENSIONS]
+            videos = [os.path.join(path, n) for n in names
+                      if os.path.splitext(n)[1].lower() in VIDEO_EXTENSIONS]
+
+            for start in range(0, len(images), chunk_images):
+                end = min(start + chunk_images, len(images))
+                tasks.append({
+                    'id': f"{path}#{start}-{end}",
+                    'kind': 'images',
+                    'source': path,
+                    'files': images[start:end],
+                    'start': start,
+                    'end': end
+                })
+            tasks.extend(list_tasks(videos, chunk_frames, chunk_images))
+
+        elif os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+            cap = cv2.VideoCapture(path)
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            cap.release()
+
+            if total <= 0:
+                print(f"⚠️  No se pudo leer {path}, se omite")
+                continue
+
+            for start in range(0, total, chunk_frames):
+                end = min(start + chunk_frames, total)
+                tasks.append({
+                    'id': f"{path}#{start}-{end}",
+                    'kind': 'video',
+                    'source': path,
+                    'fps': fps,
+                    'start': start,
+                    'end': end
+                })
+
+        else:
+            print(f"⚠️  Entrada no soportada: {path}")
+
+    return tasks
+
+# ======================== WORKER ========================
+
+_worker: Dict = {}
+
+
+def init_worker():
+    """Carga el modelo y el detector una vez por proceso"""
+    # Un hilo por proceso: el paralelismo lo da el pool
+    cv2.setNumThreads(1)
+    try:
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(1)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except Exception:
+        pass
+
+    _worker['engine'] = get_engine().load()
+    _worker['pipeline'] = FaceDetectionPipeline(create_face_detector().detect)
+
+
+def _analyze(gray, source: str, frame: int, video_time: Optional[float]) -> List[Dict]:
+    """Detecta y clasifica todos los rostros de un frame"""
+    faces = sort_faces(_worker['pipeline'].detect(gray))
+    if not faces:
+        return []
+
+    face_rois = [gray[y:y+h, x:x+w] for (x, y, w, h) in faces]
+    results = _worker['engine'].classify(face_rois)
+
+    return [{
+        'source': source,
+        'frame': frame,
+        'video_time': video_time,
+        'face_index': face_index,
+        'box': list(box),
+        'emotion': emotion,
+        'confidence': confidence,
+        'all_emotions': all_emotions
+    } for face_index, (box, (emotion, confidence, all_emotions)) in enumerate(zip(faces, results))]
+
+
+def process_task(task: Dict, stride: int = DEFAULT_STRIDE) -> Dict:
+    """
+    Procesa una tarea en el worker
+
+    Returns:
+        {'id', 'frames' (analizados), 'records'}
+    """
+    _worker['pipeline'].reset()
+    records = []
+    frames = 0
+
+    if task['kind'] == 'images':
+        for offset, path in enumerate(task['files']):
+            image = cv2.imread(path)
+            if image is None:
+                continue
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            # Imágenes sin relación entre sí: sin ventanas de la anterior
+            _worker['pipeline'].reset()
+            records.extend(_analyze(gray, path, task['start'] + offset, None))
+            frames += 1
+    else:
+        cap = cv2.VideoCapture(task['source'])
+        cap.set(cv2.CAP_PROP_POS_FRAMES, task['start'])
+        try:
+            for index in range(task['start'], task['end']):
+                # grab() sin retrieve() evita convertir los frames salteados
+                if not cap.grab():
+                    break
+                if (index - task['start']) % stride:
+                    continue
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                records.extend(_analyze(gray, task['source'], index, index / task['fps']))
+                frames += 1
+        finally:
+            cap.release()
+
+    return {'id': task['id'], 'frames': frames, 'records': records}
+
+# ======================== SALIDAS ========================
+
+class JsonlSink:
+    """Un archivo JSONL; al reanudar se trunca al último checkpoint"""
+
+    def __init__(self, path: str, offset: int = 0):
+        self.path = path
+        self._file = open(path, 'a+b')
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    def write(self, task: Dict, records: List[Dict]) -> int:
+        start = self._file.tell()
+        try:
+            for record in records:
+                self._file.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except Exception:
+            # Sin líneas sueltas de una tarea fallida
+            self._file.seek(start)
+            self._file.truncate(start)
+            raise
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink:
+    """Un archivo Parquet por tarea dentro de un directorio (requiere pyarrow)"""
+
+    def __init__(self, directory: str):
+        import pandas as pd  # noqa: F401  (falla temprano si no está)
+
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, task: Dict, records: List[Dict]) -> int:
+        import pandas as pd
+
+        if not records:
+            return 0
+        name = hashlib.sha1(task['id'].encode('utf-8')).hexdigest()[:16]
+        path = os.path.join(self.directory, f"part-{name}.parquet")
+        pd.DataFrame.from_records(records).to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+        return 0
+
+    def close(self):
+        pass
+
+
+class DatabaseSink:
+    """Carga masiva en MongoDB con _id deterministas (reanudar no duplica)"""
+
+    def __init__(self, start_time: Optional[datetime]):
+        from detector.database import EmotionDatabase, build_emotion_document
+
+        self.db = EmotionDatabase()
+        self.start_time = start_time
+        self._build = build_emotion_document
+
+    def write(self, task: Dict, records: List[Dict]) -> int:
+        documents = []
+        for record in records:
+            key = f"{record['source']}#{record['frame']}#{record['face_index']}"
+            documents.append(self._build(
+                record['emotion'],
+                record['confidence'],
+                {
+                    'source': 'batch',
+                    'file': record['source'],
+                    'frame': record['frame'],
+                    'video_time': record['video_time'],
+                    'face_index': record['face_index'],
+                    'all_emotions': record['all_emotions']
+                },
+                timestamp=self._timestamp(record),
+                document_id=ObjectId(hashlib.sha1(key.encode('utf-8')).digest()[:12])
+            ))
+        self.db.insert_documents(documents)
+        return 0
+
+    def _timestamp(self, record: Dict) -> datetime:
+        """Hora de la detección: inicio de la grabación + posición en el video"""
+        start = self.start_time or datetime.fromtimestamp(os.path.getmtime(record['source']))
+        return start + timedelta(seconds=record['video_time'] or 0)
+
+    def close(self):
+        self.db.close()
+
+# ======================== CHECKPOINT ========================
+
+def empty_checkpoint() -> Dict:
+    return {'completed': [], 'offset': 0, 'failed': {}}
+
+
+def load_checkpoint(path: str) -> Dict:
+    if not os.path.exists(path):
+        return empty_checkpoint()
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    checkpoint.setdefault('failed', {})
+    return checkpoint
+
+
+def save_checkpoint(path: str, completed: List[str], offset: int, failed: Optional[Dict[str, str]] = None):
+    """
+    Escritura atómica: un corte a mitad no deja el checkpoint corrupto
+
+    `failed` guarda el error de cada tarea fallida; esas tareas no están
+    en `completed`, así que se reintentan al reanudar.
+    """
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'completed': completed, 'offset': offset, 'failed': failed or {}}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+
+# ======================== EJECUCIÓN ========================
+
+def run_tasks(pool: Executor, tasks: List[Dict], sink, checkpoint_path: str, checkpoint: Dict,
+              in_flight: int, stride: int = DEFAULT_STRIDE, total: Optional[int] = None,
+              report: Optional[Dict] = None) -> Dict:
+    """
+    Reparte las tareas en el pool y guarda cada resultado al terminar
+
+    Un error en una tarea (video corrupto, fallo del worker o de la
+    salida) no detiene el lote: se registra en `failed` del checkpoint y
+    se sigue con las demás. Al reanudar, las tareas fallidas se
+    reintentan porque no figuran en `completed`.
+
+    Returns:
+        {'frames', 'faces', 'failed' ({id: error})}; si se pasa `report`
+        se actualiza en el lugar (sirve aunque se interrumpa)
+    """
+    completed = list(checkpoint['completed'])
+    failed = dict(checkpoint.get('failed', {}))
+    offset = checkpoint['offset']
+    total = total if total is not None else len(tasks)
+    if report is None:
+        report = {'frames': 0, 'faces': 0, 'failed': {}}
+    started = time.perf_counter()
+
+    queue = iter(tasks)
+    running = {}
+
+    # Pocas tareas en vuelo: los resultados no se acumulan en memoria
+    def refill():
+        while len(running) < in_flight:
+            task = next(queue, None)
+            if task is None:
+                return
+            running[pool.submit(process_task, task, stride)] = task
+
+    refill()
+    while running:
+        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in finished:
+            task = running.pop(future)
+            try:
+                result = future.result()
+                offset = sink.write(task, result['records']) or offset
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                failed[task['id']] = error
+                report['failed'][task['id']] = error
+                save_checkpoint(checkpoint_path, completed, offset, failed)
+                print(f"\n⚠️  Tarea {task['id']} falló: {error}")
+                continue
+
+            completed.append(task['id'])
+            failed.pop(task['id'], None)
+            save_checkpoint(checkpoint_path, completed, offset, failed)
+
+            report['frames'] += result['frames']
+            report['faces'] += len(result['records'])
+            elapsed = time.perf_counter() - started
+            print(f"\r⏳ {len(completed)}/{total} tareas | "
+                  f"{report['frames'] / elapsed:.1f} frames/s | {report['faces']} rostros", end='', flush=True)
+        refill()
+
+    return report
+
+# ======================== FUNCIÓN PRINCIPAL ========================
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Análisis de emociones por lotes")
+    parser.add_argument('inputs', nargs='+', help="Archivos de video o carpetas de imágenes")
+    parser.add_argument('--output', help="Archivo .jsonl o directorio Parquet")
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl')
+    parser.add_argument('--database', action='store_true', help="Cargar en MongoDB (EmotionDatabase)")
+    parser.add_argument('--start-time', help="Inicio de la grabación (ISO) para los timestamps en MongoDB")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--stride', type=int, default=DEFAULT_STRIDE, help="Analizar 1 de cada N frames")
+    parser.add_argument('--chunk-frames', type=int, default=CHUNK_FRAMES)
+    parser.add_argument('--checkpoint', help="Archivo de checkpoint (por defecto junto a la salida)")
+    parser.add_argument('--restart', action='store_true', help="Ignorar el checkpoint y empezar de cero")
+    args = parser.parse_args()
+
+    if not args.database and not args.output:
+        parser.error("indicar --output o --database")
+
+    checkpoint_path = args.checkpoint or (
+        (args.output.rstrip('/\\') if args.output else 'batch') + '.checkpoint.json'
+    )
+    checkpoint = empty_checkpoint() if args.restart else load_checkpoint(checkpoint_path)
+    done = set(checkpoint['completed'])
+
+    # Sin repetidos si un archivo llega también a través de su carpeta
+    tasks = list({task['id']: task for task in list_tasks(args.inputs, chunk_frames=args.chunk_frames)}.values())
+    pending = [task for task in tasks if task['id'] not in done]
+
+    if args.database:
+        sink = DatabaseSink(datetime.fromisoformat(args.start_time) if args.start_time else None)
+    elif args.format == 'parquet':
+        sink = ParquetSink(args.output)
+    else:
+        sink = JsonlSink(args.output, offset=checkpoint['offset'])
+
+    retries = sum(1 for task in pending if task['id'] in checkpoint['failed'])
+    print(f"📂 {len(tasks)} tareas ({len(tasks) - len(pending)} ya completadas, "
+          f"{retries} a reintentar), {args.workers} procesos")
+
+    started = time.perf_counter()
+    report = {'frames': 0, 'faces': 0, 'failed': {}}
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as pool:
+            run_tasks(pool, pending, sink, checkpoint_path, checkpoint, in_flight=args.workers * 2,
+                      stride=args.stride, total=len(tasks), report=report)
+
+    except KeyboardInterrupt:
+        print(f"\n⏸️  Interrumpido: se reanuda desde {checkpoint_path}")
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - started
+    frames = report['frames']
+    print(f"\n✅ {frames} frames analizados en {elapsed:.1f}s "
+          f"({frames / elapsed if elapsed else 0:.1f} frames/s), {report['faces']} rostros")
+    if report['failed']:
+        print(f"❌ {len(report['failed'])} tareas fallidas (se reintentan al reanudar):")
+        for task_id, error in report['failed'].items():
+            print(f"   {task_id}: {error}")
+
+
+if __name__ == "__main__":
+    main()
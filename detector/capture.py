@@ -0,0 +1,100 @@
+"""
+Fuentes de video
+Una fuente es un índice de cámara, un archivo de video o una URL
+(RTSP/HTTP). CAMERA_SOURCES las lista separadas por coma, cada una con
+un nombre opcional ('sala1=rtsp://...'); ese nombre es el source_id que
+se guarda con cada detección.
+
+Sin CAMERA_SOURCES se usa CAMERA_INDEX (una sola cámara, como antes).
+"""
+
+import os
+from typing import List, NamedTuple, Union
+from urllib.parse import urlparse
+
+import cv2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ======================== CONFIGURACIÓN ========================
+
+CAMERA_INDEX = int(os.getenv('CAMERA_INDEX', 0))
+CAMERA_SOURCES = os.getenv('CAMERA_SOURCES', '')  # '0,sala2=rtsp://host:8554/sala2,grabacion.mp4'
+
+STREAM_SCHEMES = ('rtsp', 'rtsps', 'rtmp', 'http', 'https', 'udp', 'tcp')
+
+# ======================== FUENTES ========================
+
+class VideoSource(NamedTuple):
+    source_id: str
+    uri: Union[int, str]
+
+    @property
+    def live(self) -> bool:
+        """Cámara o stream: al cortarse se reconecta (un archivo termina)"""
+        return isinstance(self.uri, int) or urlparse(self.uri).scheme in STREAM_SCHEMES
+
+
+def _default_id(uri: Union[int, str]) -> str:
+    if isinstance(uri, int):
+        return f"cam{uri}"
+    parsed = urlparse(uri)
+    if parsed.scheme in STREAM_SCHEMES:
+        path = parsed.path.strip('/').replace('/', '_')
+        return path or parsed.hostname or uri
+    return os.path.splitext(os.path.basename(uri))[0]
+
+
+def parse_source(spec: str) -> VideoSource:
+    """
+    'sala1=rtsp://host/sala1' → VideoSource('sala1', 'rtsp://host/sala1')
+    '1' → VideoSource('cam1', 1)
+    """
+    spec = spec.strip()
+    name = ''
+    # Un '=' antes de '://' (o sin esquema) separa el nombre
+    head = spec.split('://', 1)[0]
+    if '=' in head:
+        name, spec = spec.split('=', 1)
+
+    uri: Union[int, str] = int(spec) if spec.isdigit() else spec
+    return VideoSource(name.strip() or _default_id(uri), uri)
+
+
+def parse_sources(specs: Union[str, List[str]] = CAMERA_SOURCES) -> List[VideoSource]:
+    """
+    Fuentes configuradas (nombres repetidos se numeran)
+
+    Args:
+        specs: Lista o texto separado por coma; vacío = CAMERA_INDEX
+    """
+    if isinstance(specs, str):
+        specs = [spec for spec in specs.split(',') if spec.strip()]
+    if not specs:
+        specs = [str(CAMERA_INDEX)]
+
+    sources = []
+    seen = {}
+    for spec in specs:
+        source = parse_source(spec)
+        count = seen.get(source.source_id, 0)
+        seen[source.source_id] = count + 1
+        if count:
+            source = source._replace(source_id=f"{source.source_id}_{count + 1}")
+        sources.append(source)
+    return sources
+
+
+def open_capture(source: VideoSource) -> cv2.VideoCapture:
+    """
+    Abre la fuente; en vivo con un buffer de 1 frame para leer siempre
+    el más reciente en lugar de acumular retraso
+    """
+    if isinstance(source.uri, int):
+        cap = cv2.VideoCapture(source.uri)
+    else:
+        cap = cv2.VideoCapture(source.uri, cv2.CAP_FFMPEG)
+    if source.live:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
@@ -3,15 +3,476 @@ Módulo de conexión y operaciones con MongoDB Atlas
 """
 
 import os
+import sys
+import queue
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-from pymongo import MongoClient, DESCENDING
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from typing import Callable, List, Dict, Optional
+from bson import ObjectId
+from pymongo import MongoClient, ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError, ServerSelectionTimeoutError
 from dotenv import load_dotenv
 
+# Agregar el directorio padre al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector import metrics
+from detector.events import ChangeStreamWatcher, EventBus, event_document
+from detector.spool import EmotionSpool, PartialInsertError, SpoolReplayer
+
 # Cargar variables de entorno
 load_dotenv()
 
+# Escritura por lotes
+BATCH_SIZE = int(os.getenv('MONGODB_BATCH_SIZE', 100))
+FLUSH_INTERVAL = float(os.getenv('MONGODB_FLUSH_INTERVAL', 1.0))  # segundos
+QUEUE_SIZE = int(os.getenv('MONGODB_QUEUE_SIZE', 10000))
+QUEUE_POLICY = os.getenv('MONGODB_QUEUE_POLICY', 'block')  # 'block' o 'drop'
+QUEUE_BLOCK_TIMEOUT = 0.5  # segundos máximos de espera con policy 'block'
+FLUSH_POLL = 0.5           # segundos entre chequeos de que el hilo siga vivo
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Marca (solo en el spool) de documentos que pudieron quedar escritos sin
+# que el servidor lo confirmara; se quita antes de insertarlos
+UNCONFIRMED_FIELD = '_unconfirmed'
+
+# Índices declarados en código; se crean (idempotente) al conectar
+EMOTION_INDEXES = [
+    IndexModel([('timestamp', DESCENDING)], name='timestamp_desc'),
+    IndexModel([('date', ASCENDING), ('hour', ASCENDING)], name='date_hour'),
+    IndexModel([('date', ASCENDING), ('timestamp', DESCENDING)], name='date_timestamp'),
+    IndexModel([('metadata.session_id', ASCENDING)], name='session_id'),
+]
+
+ROLLUP_INDEXES = [
+    IndexModel([('bucket', ASCENDING)], name='bucket'),
+    IndexModel([('date', ASCENDING), ('hour', ASCENDING)], name='date_hour'),
+]
+
+# Granularidades de get_range_summary: formato del periodo y paso
+RANGE_GRANULARITIES = {
+    'day': ('%Y-%m-%d', timedelta(days=1)),
+    'hour': ('%Y-%m-%dT%H', timedelta(hours=1))
+}
+
+# Rango máximo por granularidad (cada periodo es una fila de la respuesta)
+RANGE_MAX_SPAN = {
+    'day': timedelta(days=int(os.getenv('RANGE_MAX_DAYS', 366))),
+    'hour': timedelta(days=int(os.getenv('RANGE_MAX_HOURLY_DAYS', 31)))
+}
+
+
+def ensure_indexes(collection, rollups):
+    """
+    Crea los índices declarados si no existen
+    
+    create_indexes no hace nada con los índices que ya existen con la
+    misma especificación, así que es seguro llamarlo en cada arranque.
+    """
+    collection.create_indexes(EMOTION_INDEXES)
+    rollups.create_indexes(ROLLUP_INDEXES)
+
+
+def _winning_plan_stages(explain: Dict) -> List[str]:
+    """Etapas de todos los winningPlan de una salida de explain"""
+    stages = []
+    
+    def collect(node):
+        if isinstance(node, dict):
+            if isinstance(node.get('stage'), str):
+                stages.append(node['stage'])
+            for value in node.values():
+                collect(value)
+        elif isinstance(node, list):
+            for value in node:
+                collect(value)
+    
+    def find_plans(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == 'winningPlan':
+                    collect(value)
+                else:
+                    find_plans(value)
+        elif isinstance(node, list):
+            for value in node:
+                find_plans(value)
+    
+    find_plans(explain)
+    return stages
+
+
+def bucket_start(date: str, hour: int) -> datetime:
+    """Inicio del bucket horario de una fecha 'YYYY-MM-DD' y hora"""
+    return datetime.strptime(date, '%Y-%m-%d') + timedelta(hours=hour)
+
+
+def rollup_updates(documents: List[Dict]) -> List[UpdateOne]:
+    """
+    Arma los $inc de los buckets horarios para un lote de documentos
+    
+    Cada bucket es un documento por hora con contador y suma de
+    confianza por emoción:
+        {_id: '2024-01-15T14', bucket, date, hour, total,
+         emotions: {'Felicidad': {count, confidence_sum}, ...}}
+    """
+    increments = {}
+    for doc in documents:
+        key = (doc['date'], doc['hour'])
+        inc = increments.setdefault(key, {'total': 0})
+        inc['total'] += 1
+        
+        prefix = f"emotions.{doc['emotion']}"
+        inc[f'{prefix}.count'] = inc.get(f'{prefix}.count', 0) + 1
+        inc[f'{prefix}.confidence_sum'] = inc.get(f'{prefix}.confidence_sum', 0.0) + doc['confidence']
+    
+    return [
+        UpdateOne(
+            {'_id': f'{date}T{hour:02d}'},
+            {
+                '$setOnInsert': {'bucket': bucket_start(date, hour), 'date': date, 'hour': hour},
+                '$inc': inc
+            },
+            upsert=True
+        )
+        for (date, hour), inc in increments.items()
+    ]
+
+
+def build_emotion_document(emotion: str, confidence: float,
+                           metadata: Optional[Dict] = None,
+                           timestamp: Optional[datetime] = None,
+                           document_id: Optional[ObjectId] = None) -> Dict:
+    """
+    Arma el documento completo de una detección
+    
+    El _id se genera localmente para que los reintentos sean idempotentes.
+    El análisis por lotes pasa la hora de la grabación y un _id
+    determinista para que reanudar no duplique documentos.
+    """
+    now = timestamp or datetime.now()
+    return {
+        '_id': document_id or ObjectId(),
+        'emotion': emotion,
+        'confidence': confidence,
+        'timestamp': now,
+        'date': now.strftime('%Y-%m-%d'),
+        'time': now.strftime('%H:%M:%S'),
+        'hour': now.hour,
+        'day_of_week': now.strftime('%A'),
+        'metadata': metadata or {}
+    }
+
+
+# ======================== CONSULTAS COMPARTIDAS ========================
+# Filtros y armado de resultados comunes a EmotionDatabase (pymongo) y
+# AsyncEmotionDatabase (motor): cada clase solo ejecuta las consultas
+
+def stringify_ids(documents: List[Dict]) -> List[Dict]:
+    """Convierte ObjectId a string para JSON"""
+    for document in documents:
+        document['_id'] = str(document['_id'])
+    return documents
+
+
+def stats_start_bucket(hours: int) -> datetime:
+    """Primer bucket horario de la ventana de get_emotion_stats"""
+    start_time = datetime.now() - timedelta(hours=hours)
+    return start_time.replace(minute=0, second=0, microsecond=0)
+
+
+def summarize_rollups(buckets, hours: int) -> Dict:
+    """
+    Suma buckets horarios en el formato de get_emotion_stats
+    
+    Args:
+        buckets: Documentos de rollup con el campo 'emotions'
+        hours: Ventana consultada (se informa en 'period_hours')
+    """
+    totals = {}
+    for bucket in buckets:
+        for emotion, data in bucket.get('emotions', {}).items():
+            acc = totals.setdefault(emotion, {'count': 0, 'confidence_sum': 0.0})
+            acc['count'] += data.get('count', 0)
+            acc['confidence_sum'] += data.get('confidence_sum', 0.0)
+    
+    results = sorted(
+        ((emotion, acc) for emotion, acc in totals.items() if acc['count'] > 0),
+        key=lambda item: item[1]['count'],
+        reverse=True
+    )
+    
+    # Formatear resultados
+    stats = {
+        'period_hours': hours,
+        'total_detections': sum(acc['count'] for _, acc in results),
+        'emotions': {
+            emotion: {
+                'count': acc['count'],
+                'avg_confidence': round(acc['confidence_sum'] / acc['count'], 3)
+            }
+            for emotion, acc in results
+        }
+    }
+    
+    # Calcular emoción dominante
+    stats['dominant_emotion'] = results[0][0] if results else None
+    return stats
+
+
+def hourly_from_rollups(buckets) -> Dict:
+    """Buckets de un día → {hora: {emoción: count}} sin horas vacías"""
+    hourly = {}
+    for bucket in buckets:
+        counts = {
+            emotion: data['count']
+            for emotion, data in bucket.get('emotions', {}).items()
+            if data.get('count')
+        }
+        if counts:
+            hourly[bucket['hour']] = counts
+    return hourly
+
+
+def validate_range(start: datetime, end: datetime, granularity: str):
+    """
+    Rechaza granularidades desconocidas, rangos invertidos y rangos más
+    largos que RANGE_MAX_SPAN
+    
+    Raises:
+        ValueError: Con el motivo, para devolverlo al cliente
+    """
+    if granularity not in RANGE_GRANULARITIES:
+        raise ValueError(f"granularity debe ser uno de {list(RANGE_GRANULARITIES)}")
+    if end <= start:
+        raise ValueError("Rango inválido: start debe ser anterior a end")
+    max_span = RANGE_MAX_SPAN[granularity]
+    if end - start > max_span:
+        raise ValueError(f"Rango demasiado largo para granularity='{granularity}': "
+                         f"máximo {max_span.days} días")
+
+
+def empty_range_summary(start: datetime, end: datetime, granularity: str) -> Dict:
+    """Todos los periodos del rango, en orden y vacíos (ver validate_range)"""
+    validate_range(start, end, granularity)
+    
+    date_format, step = RANGE_GRANULARITIES[granularity]
+    summary = {}
+    cursor_time = start.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        cursor_time = cursor_time.replace(hour=0)
+    while cursor_time < end:
+        summary[cursor_time.strftime(date_format)] = {'total': 0, 'emotions': {}}
+        cursor_time += step
+    return summary
+
+
+def range_pipeline(start: datetime, end: datetime, granularity: str) -> List[Dict]:
+    """Agregación de get_range_summary sobre los buckets horarios"""
+    date_format, _ = RANGE_GRANULARITIES[granularity]
+    return [
+        {
+            '$match': {'bucket': {'$gte': start, '$lt': end}}
+        },
+        {
+            '$project': {
+                'period': {'$dateToString': {'format': date_format, 'date': '$bucket'}},
+                'emotions': {'$objectToArray': '$emotions'}
+            }
+        },
+        {
+            '$unwind': '$emotions'
+        },
+        {
+            '$group': {
+                '_id': {
+                    'period': '$period',
+                    'emotion': '$emotions.k'
+                },
+                'count': {'$sum': '$emotions.v.count'}
+            }
+        }
+    ]
+
+
+def merge_range_results(summary: Dict, results) -> Dict:
+    """Vuelca los resultados del $group en el resumen por periodo"""
+    for r in results:
+        period = summary.setdefault(r['_id']['period'], {'total': 0, 'emotions': {}})
+        period['total'] += r['count']
+        period['emotions'][r['_id']['emotion']] = r['count']
+    return summary
+
+
+class BufferedWriter:
+    """
+    Escritor en segundo plano para inserciones
+
+    Los documentos se acumulan en una cola en memoria y un hilo los
+    envía con insert_many(ordered=False) cuando se junta un lote o
+    vence el intervalo de flush.
+    """
+
+    _STOP = object()
+
+    def __init__(self, write_fn: Callable[[List[Dict]], List[Dict]],
+                 on_error: Optional[Callable[[List[Dict]], None]] = None,
+                 batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL,
+                 max_queue: int = QUEUE_SIZE, policy: str = QUEUE_POLICY):
+        """
+        Args:
+            write_fn: Inserta un lote y retorna los documentos insertados
+            on_error: Recibe el lote si write_fn falla (p. ej. el spool)
+            batch_size: Documentos por insert_many
+            flush_interval: Segundos máximos que un documento espera en cola
+            max_queue: Documentos en cola antes de aplicar la política
+            policy: 'block' (espera breve y luego descarta) o 'drop'
+        """
+        self.write_fn = write_fn
+        self.on_error = on_error
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+        self.flushed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.spooled = 0
+
+        self._thread = threading.Thread(target=self._run, name='mongo-writer', daemon=True)
+        self._thread.start()
+
+    def put(self, document: Dict) -> bool:
+        """
+        Encola un documento sin esperar a MongoDB
+
+        Returns:
+            False si la cola estaba llena y el documento se descartó
+        """
+        try:
+            if self.policy == 'block':
+                self._queue.put(document, timeout=QUEUE_BLOCK_TIMEOUT)
+            else:
+                self._queue.put_nowait(document)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que se escriba todo lo encolado hasta ahora
+
+        Returns:
+            True si el flush terminó antes del timeout; False si venció
+            o el hilo del escritor ya no corre
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = threading.Event()
+
+        # Por tramos: si el hilo murió nadie va a sacar ni marcar el evento
+        while True:
+            if not self._thread.is_alive():
+                return False
+            wait = FLUSH_POLL if deadline is None else min(FLUSH_POLL, max(0.0, deadline - time.monotonic()))
+            try:
+                self._queue.put(done, timeout=wait)
+                break
+            except queue.Full:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+
+        while True:
+            wait = FLUSH_POLL if deadline is None else min(FLUSH_POLL, max(0.0, deadline - time.monotonic()))
+            if done.wait(wait):
+                return True
+            if not self._thread.is_alive():
+                return done.is_set()
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def close(self, timeout: float = 10.0):
+        """Escribe lo pendiente y detiene el hilo"""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        """Contadores del escritor"""
+        return {
+            'pending': self._queue.qsize() + self._in_flight,
+            'flushed': self.flushed,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'spooled': self.spooled
+        }
+
+    def _run(self):
+        """Bucle del hilo: arma lotes por tamaño o por tiempo"""
+        batch = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, dict):
+                batch.append(item)
+                with self._lock:
+                    self._in_flight = len(batch)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+
+            # Lote completo, intervalo vencido, flush explícito o cierre
+            if batch:
+                self._write(batch)
+                batch = []
+            deadline = None
+            with self._lock:
+                self._in_flight = 0
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is self._STOP:
+                return
+
+    def _write(self, batch: List[Dict]):
+        """Envía un lote; si MongoDB falla, lo que no llegó va a on_error"""
+        try:
+            self.flushed += len(self.write_fn(batch))
+            return
+        except PartialInsertError as e:
+            self.flushed += len(e.inserted)
+            batch, error = e.remaining, e
+        except Exception as e:
+            error = e
+
+        if batch:
+            if self.on_error is None:
+                self.failed += len(batch)
+                print(f"⚠️  Error al insertar lote de {len(batch)} emociones: {error}")
+                return
+            try:
+                self.on_error(batch)
+                self.spooled += len(batch)
+            except Exception as spool_error:
+                self.failed += len(batch)
+                print(f"⚠️  Lote de {len(batch)} emociones perdido: {spool_error}")
+
+
 class EmotionDatabase:
     """Clase para manejar operaciones con MongoDB"""
     
@@ -20,6 +481,8 @@ class EmotionDatabase:
         self.uri = os.getenv('MONGODB_URI')
         self.db_name = os.getenv('MONGODB_DATABASE', 'Emotions')
         self.collection_name = os.getenv('MONGODB_COLLECTION', 'emotions_log')
+        self.rollup_collection_name = os.getenv('MONGODB_ROLLUP_COLLECTION',
+                                                f'{self.collection_name}_hourly')
         
         if not self.uri:
             raise ValueError("⚠️  MONGODB_URI no está configurado en el archivo .env")
@@ -27,7 +490,26 @@ class EmotionDatabase:
         self.client = None
         self.db = None
         self.collection = None
-        self._connect()
+        self.rollups = None
+        self.writer = None
+        self.spool = None
+        self.replayer = None
+        self._flush_listeners: List[Callable[[List[Dict]], None]] = []
+        self.events = EventBus()
+        self.change_watcher = None
+        try:
+            self._connect()
+        except Exception:
+            # Un intento fallido no deja vivo el cliente ni sus hilos de monitoreo
+            if self.client:
+                self.client.close()
+                self.client = None
+            raise
+        
+        # Spool local: guarda lo que no se pudo escribir y lo reenvía después
+        self.spool = EmotionSpool()
+        self.replayer = SpoolReplayer(self.spool, self._insert_documents)
+        self.writer = BufferedWriter(self._insert_documents, on_error=self.spool.append)
     
     def _connect(self):
         """Establece conexión con MongoDB"""
@@ -44,6 +526,13 @@ class EmotionDatabase:
             
             self.db = self.client[self.db_name]
             self.collection = self.db[self.collection_name]
+            self.rollups = self.db[self.rollup_collection_name]
+            
+            try:
+                ensure_indexes(self.collection, self.rollups)
+            except Exception as e:
+                # Un índice con el mismo nombre y otra definición no impide operar
+                print(f"⚠️  No se pudieron crear los índices: {e}")
             
             print(f"✅ Conectado a MongoDB Atlas")
             print(f"   📊 Base de datos: {self.db_name}")
@@ -60,7 +549,11 @@ class EmotionDatabase:
     def insert_emotion(self, emotion: str, confidence: float, 
                       metadata: Optional[Dict] = None) -> str:
         """
-        Inserta una nueva detección de emoción
+        Encola una nueva detección de emoción
+        
+        Retorna inmediatamente; el documento se escribe en segundo plano
+        junto con otros (ver BufferedWriter). Si MongoDB está lento o
+        caído, el documento completo queda en el spool local.
         
         Args:
             emotion: Nombre de la emoción detectada
@@ -68,27 +561,159 @@ class EmotionDatabase:
             metadata: Datos adicionales opcionales
             
         Returns:
-            ID del documento insertado
+            ID del documento (generado localmente)
         """
         try:
-            document = {
-                'emotion': emotion,
-                'confidence': confidence,
-                'timestamp': datetime.now(),
-                'date': datetime.now().strftime('%Y-%m-%d'),
-                'time': datetime.now().strftime('%H:%M:%S'),
-                'hour': datetime.now().hour,
-                'day_of_week': datetime.now().strftime('%A'),
-                'metadata': metadata or {}
-            }
+            document = build_emotion_document(emotion, confidence, metadata)
             
-            result = self.collection.insert_one(document)
-            return str(result.inserted_id)
+            if not self.writer.put(document):
+                # MongoDB lento: la cola está llena, va directo al spool
+                self.spool.append([document])
+            
+            # Con change stream activo el evento llega desde MongoDB
+            if not (self.change_watcher and self.change_watcher.active):
+                self.events.publish({'type': 'emotion', 'document': event_document(document)})
+            
+            return str(document['_id'])
             
         except Exception as e:
             print(f"⚠️  Error al insertar emoción: {e}")
             return None
     
+    def insert_documents(self, documents: List[Dict], chunk_size: int = 1000) -> int:
+        """
+        Carga masiva síncrona (sin cola ni spool), p. ej. análisis por lotes
+        
+        Idempotente como el reenvío del spool: los _id repetidos se ignoran.
+        
+        Returns:
+            Documentos insertados
+        """
+        inserted = 0
+        for i in range(0, len(documents), chunk_size):
+            inserted += len(self._insert_documents(documents[i:i + chunk_size]))
+        return inserted
+    
+    def _insert_documents(self, documents: List[Dict]) -> List[Dict]:
+        """
+        insert_many idempotente: los _id ya existentes (reintentos del
+        spool) se ignoran
+        
+        Los rollups y los listeners reciben solo lo que el servidor
+        confirmó. Si la conexión se corta a mitad del lote se consulta
+        qué _id llegaron; si ni eso se puede, el lote entero se marca
+        (UNCONFIRMED_FIELD) para que al reenviarlo sus duplicados sí
+        sumen a los rollups.
+        
+        Args:
+            documents: Documentos completos con _id
+            
+        Returns:
+            Documentos efectivamente insertados
+            
+        Raises:
+            PartialInsertError: Corte de conexión con parte del lote escrita
+            Errores de conexión de pymongo (el lote debe reintentarse)
+        """
+        # Escritos quizá en un intento anterior cortado, sin sumar a los rollups
+        unconfirmed = {doc['_id'] for doc in documents if doc.pop(UNCONFIRMED_FIELD, False)}
+        
+        try:
+            with metrics.mongo_timer('insert_many'):
+                self.collection.insert_many(documents, ordered=False)
+            inserted = documents
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            rejected = [err for err in errors if err.get('code') != DUPLICATE_KEY_ERROR]
+            if rejected:
+                print(f"⚠️  {len(rejected)} emociones rechazadas por MongoDB: {rejected[0].get('errmsg')}")
+            
+            # Un duplicado marcado llegó en el intento cortado: cuenta ahora
+            failed_indexes = {err['index'] for err in rejected}
+            failed_indexes.update(err['index'] for err in errors if err.get('code') == DUPLICATE_KEY_ERROR
+                                  and documents[err['index']]['_id'] not in unconfirmed)
+            inserted = [doc for i, doc in enumerate(documents) if i not in failed_indexes]
+        except ConnectionFailure as e:
+            try:
+                ids = [doc['_id'] for doc in documents]
+                existing = {doc['_id'] for doc in self.collection.find({'_id': {'$in': ids}}, {'_id': 1})}
+            except PyMongoError:
+                for doc in documents:
+                    doc[UNCONFIRMED_FIELD] = True
+                raise e
+            
+            inserted = [doc for doc in documents if doc['_id'] in existing]
+            remaining = [doc for doc in documents if doc['_id'] not in existing]
+            self._confirm(inserted)
+            if not remaining:
+                return inserted
+            raise PartialInsertError(inserted, remaining, e) from e
+        
+        self._confirm(inserted)
+        return inserted
+    
+    def _confirm(self, inserted: List[Dict]):
+        """Suma a los rollups y avisa a los listeners lo que quedó escrito"""
+        # Solo lo realmente insertado suma a los rollups (los duplicados no)
+        self._update_rollups(inserted)
+        
+        if inserted:
+            for listener in self._flush_listeners:
+                try:
+                    listener(inserted)
+                except Exception as e:
+                    print(f"⚠️  Error en listener de escritura: {e}")
+    
+    def start_change_stream(self) -> ChangeStreamWatcher:
+        """
+        Publica en self.events las inserciones de cualquier proceso
+        usando un change stream (requiere replica set, como Atlas).
+        Sin soporte, los eventos siguen publicándose desde insert_emotion.
+        """
+        if self.change_watcher is None:
+            self.change_watcher = ChangeStreamWatcher(self.collection, self.events)
+        return self.change_watcher
+    
+    def add_flush_listener(self, listener: Callable[[List[Dict]], None]):
+        """
+        Registra una función que se llama con los documentos recién
+        escritos en MongoDB (desde el hilo del escritor o del spool)
+        """
+        self._flush_listeners.append(listener)
+    
+    def _update_rollups(self, documents: List[Dict]):
+        """Aplica los $inc de los buckets horarios"""
+        if not documents:
+            return
+        try:
+            with metrics.mongo_timer('rollup_update'):
+                self.rollups.bulk_write(rollup_updates(documents), ordered=False)
+        except Exception as e:
+            # Los documentos ya están guardados; rebuild_rollups() corrige la diferencia
+            print(f"⚠️  Error al actualizar rollups: {e}")
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que se escriban todas las emociones encoladas
+        
+        Returns:
+            True si terminó antes del timeout
+        """
+        return self.writer.flush(timeout)
+    
+    def writer_stats(self) -> Dict:
+        """
+        Contadores del escritor en segundo plano y del spool
+        
+        Returns:
+            Diccionario con documentos pending, flushed, failed, dropped,
+            spooled y el estado del spool
+        """
+        stats = self.writer.stats()
+        stats['spool'] = self.spool.stats()
+        stats['spool']['replayed'] = self.replayer.replayed
+        return stats
+    
     def get_recent_emotions(self, limit: int = 50) -> List[Dict]:
         """
         Obtiene las emociones más recientes
@@ -101,13 +726,7 @@ class EmotionDatabase:
         """
         try:
             cursor = self.collection.find().sort('timestamp', DESCENDING).limit(limit)
-            emotions = list(cursor)
-            
-            # Convertir ObjectId a string para JSON
-            for emotion in emotions:
-                emotion['_id'] = str(emotion['_id'])
-                
-            return emotions
+            return stringify_ids(list(cursor))
             
         except Exception as e:
             print(f"⚠️  Error al obtener emociones: {e}")
@@ -125,12 +744,7 @@ class EmotionDatabase:
         """
         try:
             cursor = self.collection.find({'date': date}).sort('timestamp', DESCENDING)
-            emotions = list(cursor)
-            
-            for emotion in emotions:
-                emotion['_id'] = str(emotion['_id'])
-                
-            return emotions
+            return stringify_ids(list(cursor))
             
         except Exception as e:
             print(f"⚠️  Error al obtener emociones por fecha: {e}")
@@ -140,6 +754,10 @@ class EmotionDatabase:
         """
         Obtiene estadísticas de emociones en las últimas N horas
         
+        Lee los buckets horarios (a lo sumo N+1 documentos) en lugar de
+        recorrer las detecciones crudas. La ventana se alinea al inicio
+        de la hora, así que puede incluir hasta una hora extra.
+        
         Args:
             hours: Número de horas hacia atrás
             
@@ -147,50 +765,8 @@ class EmotionDatabase:
             Diccionario con estadísticas
         """
         try:
-            # Calcular timestamp de inicio
-            start_time = datetime.now() - timedelta(hours=hours)
-            
-            # Agregación para contar emociones
-            pipeline = [
-                {
-                    '$match': {
-                        'timestamp': {'$gte': start_time}
-                    }
-                },
-                {
-                    '$group': {
-                        '_id': '$emotion',
-                        'count': {'$sum': 1},
-                        'avg_confidence': {'$avg': '$confidence'}
-                    }
-                },
-                {
-                    '$sort': {'count': -1}
-                }
-            ]
-            
-            results = list(self.collection.aggregate(pipeline))
-            
-            # Formatear resultados
-            stats = {
-                'period_hours': hours,
-                'total_detections': sum(r['count'] for r in results),
-                'emotions': {
-                    r['_id']: {
-                        'count': r['count'],
-                        'avg_confidence': round(r['avg_confidence'], 3)
-                    }
-                    for r in results
-                }
-            }
-            
-            # Calcular emoción dominante
-            if results:
-                stats['dominant_emotion'] = results[0]['_id']
-            else:
-                stats['dominant_emotion'] = None
-            
-            return stats
+            buckets = self.rollups.find({'bucket': {'$gte': stats_start_bucket(hours)}}, {'emotions': 1})
+            return summarize_rollups(buckets, hours)
             
         except Exception as e:
             print(f"⚠️  Error al calcular estadísticas: {e}")
@@ -200,6 +776,8 @@ class EmotionDatabase:
         """
         Obtiene la distribución de emociones por hora
         
+        Lee los buckets horarios de la fecha (a lo sumo 24 documentos).
+        
         Args:
             date: Fecha específica (None para hoy)
             
@@ -209,43 +787,141 @@ class EmotionDatabase:
         try:
             target_date = date or datetime.now().strftime('%Y-%m-%d')
             
-            pipeline = [
-                {
-                    '$match': {'date': target_date}
-                },
-                {
-                    '$group': {
-                        '_id': {
-                            'hour': '$hour',
-                            'emotion': '$emotion'
-                        },
-                        'count': {'$sum': 1}
-                    }
-                },
-                {
-                    '$sort': {'_id.hour': 1}
-                }
-            ]
-            
-            results = list(self.collection.aggregate(pipeline))
+            cursor = self.rollups.find(
+                {'date': target_date},
+                {'hour': 1, 'emotions': 1}
+            ).sort('hour', 1)
             
             # Organizar por hora
-            hourly = {}
-            for r in results:
-                hour = r['_id']['hour']
-                emotion = r['_id']['emotion']
-                
-                if hour not in hourly:
-                    hourly[hour] = {}
-                
-                hourly[hour][emotion] = r['count']
-            
-            return hourly
+            return hourly_from_rollups(cursor)
             
         except Exception as e:
             print(f"⚠️  Error al obtener distribución horaria: {e}")
             return {}
     
+    def get_range_summary(self, start: datetime, end: datetime,
+                          granularity: str = 'day') -> Dict:
+        """
+        Resume las emociones de un rango en una sola agregación
+        
+        El $group corre en el servidor sobre los buckets horarios, así
+        que el costo depende de la cantidad de horas del rango y no de la
+        cantidad de detecciones.
+        
+        Args:
+            start: Inicio del rango (inclusive)
+            end: Fin del rango (exclusivo)
+            granularity: 'day' o 'hour'
+            
+        Returns:
+            Diccionario {periodo: {'total': int, 'emotions': {emoción: count}}}
+            con todos los periodos del rango, incluso los vacíos
+        """
+        # Periodos vacíos incluidos, en orden
+        summary = empty_range_summary(start, end, granularity)
+        
+        try:
+            results = self.rollups.aggregate(range_pipeline(start, end, granularity))
+            return merge_range_results(summary, results)
+            
+        except Exception as e:
+            print(f"⚠️  Error al obtener resumen del rango: {e}")
+            return {}
+    
+    def rebuild_rollups(self) -> int:
+        """
+        Reconstruye los buckets horarios desde las detecciones crudas
+        
+        Para datos anteriores a los rollups o para corregir diferencias.
+        Ejecutar con el detector y la API detenidos: las inserciones
+        durante la reconstrucción podrían contarse dos veces.
+        
+        Returns:
+            Cantidad de buckets generados
+        """
+        pipeline = [
+            {
+                '$group': {
+                    '_id': {
+                        'date': '$date',
+                        'hour': '$hour',
+                        'emotion': '$emotion'
+                    },
+                    'count': {'$sum': 1},
+                    'confidence_sum': {'$sum': '$confidence'}
+                }
+            }
+        ]
+        
+        buckets = {}
+        for r in self.collection.aggregate(pipeline, allowDiskUse=True):
+            date, hour, emotion = r['_id']['date'], r['_id']['hour'], r['_id']['emotion']
+            if date is None or hour is None or emotion is None:
+                continue
+            
+            bucket = buckets.setdefault((date, hour), {
+                '_id': f'{date}T{hour:02d}',
+                'bucket': bucket_start(date, hour),
+                'date': date,
+                'hour': hour,
+                'total': 0,
+                'emotions': {}
+            })
+            bucket['total'] += r['count']
+            bucket['emotions'][emotion] = {
+                'count': r['count'],
+                'confidence_sum': r['confidence_sum']
+            }
+        
+        self.rollups.delete_many({})
+        if buckets:
+            self.rollups.insert_many(list(buckets.values()), ordered=False)
+        
+        return len(buckets)
+    
+    def check_indexes(self) -> List[Dict]:
+        """
+        Verifica con explain que cada consulta use un índice
+        
+        Returns:
+            Por consulta: nombre, etapas del plan ganador, si usa índice
+            y si ordena en memoria
+        """
+        now = datetime.now()
+        today = now.strftime('%Y-%m-%d')
+        day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        # Misma forma que las consultas de los métodos de la clase
+        explains = {
+            'get_recent_emotions': lambda: self.collection.find()
+                .sort('timestamp', DESCENDING).limit(50).explain(),
+            'get_emotions_by_date': lambda: self.collection.find({'date': today})
+                .sort('timestamp', DESCENDING).explain(),
+            'session_lookup': lambda: self.collection.find({'metadata.session_id': 'check'})
+                .explain(),
+            'get_emotion_stats': lambda: self.rollups.find({'bucket': {'$gte': day_start}},
+                                                           {'emotions': 1}).explain(),
+            'get_hourly_distribution': lambda: self.rollups.find({'date': today},
+                                                                 {'hour': 1, 'emotions': 1})
+                .sort('hour', 1).explain(),
+            'get_range_summary': lambda: self.db.command(
+                'aggregate', self.rollup_collection_name,
+                pipeline=[{'$match': {'bucket': {'$gte': day_start, '$lt': now}}}],
+                explain=True
+            ),
+        }
+        
+        report = []
+        for name, explain in explains.items():
+            stages = _winning_plan_stages(explain())
+            report.append({
+                'query': name,
+                'stages': stages,
+                'uses_index': bool(stages) and 'COLLSCAN' not in stages,
+                'in_memory_sort': 'SORT' in stages
+            })
+        return report
+    
     def test_connection(self) -> bool:
         """
         Prueba la conexión a MongoDB
@@ -255,7 +931,8 @@ class EmotionDatabase:
         """
         try:
             self.client.admin.command('ping')
-            count = self.collection.count_documents({})
+            # Conteo desde los metadatos de la colección (sin recorrerla)
+            count = self.collection.estimated_document_count()
             print(f"✅ Conexión exitosa. Documentos en colección: {count}")
             return True
         except Exception as e:
@@ -263,7 +940,16 @@ class EmotionDatabase:
             return False
     
     def close(self):
-        """Cierra la conexión a MongoDB"""
+        """Escribe lo pendiente y cierra la conexión a MongoDB"""
+        if self.writer:
+            self.writer.close()
+        if self.change_watcher:
+            self.change_watcher.stop()
+        if self.replayer:
+            self.replayer.stop()
+        if self.spool:
+            self.spool.close()
+            
         if self.client:
             self.client.close()
             print("🔌 Conexión a MongoDB cerrada")
@@ -273,8 +959,55 @@ class EmotionDatabase:
 # Script de prueba
 # ============================================
 
+def check_indexes():
+    """Reporta las consultas que no usan índice"""
+    print("\n🔍 Verificando planes de consulta (explain)...\n")
+    db = EmotionDatabase()
+    try:
+        report = db.check_indexes()
+        for entry in report:
+            icon = '✅' if entry['uses_index'] else '❌'
+            note = ' (ordena en memoria)' if entry['in_memory_sort'] else ''
+            print(f"   {icon} {entry['query']:25} {' → '.join(entry['stages'])}{note}")
+        
+        missing = [entry['query'] for entry in report if not entry['uses_index']]
+        if missing:
+            print(f"\n❌ Consultas sin índice: {', '.join(missing)}")
+        else:
+            print("\n✅ Todas las consultas usan índice")
+        return not missing
+    finally:
+        db.close()
+
+
+def backfill_rollups():
+    """Construye los rollups horarios a partir de los datos existentes"""
+    print("\n🔄 Reconstruyendo rollups horarios desde las detecciones crudas...")
+    db = EmotionDatabase()
+    try:
+        count = db.rebuild_rollups()
+        print(f"✅ {count} buckets horarios generados en '{db.rollup_collection_name}'")
+    finally:
+        db.close()
+
+
 if __name__ == "__main__":
     """Prueba de conexión y operaciones básicas"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Utilidades de MongoDB del detector de emociones")
+    parser.add_argument('--backfill-rollups', action='store_true',
+                        help="Reconstruir los rollups horarios desde los datos existentes")
+    parser.add_argument('--check-indexes', action='store_true',
+                        help="Verificar con explain que todas las consultas usen índice")
+    args = parser.parse_args()
+    
+    if args.backfill_rollups:
+        backfill_rollups()
+        sys.exit(0)
+    
+    if args.check_indexes:
+        sys.exit(0 if check_indexes() else 1)
     
     print("\n" + "="*60)
     print("🧪 PRUEBA DE CONEXIÓN A MONGODB ATLAS")
@@ -297,6 +1030,7 @@ if __name__ == "__main__":
             )
             
             if emotion_id:
+                db.flush()
                 print(f"✅ Emoción insertada con ID: {emotion_id}")
             
             # Obtener estadísticas
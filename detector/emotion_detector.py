@@ -9,11 +9,20 @@ import numpy as np
 from datetime import datetime
 import sys
 import os
+import time
 
 # Agregar el directorio padre al path para imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from detector.database import EmotionDatabase
+from detector import metrics
+from detector.capture import open_capture, parse_sources
+from detector.database import EmotionDatabase, build_emotion_document
+from detector.spool import EmotionSpool
+from detector.emotion_model import get_engine
+from detector.face_detection import FaceDetectionPipeline
+from detector.face_detectors import create_face_detector
+from detector.scheduler import InferenceScheduler
+from detector.tracking import FaceTracker
 
 # Manejo de colores en terminal
 try:
@@ -27,7 +36,6 @@ except ImportError:
 from dotenv import load_dotenv
 load_dotenv()
 
-CAMERA_INDEX = int(os.getenv('CAMERA_INDEX', 0))
 CONFIDENCE_THRESHOLD = float(os.getenv('CONFIDENCE_THRESHOLD', 0.5))
 LOG_FILE = 'emotion_logs.txt'  # Backup local
 
@@ -82,70 +90,30 @@ def print_header():
     print("=" * 63)
 
 def load_emotion_model():
-    """Carga el modelo de emociones usando DeepFace"""
+    """Carga el modelo de emociones una sola vez (EmotionEngine)"""
     try:
-        from deepface import DeepFace
         print_colored("🔄 Cargando modelo de IA (DeepFace)...", Fore.YELLOW if COLORS_AVAILABLE else None)
         
-        # Predicción dummy para cargar el modelo
-        dummy_img = np.zeros((48, 48, 3), dtype=np.uint8)
-        try:
-            DeepFace.analyze(dummy_img, actions=['emotion'], enforce_detection=False, silent=True)
-        except:
-            pass
+        # Construye el modelo y hace una predicción de calentamiento
+        engine = get_engine().load()
         
         print_colored("✅ Modelo de IA cargado\n", Fore.GREEN if COLORS_AVAILABLE else None)
-        return DeepFace
+        return engine
     except Exception as e:
         print_colored(f"\n❌ ERROR al cargar modelo: {e}", Fore.RED if COLORS_AVAILABLE else None)
         sys.exit(1)
 
-def detect_emotion(face_roi, deepface_module):
+def detect_emotions(face_rois, engine):
     """
-    Detecta la emoción de un rostro usando DeepFace
+    Detecta la emoción de varios rostros en una sola pasada del modelo
     """
     try:
-        # Convertir a RGB
-        face_roi_rgb = cv2.cvtColor(face_roi, cv2.COLOR_GRAY2RGB)
-        face_roi_rgb = cv2.resize(face_roi_rgb, (48, 48), interpolation=cv2.INTER_AREA)
-        
-        # Analizar con DeepFace
-        result = deepface_module.analyze(
-            face_roi_rgb, 
-            actions=['emotion'], 
-            enforce_detection=False,
-            silent=True
-        )
-        
-        if isinstance(result, list):
-            result = result[0]
-        
-        emotion_dict = result['emotion']
-        dominant_emotion = result['dominant_emotion']
-        confidence = emotion_dict[dominant_emotion] / 100.0
-        
-        # Mapear a español
-        emotion_map = {
-            'angry': 'Enojo',
-            'disgust': 'Asco',
-            'fear': 'Miedo',
-            'happy': 'Felicidad',
-            'sad': 'Tristeza',
-            'surprise': 'Sorpresa',
-            'neutral': 'Neutral'
-        }
-        
-        emotion = emotion_map.get(dominant_emotion, 'Neutral')
-        
-        # Retornar también todas las probabilidades
-        all_emotions = {emotion_map.get(k, k): v/100.0 for k, v in emotion_dict.items()}
-        
-        return emotion, confidence, all_emotions
-    
+        return engine.classify(face_rois)
     except Exception as e:
-        return None, 0.0, {}
+        print(f"⚠️  Error en detección: {e}")
+        return [(None, 0.0, {})] * len(face_rois)
 
-def log_emotion(emotion, confidence, all_emotions, db, session_id):
+def log_emotion(emotion, confidence, all_emotions, db, session_id, face_index=0, track_id=None, source_id=None):
     """
     Registra la emoción en terminal, archivo y MongoDB
     """
@@ -154,17 +122,21 @@ def log_emotion(emotion, confidence, all_emotions, db, session_id):
     color = EMOTION_COLORS.get(emotion, None)
     
     # Mensaje para terminal
-    terminal_msg = f"[{timestamp}] {emoji} {emotion:12} ({confidence*100:.1f}%)"
+    terminal_msg = f"[{timestamp}] #{track_id} {emoji} {emotion:12} ({confidence*100:.1f}%)"
     
     # Guardar en MongoDB
     try:
         metadata = {
             'session_id': session_id,
+            'source_id': source_id,
+            'face_index': face_index,
+            'track_id': track_id,
             'all_emotions': all_emotions,
             'source': 'webcam_detector'
         }
         
-        emotion_id = db.insert_emotion(emotion, confidence, metadata)
+        with metrics.timer(metrics.STAGE['db_write']):
+            emotion_id = db.insert_emotion(emotion, confidence, metadata)
         
         if emotion_id:
             terminal_msg += f" [DB: ✅]"
@@ -179,7 +151,7 @@ def log_emotion(emotion, confidence, all_emotions, db, session_id):
         print_colored(terminal_msg, color)
         
         # Backup en archivo
-        file_msg = f"[{timestamp}] {emotion} - Confianza: {confidence*100:.1f}%"
+        file_msg = f"[{timestamp}] #{track_id} {emotion} - Confianza: {confidence*100:.1f}%"
         log_to_file(file_msg)
 
 def print_stats(db, session_start):
@@ -193,7 +165,8 @@ def print_stats(db, session_start):
         duration = (datetime.now() - session_start).total_seconds() / 60
         print(f"⏱️  Duración: {duration:.1f} minutos")
         
-        # Stats de MongoDB
+        # Stats de MongoDB (incluyendo lo que aún está en cola)
+        db.flush(timeout=5)
         stats = db.get_emotion_stats(hours=24)
         
         if stats and stats.get('emotions'):
@@ -214,6 +187,27 @@ def print_stats(db, session_start):
     except Exception as e:
         print(f"⚠️  Error al obtener estadísticas: {e}")
 
+def print_performance(frames, wall_start, cpu_start, tracker, pipeline, scheduler):
+    """Muestra FPS y uso de CPU de la sesión"""
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    if frames == 0 or wall <= 0:
+        return
+    
+    tracking = tracker.stats()
+    mode = f"tracking ({tracking['tracker']}, detección cada {tracking['detect_every']})" if tracking['enabled'] else "detección en cada frame"
+    print(f"\n⚡ Rendimiento: {frames / wall:.1f} FPS | CPU {cpu / wall * 100:.0f}% | {mode}")
+    print(f"   Detecciones completas: {tracking['detections']} de {frames} frames")
+    
+    detection = pipeline.stats()
+    print(f"   Detección a {detection['detection_width'] or 'resolución nativa'} px: "
+          f"{detection['full_scans']} barridos completos, {detection['roi_scans']} por ventana")
+    
+    schedule = scheduler.stats()
+    print(f"   Inferencias: {schedule['runs']} ({schedule['avg_inference_ms']:.1f} ms promedio) | "
+          f"presupuesto usado: {schedule['budget_utilization'] * 100:.0f}%")
+    print(f"   Decisiones: " + ", ".join(f"{reason}={count}" for reason, count in schedule['decisions'].items()))
+
 # ======================== FUNCIÓN PRINCIPAL ========================
 
 def main():
@@ -227,11 +221,15 @@ def main():
         print_colored("✅ MongoDB conectado\n", Fore.GREEN if COLORS_AVAILABLE else None)
     except Exception as e:
         print_colored(f"❌ Error de MongoDB: {e}", Fore.RED if COLORS_AVAILABLE else None)
-        print_colored("⚠️  Continuando sin base de datos...\n", Fore.YELLOW if COLORS_AVAILABLE else None)
+        print_colored("⚠️  Continuando sin base de datos (detecciones en spool local)...\n", Fore.YELLOW if COLORS_AVAILABLE else None)
         db = None
     
+    # Sin DB: los documentos completos se guardan en el spool y se
+    # reenvían la próxima vez que haya conexión
+    spool = EmotionSpool() if db is None else None
+    
     # Cargar modelo de IA
-    deepface = load_emotion_model()
+    engine = load_emotion_model()
     
     # Generar ID de sesión único
     session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -243,13 +241,31 @@ def main():
     log_to_file(f"Session ID: {session_id}")
     log_to_file(f"{'='*60}")
     
-    # Cargar detector de rostros
-    face_cascade = cv2.CascadeClassifier(
-        cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-    )
+    # Cargar detector de rostros (FACE_DETECTOR: haar, lbp, yunet o ssd)
+    try:
+        face_detector = create_face_detector()
+    except Exception as e:
+        print_colored(f"❌ ERROR al cargar el detector de rostros: {e}", Fore.RED if COLORS_AVAILABLE else None)
+        sys.exit(1)
+    
+    # El detector corre sobre una imagen reducida (DETECTION_WIDTH) y primero
+    # en ventanas alrededor de los últimos rostros
+    pipeline = FaceDetectionPipeline(face_detector.detect)
+    
+    # La detección corre cada DETECT_EVERY frames; en el resto se siguen los rostros
+    tracker = FaceTracker(pipeline.detect)
     
-    # Iniciar cámara
-    cap = cv2.VideoCapture(CAMERA_INDEX)
+    # Inferir cuando los rostros cambian, dentro del presupuesto de cómputo
+    scheduler = InferenceScheduler()
+    
+    # Iniciar cámara: la primera fuente de CAMERA_SOURCES (o CAMERA_INDEX);
+    # varias fuentes a la vez con detector/multicam.py
+    sources = parse_sources()
+    source = sources[0]
+    if len(sources) > 1:
+        print_colored(f"ℹ️  {len(sources)} fuentes configuradas, usando {source.source_id} "
+                      f"(para todas: python detector/multicam.py)", Fore.YELLOW if COLORS_AVAILABLE else None)
+    cap = open_capture(source)
     
     if not cap.isOpened():
         print_colored("❌ ERROR: No se pudo acceder a la cámara", Fore.RED if COLORS_AVAILABLE else None)
@@ -261,68 +277,97 @@ def main():
     print("=" * 63)
     
     frame_count = 0
-    last_emotion = None
+    last_emotions = {}  # Última emoción registrada por track_id
     detection_count = 0
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    
+    # Métricas Prometheus opcionales (METRICS_PORT)
+    metrics.start_metrics_server()
+    fps_meter = metrics.FpsMeter('cli')
     
     try:
         while True:
-            ret, frame = cap.read()
+            with metrics.timer(metrics.STAGE['capture']):
+                ret, frame = cap.read()
             
             if not ret:
                 print_colored("⚠️  No se pudo capturar frame", Fore.YELLOW if COLORS_AVAILABLE else None)
                 break
             
             frame_count += 1
+            fps_meter.tick()
             
-            # Convertir a escala de grises
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            # Detectar rostros
-            faces = face_cascade.detectMultiScale(
-                gray, 
-                scaleFactor=1.3, 
-                minNeighbors=5,
-                minSize=(30, 30)
-            )
-            
-            # Procesar el rostro más grande
-            if len(faces) > 0:
-                largest_face = max(faces, key=lambda face: face[2] * face[3])
-                x, y, w, h = largest_face
+            with metrics.timer(metrics.STAGE['detect']):
+                # Convertir a escala de grises
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
                 
-                face_roi = gray[y:y+h, x:x+w]
+                # Detectar o seguir rostros (de izquierda a derecha, con track_id)
+                tracks = tracker.update(gray, frame)
+            faces = [box for _, box in tracks]
+            
+            # Detectar emociones cuando el planificador lo decide, todos los
+            # rostros en un lote (recortados del frame a resolución completa)
+            if scheduler.should_run(gray, tracks):
+                face_rois = [gray[y:y+h, x:x+w] for (x, y, w, h) in faces]
+                inference_start = time.perf_counter()
+                results = detect_emotions(face_rois, engine)
+                inference_time = time.perf_counter() - inference_start
+                scheduler.record(inference_time)
+                metrics.STAGE['infer'].observe(inference_time)
                 
-                # Detectar emoción cada 10 frames
-                if frame_count % 10 == 0:
-                    emotion, confidence, all_emotions = detect_emotion(face_roi, deepface)
+                for face_index, ((track_id, _), (emotion, confidence, all_emotions)) in enumerate(zip(tracks, results)):
+                    if not emotion or confidence < CONFIDENCE_THRESHOLD:
+                        continue
                     
-                    if emotion and confidence >= CONFIDENCE_THRESHOLD:
-                        # Solo registrar si cambió la emoción
-                        if emotion != last_emotion:
-                            if db:
-                                log_emotion(emotion, confidence, all_emotions, db, session_id)
-                            else:
-                                # Log sin DB
-                                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                                emoji = EMOTION_EMOJIS.get(emotion, '❓')
-                                color = EMOTION_COLORS.get(emotion, None)
-                                msg = f"[{timestamp}] {emoji} {emotion:12} ({confidence*100:.1f}%) [Sin DB]"
-                                print_colored(msg, color)
-                            
-                            last_emotion = emotion
-                            detection_count += 1
-                
+                    # Solo registrar si cambió la emoción de ese rostro
+                    if emotion != last_emotions.get(track_id):
+                        if db:
+                            log_emotion(emotion, confidence, all_emotions, db, session_id, face_index, track_id, source.source_id)
+                        else:
+                            # Sin DB: backup en archivo y documento completo al spool
+                            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                            log_to_file(f"[{timestamp}] #{track_id} {emotion} - Confianza: {confidence*100:.1f}%")
+                            try:
+                                spool.append([build_emotion_document(emotion, confidence, {
+                                    'session_id': session_id,
+                                    'source_id': source.source_id,
+                                    'face_index': face_index,
+                                    'track_id': track_id,
+                                    'all_emotions': all_emotions,
+                                    'source': 'webcam_detector'
+                                })])
+                                status = "[Spool]"
+                            except Exception as e:
+                                status = f"[Spool: ⚠️  {str(e)[:20]}]"
+                            emoji = EMOTION_EMOJIS.get(emotion, '❓')
+                            color = EMOTION_COLORS.get(emotion, None)
+                            msg = f"[{timestamp}] #{track_id} {emoji} {emotion:12} ({confidence*100:.1f}%) {status}"
+                            print_colored(msg, color)
+                        
+                        last_emotions[track_id] = emotion
+                        detection_count += 1
+            
+            # Olvidar rostros que ya no se siguen
+            active_ids = {track_id for track_id, _ in tracks}
+            for track_id in list(last_emotions):
+                if track_id not in active_ids:
+                    del last_emotions[track_id]
+            
+            for track_id, (x, y, w, h) in tracks:
                 # Dibujar en video
                 cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
                 
+                last_emotion = last_emotions.get(track_id)
                 if last_emotion:
                     emoji = EMOTION_EMOJIS.get(last_emotion, '')
-                    label = f"{emoji} {last_emotion}"
+                    label = f"#{track_id} {emoji} {last_emotion}"
                     cv2.putText(
                         frame, label, (x, y-10), 
                         cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2
                     )
-                
+            
+            if faces:
                 # Contador de detecciones en pantalla
                 cv2.putText(
                     frame, f"Detecciones: {detection_count}", (10, 30),
@@ -344,6 +389,7 @@ def main():
                     print_stats(db, session_start)
                 else:
                     print("\n⚠️  Base de datos no disponible")
+                print_performance(frame_count, wall_start, cpu_start, tracker, pipeline, scheduler)
     
     except KeyboardInterrupt:
         print("\n" + "=" * 63)
@@ -358,6 +404,9 @@ def main():
         if db:
             print_stats(db, session_start)
             db.close()
+        print_performance(frame_count, wall_start, cpu_start, tracker, pipeline, scheduler)
+        if spool:
+            spool.close()
         
         # Log final
         log_to_file(f"Sesión finalizada: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -369,6 +418,8 @@ def main():
         
         if db:
             print_colored("💾 Datos guardados en MongoDB Atlas", Fore.CYAN if COLORS_AVAILABLE else None)
+        else:
+            print_colored(f"💾 Datos en spool local ({spool.directory}), se subirán al reconectar", Fore.CYAN if COLORS_AVAILABLE else None)
         
         print("\n¡Hasta pronto! 👋\n")
 
@@ -0,0 +1,246 @@
+"""
+Motor de emociones en proceso
+Carga el modelo de emociones de DeepFace una sola vez y clasifica lotes
+de rostros ya recortados, sin pasar por DeepFace.analyze.
+
+Backends (EMOTION_BACKEND):
+- keras: el modelo Keras de DeepFace con predict_on_batch (TensorFlow)
+- onnx: el mismo modelo exportado a ONNX con ONNX Runtime (sin TensorFlow)
+- opencv: el modelo ONNX con cv2.dnn (sin dependencias extra)
+
+El ONNX (float32 o int8) se genera una vez con detector/export_onnx.py.
+"""
+
+import os
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ======================== CONFIGURACIÓN ========================
+
+EMOTION_BACKEND = os.getenv('EMOTION_BACKEND', 'keras')  # keras | onnx | opencv
+EMOTION_MODEL_PATH = os.getenv('EMOTION_MODEL_PATH', 'models/emotion.onnx')
+EMOTION_THREADS = int(os.getenv('EMOTION_THREADS', 0))  # hilos de inferencia (0 = los del backend)
+
+BACKENDS = ('keras', 'onnx', 'opencv')
+
+# Orden de salida del modelo de emociones de DeepFace
+EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+EMOTION_MAP = {
+    'angry': 'Enojo',
+    'disgust': 'Asco',
+    'fear': 'Miedo',
+    'happy': 'Felicidad',
+    'sad': 'Tristeza',
+    'surprise': 'Sorpresa',
+    'neutral': 'Neutral'
+}
+
+INPUT_SIZE = 48  # El modelo recibe rostros de 48x48 en escala de grises
+
+# ======================== FUNCIONES ========================
+
+def sort_faces(faces) -> List[Tuple[int, int, int, int]]:
+    """
+    Ordena los rostros de izquierda a derecha para que el índice de cada
+    rostro sea estable entre frames mientras las personas no se crucen
+
+    Args:
+        faces: Rectángulos (x, y, w, h) de detectMultiScale
+
+    Returns:
+        Lista de tuplas (x, y, w, h) ordenada
+    """
+    return sorted((tuple(int(v) for v in face) for face in faces),
+                  key=lambda face: (face[0], face[1]))
+
+
+def preprocess_faces(face_rois: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Apila los rostros en un lote listo para el modelo
+
+    Args:
+        face_rois: Recortes de rostro en gris o BGR, de cualquier tamaño
+
+    Returns:
+        Tensor float32 (N, 48, 48, 1) normalizado a [0, 1]
+    """
+    batch = np.empty((len(face_rois), INPUT_SIZE, INPUT_SIZE, 1), dtype=np.float32)
+
+    for i, roi in enumerate(face_rois):
+        if roi.ndim == 3:
+            roi = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+        batch[i, :, :, 0] = cv2.resize(roi, (INPUT_SIZE, INPUT_SIZE),
+                                       interpolation=cv2.INTER_AREA)
+
+    batch /= 255.0
+    return batch
+
+
+def decode_predictions(probabilities: np.ndarray) -> List[Tuple[str, float, Dict[str, float]]]:
+    """
+    Convierte vectores de probabilidad en resultados legibles
+
+    Args:
+        probabilities: Matriz (N, 7) en el orden de EMOTION_LABELS
+
+    Returns:
+        Por cada fila: (emoción, confianza, todas las emociones)
+    """
+    results = []
+    for probs in probabilities:
+        dominant = int(np.argmax(probs))
+
+        emotion = EMOTION_MAP[EMOTION_LABELS[dominant]]
+        confidence = float(probs[dominant])
+        all_emotions = {EMOTION_MAP[label]: float(p) for label, p in zip(EMOTION_LABELS, probs)}
+
+        results.append((emotion, confidence, all_emotions))
+
+    return results
+
+
+def to_nchw(batch: np.ndarray) -> np.ndarray:
+    """
+    (N, 48, 48, 1) → (N, 1, 48, 48): el ONNX se exporta con entrada NCHW.
+    Con un solo canal es un reshape, sin copia.
+    """
+    return batch.reshape(len(batch), 1, INPUT_SIZE, INPUT_SIZE)
+
+# ======================== BACKENDS ========================
+
+def _load_keras(model_path: str, threads: int) -> Callable[[np.ndarray], np.ndarray]:
+    """Modelo Keras de DeepFace (importa TensorFlow)"""
+    from deepface import DeepFace
+
+    model = DeepFace.build_model('Emotion')
+    return model.predict_on_batch
+
+
+def _load_onnx(model_path: str, threads: int) -> Callable[[np.ndarray], np.ndarray]:
+    """Modelo exportado con ONNX Runtime en CPU"""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if threads:
+        options.intra_op_num_threads = threads
+    session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+    input_name = session.get_inputs()[0].name
+
+    def predict(batch: np.ndarray) -> np.ndarray:
+        return session.run(None, {input_name: to_nchw(batch)})[0]
+
+    return predict
+
+
+def _load_opencv(model_path: str, threads: int) -> Callable[[np.ndarray], np.ndarray]:
+    """Modelo exportado con cv2.dnn (backend OpenCV, CPU)"""
+    net = cv2.dnn.readNetFromONNX(model_path)
+    net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+    net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+    if threads:
+        cv2.setNumThreads(threads)
+
+    def predict(batch: np.ndarray) -> np.ndarray:
+        net.setInput(to_nchw(batch))
+        return net.forward()
+
+    return predict
+
+
+_LOADERS = {
+    'keras': _load_keras,
+    'onnx': _load_onnx,
+    'opencv': _load_opencv
+}
+
+# ======================== MOTOR ========================
+
+class EmotionEngine:
+    """
+    Modelo de emociones persistente.
+
+    El modelo se construye una sola vez en load() con el backend
+    elegido; cada llamada a predict() es una única pasada sobre un lote
+    ya preprocesado, sin detector de rostros ni armado de diccionarios.
+    Todos los backends reciben el mismo lote y devuelven las mismas
+    probabilidades (N, 7).
+    """
+
+    def __init__(self, backend: str = EMOTION_BACKEND, model_path: str = EMOTION_MODEL_PATH,
+                 threads: int = EMOTION_THREADS):
+        """
+        Args:
+            backend: 'keras', 'onnx' u 'opencv'
+            model_path: Archivo .onnx (backends onnx y opencv)
+            threads: Hilos de inferencia (0 = valor por defecto del backend)
+        """
+        if backend not in _LOADERS:
+            raise ValueError(f"Backend de emociones desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+
+        self.backend = backend
+        self.model_path = model_path
+        self.threads = threads
+        self._predict: Optional[Callable[[np.ndarray], np.ndarray]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._predict is not None
+
+    def load(self) -> 'EmotionEngine':
+        """Carga el modelo y hace una predicción de calentamiento"""
+        if self._predict is None:
+            if self.backend != 'keras' and not os.path.exists(self.model_path):
+                raise FileNotFoundError(
+                    f"No existe {self.model_path}: generarlo con python detector/export_onnx.py"
+                )
+
+            predict = _LOADERS[self.backend](self.model_path, self.threads)
+            predict(np.zeros((1, INPUT_SIZE, INPUT_SIZE, 1), dtype=np.float32))
+            self._predict = predict
+        return self
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            batch: Tensor (N, 48, 48, 1) de preprocess_faces
+
+        Returns:
+            Probabilidades (N, 7) en el orden de EMOTION_LABELS
+        """
+        if self._predict is None:
+            self.load()
+
+        probabilities = np.asarray(self._predict(batch), dtype=np.float32)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def classify(self, face_rois: Sequence[np.ndarray]) -> List[Tuple[str, float, Dict[str, float]]]:
+        """
+        Clasifica varios rostros en una sola pasada del modelo
+
+        Args:
+            face_rois: Recortes de rostro (ver preprocess_faces)
+
+        Returns:
+            Por cada rostro, en el mismo orden: (emoción, confianza, todas las emociones)
+        """
+        if len(face_rois) == 0:
+            return []
+        return decode_predictions(self.predict(preprocess_faces(face_rois)))
+
+
+_engine: Optional[EmotionEngine] = None
+
+
+def get_engine() -> EmotionEngine:
+    """Motor compartido por el proceso (se carga al primer uso)"""
+    global _engine
+    if _engine is None:
+        _engine = EmotionEngine()
+    return _engine
@@ -0,0 +1,195 @@
+"""
+Bus de eventos en proceso
+Las nuevas detecciones se publican aquí (desde insert_emotion o desde
+un change stream de MongoDB) y los suscriptores reciben cada evento
+una sola vez
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List
+
+from dotenv import load_dotenv
+from pymongo.errors import OperationFailure, PyMongoError
+
+from detector.spool import REPLAYED_FIELD
+
+load_dotenv()
+
+# ======================== CONFIGURACIÓN ========================
+
+# Errores de MongoDB que indican que no hay change streams (servidor standalone)
+CHANGE_STREAM_UNSUPPORTED = {40573, 40324, 136}
+
+CHANGE_STREAM_MAX_BACKOFF = 30.0  # segundos entre reconexiones del change stream
+
+# Un _id se recuerda al menos este tiempo: más que una reconexión del
+# change stream más la espera del escritor, que es cuando llega repetido
+EVENT_DEDUPE_TTL = float(os.getenv('EVENT_DEDUPE_TTL', 300))
+EVENT_DEDUPE_SIZE = int(os.getenv('EVENT_DEDUPE_SIZE', 50000))
+
+
+def event_document(document: Dict) -> Dict:
+    """
+    Versión compacta y serializable de una detección para eventos
+
+    Sin all_emotions: los suscriptores solo necesitan lo que muestra
+    el dashboard.
+    """
+    metadata = document.get('metadata') or {}
+    timestamp = document.get('timestamp')
+    return {
+        '_id': str(document.get('_id')),
+        'emotion': document.get('emotion'),
+        'confidence': document.get('confidence'),
+        'timestamp': timestamp.isoformat() if timestamp else None,
+        'time': document.get('time'),
+        'metadata': {
+            key: metadata[key]
+            for key in ('source', 'source_id', 'session_id', 'face_index', 'track_id')
+            if key in metadata
+        }
+    }
+
+
+class RecentIds:
+    """
+    LRU acotado de ids ya vistos: se olvidan al pasar `ttl` segundos
+    sin verse o cuando hay más de `max_size`
+    """
+
+    def __init__(self, ttl: float = EVENT_DEDUPE_TTL, max_size: int = EVENT_DEDUPE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._seen: OrderedDict = OrderedDict()  # id -> última vez visto
+
+    def check(self, key) -> bool:
+        """Registra el id; True si ya se había visto"""
+        now = time.monotonic()
+        while self._seen:
+            oldest, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.ttl and len(self._seen) < self.max_size:
+                break
+            del self._seen[oldest]
+
+        repeated = key in self._seen
+        self._seen[key] = now
+        self._seen.move_to_end(key)
+        return repeated
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+class EventBus:
+    """
+    Publicación/suscripción síncrona y thread-safe
+
+    Una detección puede llegar dos veces (insert_emotion y el change
+    stream, o el stream al reanudar): los eventos con un _id reciente
+    se descartan.
+    """
+
+    def __init__(self, dedupe: RecentIds = None):
+        self._subscribers: List[Callable[[Dict], None]] = []
+        self._lock = threading.Lock()
+        self._dedupe = dedupe or RecentIds()
+        self.duplicates = 0
+
+    def subscribe(self, callback: Callable[[Dict], None]) -> Callable[[], None]:
+        """
+        Registra un suscriptor
+
+        El callback corre en el hilo que publica: los suscriptores de
+        asyncio deben reenviar con loop.call_soon_threadsafe.
+
+        Returns:
+            Función para cancelar la suscripción
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def publish(self, event: Dict):
+        document_id = (event.get('document') or {}).get('_id')
+        with self._lock:
+            if document_id is not None and self._dedupe.check(document_id):
+                self.duplicates += 1
+                return
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"⚠️  Error en suscriptor de eventos: {e}")
+
+
+class ChangeStreamWatcher:
+    """
+    Publica en el bus las inserciones vistas por un change stream.
+
+    Así también llegan las detecciones de otros procesos (p. ej. el
+    detector por consola). Los documentos reenviados desde el spool
+    (REPLAYED_FIELD) no se publican: ya se publicaron al detectarse o
+    son viejos. Si el servidor no soporta change streams el hilo termina
+    y `available` queda en False.
+    """
+
+    def __init__(self, collection, bus: EventBus):
+        self.collection = collection
+        self.bus = bus
+        self.active = False
+        self.available = True
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='change-stream', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        resume_token = None
+        backoff = 1.0
+
+        while not self._stop.is_set():
+            try:
+                with self.collection.watch(
+                    [{'$match': {'operationType': 'insert', f'fullDocument.{REPLAYED_FIELD}': {'$ne': True}}}],
+                    resume_after=resume_token,
+                    max_await_time_ms=1000
+                ) as stream:
+                    self.active = True
+                    backoff = 1.0
+                    while not self._stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        resume_token = stream.resume_token
+                        self.bus.publish({
+                            'type': 'emotion',
+                            'document': event_document(change['fullDocument'])
+                        })
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED:
+                    print("ℹ️  MongoDB sin change streams: eventos solo en proceso")
+                    self.available = False
+                    self.active = False
+                    return
+                self.active = False
+                time.sleep(backoff)
+                backoff = min(backoff * 2, CHANGE_STREAM_MAX_BACKOFF)
+            except PyMongoError:
+                self.active = False
+                time.sleep(backoff)
+                backoff = min(backoff * 2, CHANGE_STREAM_MAX_BACKOFF)
+
+        self.active = False
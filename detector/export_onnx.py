@@ -0,0 +1,162 @@
+"""
+Exporta el modelo de emociones de DeepFace a ONNX (se corre una vez)
+Genera el .onnx que usan los backends 'onnx' (ONNX Runtime) y 'opencv'
+(cv2.dnn) de EmotionEngine y, opcionalmente, una versión int8.
+
+Requiere tensorflow, deepface y tf2onnx (solo para exportar) y
+onnxruntime para verificar y cuantizar.
+
+Uso:
+    python detector/export_onnx.py --output models/emotion.onnx
+    python detector/export_onnx.py --output models/emotion.onnx --int8 models/emotion_int8.onnx --calibration rostros/
+"""
+
+import argparse
+import os
+import sys
+from typing import Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+# Agregar el directorio padre al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector.emotion_model import INPUT_SIZE, preprocess_faces, to_nchw
+
+# ======================== CONFIGURACIÓN ========================
+
+OPSET = 13
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+CALIBRATION_BATCH = 16
+PARITY_TOLERANCE = 1e-4  # diferencia máxima de probabilidades float32 vs Keras
+
+# ======================== IMÁGENES ========================
+
+def load_face_images(directory: str, limit: Optional[int] = None) -> List[np.ndarray]:
+    """
+    Recortes de rostro de una carpeta (en gris, en orden alfabético
+    para que el conjunto sea siempre el mismo)
+    """
+    files = sorted(f for f in os.listdir(directory) if f.lower().endswith(IMAGE_EXTENSIONS))
+    images = []
+    for name in files[:limit]:
+        image = cv2.imread(os.path.join(directory, name), cv2.IMREAD_GRAYSCALE)
+        if image is not None:
+            images.append(image)
+    return images
+
+
+def batches(images: List[np.ndarray], size: int) -> Iterator[np.ndarray]:
+    """Lotes (N, 48, 48, 1) listos para el modelo"""
+    for start in range(0, len(images), size):
+        yield preprocess_faces(images[start:start + size])
+
+# ======================== EXPORTACIÓN ========================
+
+def export(output: str, opset: int = OPSET):
+    """
+    Convierte el modelo Keras a ONNX con entrada NCHW (N, 1, 48, 48)
+
+    La transposición a NHWC se agrega antes del modelo y el optimizador
+    de tf2onnx la cancela con la que inserta para las convoluciones.
+    """
+    import tensorflow as tf
+    import tf2onnx
+    from deepface import DeepFace
+
+    model = DeepFace.build_model('Emotion')
+    spec = (tf.TensorSpec((None, 1, INPUT_SIZE, INPUT_SIZE), tf.float32, name='input'),)
+
+    @tf.function(input_signature=spec)
+    def nchw_model(x):
+        return model(tf.transpose(x, [0, 2, 3, 1]), training=False)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    tf2onnx.convert.from_function(nchw_model, input_signature=spec, opset=opset, output_path=output)
+    print(f"✅ Modelo exportado a {output} ({os.path.getsize(output) / 1024:.0f} KB)")
+    return model
+
+
+def verify(model, onnx_path: str, images: List[np.ndarray]) -> float:
+    """Diferencia máxima entre Keras y ONNX Runtime sobre las mismas imágenes"""
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+    input_name = session.get_inputs()[0].name
+
+    max_diff = 0.0
+    for batch in batches(images, CALIBRATION_BATCH):
+        expected = np.asarray(model.predict_on_batch(batch))
+        actual = session.run(None, {input_name: to_nchw(batch)})[0]
+        max_diff = max(max_diff, float(np.abs(expected - actual).max()))
+    return max_diff
+
+
+def quantize(float_path: str, int8_path: str, images: Optional[List[np.ndarray]] = None):
+    """
+    Cuantiza a int8
+
+    Con imágenes de calibración: cuantización estática QDQ (pesos por
+    canal y activaciones uint8), la que acelera las convoluciones en CPU.
+    Sin ellas: cuantización dinámica (solo pesos), menos precisa y más
+    lenta en convoluciones, pero no necesita datos.
+    """
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+    )
+
+    if not images:
+        print("⚠️  Sin --calibration: cuantización dinámica (solo pesos)")
+        quantize_dynamic(float_path, int8_path, weight_type=QuantType.QInt8)
+    else:
+        class FaceCalibrationReader(CalibrationDataReader):
+            def __init__(self, input_name: str):
+                self._batches = ({input_name: to_nchw(batch)} for batch in batches(images, CALIBRATION_BATCH))
+
+            def get_next(self):
+                return next(self._batches, None)
+
+        import onnxruntime as ort
+        input_name = ort.InferenceSession(float_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+        quantize_static(float_path, int8_path, FaceCalibrationReader(input_name),
+                        quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+    print(f"✅ Modelo int8 en {int8_path} ({os.path.getsize(int8_path) / 1024:.0f} KB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta el modelo de emociones a ONNX")
+    parser.add_argument('--output', default='models/emotion.onnx')
+    parser.add_argument('--int8', help="Ruta del modelo cuantizado a int8 (opcional)")
+    parser.add_argument('--calibration', help="Carpeta con recortes de rostros para calibrar y verificar")
+    parser.add_argument('--calibration-limit', type=int, default=500)
+    parser.add_argument('--opset', type=int, default=OPSET)
+    args = parser.parse_args()
+
+    images = load_face_images(args.calibration, args.calibration_limit) if args.calibration else []
+    if args.calibration and not images:
+        print(f"❌ No hay imágenes en {args.calibration}")
+        sys.exit(1)
+
+    print("🔄 Exportando modelo de emociones (DeepFace → ONNX)...")
+    model = export(args.output, args.opset)
+
+    # Verificar con las imágenes de calibración o con ruido reproducible
+    check_images = images or [np.random.default_rng(i).integers(0, 256, (INPUT_SIZE, INPUT_SIZE), dtype=np.uint8)
+                              for i in range(32)]
+    max_diff = verify(model, args.output, check_images)
+    status = "✅" if max_diff <= PARITY_TOLERANCE else "⚠️ "
+    print(f"{status} Diferencia máxima Keras vs ONNX: {max_diff:.2e}")
+
+    if args.int8:
+        quantize(args.output, args.int8, images)
+
+    print("\nPara usarlo:")
+    print(f"   EMOTION_BACKEND=onnx EMOTION_MODEL_PATH={args.int8 or args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Pipeline de detección de rostros independiente de la resolución
+Detecta sobre una imagen reducida, busca primero en una ventana alrededor
+de los últimos rostros y devuelve los rectángulos en coordenadas del
+frame original para recortar el rostro a resolución completa
+"""
+
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+from detector.tracking import iou
+
+load_dotenv()
+
+# ======================== CONFIGURACIÓN ========================
+
+DETECTION_WIDTH = int(os.getenv('DETECTION_WIDTH', 640))     # ancho de la imagen de detección (0 = nativo)
+ROI_PADDING = float(os.getenv('ROI_PADDING', 0.6))           # margen de la ventana, en fracción del rostro
+FULL_SCAN_EVERY = int(os.getenv('FULL_SCAN_EVERY', 5))       # detecciones entre barridos completos
+
+Box = Tuple[int, int, int, int]
+
+# ======================== PIPELINE ========================
+
+class FaceDetectionPipeline:
+    """
+    Detección en tres pasos.
+
+    1. El frame en gris se reduce a `detection_width` de ancho: el costo
+       de la cascada no depende de la resolución de la cámara.
+    2. Si hay rostros conocidos, se busca cada uno en una ventana con
+       margen alrededor de su última posición. Si alguno no aparece, o
+       cada `full_scan_every` llamadas (para ver rostros nuevos), se
+       barre la imagen reducida completa.
+    3. Los rectángulos se devuelven en coordenadas del frame original,
+       así el rostro se recorta a resolución completa para el modelo.
+    """
+
+    def __init__(self, detect_fn: Callable[[np.ndarray], object],
+                 detection_width: int = DETECTION_WIDTH,
+                 roi_padding: float = ROI_PADDING,
+                 full_scan_every: int = FULL_SCAN_EVERY):
+        """
+        Args:
+            detect_fn: Detector sobre una imagen en gris, retorna (x, y, w, h)
+            detection_width: Ancho de trabajo (0 = resolución nativa)
+            roi_padding: Margen de la ventana de búsqueda
+            full_scan_every: Llamadas entre barridos completos
+        """
+        self.detect_fn = detect_fn
+        self.detection_width = detection_width
+        self.roi_padding = roi_padding
+        self.full_scan_every = max(1, full_scan_every)
+
+        self._last_boxes: List[Box] = []   # en coordenadas de la imagen reducida
+        self._last_scale: Optional[float] = None
+        self._since_full_scan = 0
+
+        self.full_scans = 0
+        self.roi_scans = 0
+
+    def detect(self, gray: np.ndarray) -> List[Box]:
+        """
+        Args:
+            gray: Frame en gris a resolución nativa
+
+        Returns:
+            Rectángulos (x, y, w, h) en coordenadas de `gray`
+        """
+        scale = self._scale(gray)
+        if scale < 1.0:
+            small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        else:
+            small = gray
+
+        # Cambio de resolución: las posiciones anteriores ya no sirven
+        if scale != self._last_scale:
+            self._last_boxes = []
+            self._last_scale = scale
+
+        boxes = None
+        self._since_full_scan += 1
+        if self._last_boxes and self._since_full_scan < self.full_scan_every:
+            boxes = self._search_windows(small)
+            if boxes is not None:
+                self.roi_scans += 1
+
+        if boxes is None:
+            boxes = [tuple(int(v) for v in box) for box in self.detect_fn(small)]
+            self.full_scans += 1
+            self._since_full_scan = 0
+
+        self._last_boxes = boxes
+        return [tuple(int(round(v / scale)) for v in box) for box in boxes]
+
+    def reset(self):
+        self._last_boxes = []
+        self._since_full_scan = 0
+
+    def stats(self) -> Dict:
+        return {
+            'detection_width': self.detection_width,
+            'scale': round(self._last_scale, 3) if self._last_scale else None,
+            'full_scans': self.full_scans,
+            'roi_scans': self.roi_scans
+        }
+
+    # ---------- Internos ----------
+
+    def _scale(self, gray: np.ndarray) -> float:
+        width = gray.shape[1]
+        if not self.detection_width or width <= self.detection_width:
+            return 1.0
+        return self.detection_width / width
+
+    def _search_windows(self, small: np.ndarray) -> Optional[List[Box]]:
+        """
+        Busca cada rostro conocido en su ventana
+
+        Returns:
+            Rectángulos encontrados, o None si algún rostro no aparece
+        """
+        height, width = small.shape[:2]
+        boxes = []
+
+        for box in self._last_boxes:
+            x, y, w, h = box
+            pad_x, pad_y = int(w * self.roi_padding), int(h * self.roi_padding)
+            x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+            x1, y1 = min(width, x + w + pad_x), min(height, y + h + pad_y)
+
+            found = [(fx + x0, fy + y0, fw, fh)
+                     for (fx, fy, fw, fh) in self.detect_fn(small[y0:y1, x0:x1])]
+            if len(found) == 0:
+                return None
+
+            # Si la ventana alcanza a otro rostro, quedarse con el más parecido
+            best = max(found, key=lambda candidate: iou(candidate, box))
+            best = tuple(int(v) for v in best)
+            if best not in boxes:
+                boxes.append(best)
+
+        return boxes
@@ -0,0 +1,204 @@
+"""
+Detectores de rostros intercambiables
+Todos reciben una imagen en gris (el frame reducido o una ventana del
+FaceDetectionPipeline) y devuelven rectángulos (x, y, w, h), así que
+cualquiera sirve como detect_fn del pipeline y del tracker.
+
+- haar: cascada Haar de OpenCV (la de siempre)
+- lbp: cascada LBP, más rápida y con menos precisión
+- yunet: red YuNet de OpenCV (cv2.FaceDetectorYN), con puntaje por rostro
+- ssd: ResNet-10 SSD de OpenCV (Caffe) con cv2.dnn
+
+El backend y sus parámetros se eligen con variables de entorno.
+"""
+
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ======================== CONFIGURACIÓN ========================
+
+FACE_DETECTOR = os.getenv('FACE_DETECTOR', 'haar')                          # haar | lbp | yunet | ssd
+FACE_MODEL_PATH = os.getenv('FACE_MODEL_PATH', '')                          # cascada .xml, .onnx o .caffemodel
+FACE_MODEL_CONFIG = os.getenv('FACE_MODEL_CONFIG', '')                      # .prototxt del SSD
+FACE_SCALE_FACTOR = float(os.getenv('FACE_SCALE_FACTOR', 1.3))              # cascadas
+FACE_MIN_NEIGHBORS = int(os.getenv('FACE_MIN_NEIGHBORS', 5))                # cascadas
+FACE_MIN_SIZE = int(os.getenv('FACE_MIN_SIZE', 30))                         # píxeles, todos
+FACE_SCORE_THRESHOLD = float(os.getenv('FACE_SCORE_THRESHOLD', 0.7))        # redes (0-1)
+
+NMS_THRESHOLD = 0.3
+YUNET_TOP_K = 50
+SSD_INPUT_SIZE = (300, 300)
+SSD_MEAN = (104.0, 177.0, 123.0)
+
+# Modelos por defecto (las cascadas LBP y las redes no vienen con opencv-python)
+DEFAULT_MODELS = {
+    'haar': cv2.data.haarcascades + 'haarcascade_frontalface_default.xml',
+    'lbp': 'models/lbpcascade_frontalface_improved.xml',
+    'yunet': 'models/face_detection_yunet_2023mar.onnx',
+    'ssd': 'models/res10_300x300_ssd_iter_140000.caffemodel'
+}
+DEFAULT_SSD_CONFIG = 'models/deploy.prototxt'
+
+Box = Tuple[int, int, int, int]
+
+# ======================== DETECTORES ========================
+
+class FaceDetector(ABC):
+    """
+    Interfaz común: detect(gris) → [(x, y, w, h)]
+
+    Un backend sin detect() falla al instanciarse, no en el primer frame.
+    """
+
+    name = 'base'
+
+    def __init__(self, min_size: int = FACE_MIN_SIZE):
+        self.min_size = min_size
+
+    @abstractmethod
+    def detect(self, gray: np.ndarray) -> List[Box]:
+        """Rostros de la imagen en gris, dentro de sus bordes"""
+
+    def __call__(self, gray: np.ndarray) -> List[Box]:
+        return self.detect(gray)
+
+    def describe(self) -> Dict:
+        return {'detector': self.name, 'min_size': self.min_size}
+
+    def _clip(self, boxes, width: int, height: int) -> List[Box]:
+        """Recorta al borde de la imagen y descarta los rostros chicos"""
+        result = []
+        for x, y, w, h in boxes:
+            x0, y0 = max(0, int(x)), max(0, int(y))
+            x1, y1 = min(width, int(x + w)), min(height, int(y + h))
+            if x1 - x0 >= self.min_size and y1 - y0 >= self.min_size:
+                result.append((x0, y0, x1 - x0, y1 - y0))
+        return result
+
+
+class CascadeDetector(FaceDetector):
+    """Cascada de OpenCV (Haar o LBP) con detectMultiScale"""
+
+    def __init__(self, name: str, model_path: str,
+                 scale_factor: float = FACE_SCALE_FACTOR,
+                 min_neighbors: int = FACE_MIN_NEIGHBORS,
+                 min_size: int = FACE_MIN_SIZE):
+        super().__init__(min_size)
+        self.name = name
+        self.cascade = cv2.CascadeClassifier(model_path)
+        if self.cascade.empty():
+            raise FileNotFoundError(f"No se pudo cargar la cascada {model_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    def detect(self, gray: np.ndarray) -> List[Box]:
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=self.scale_factor,
+                                              minNeighbors=self.min_neighbors,
+                                              minSize=(self.min_size, self.min_size))
+        return [tuple(int(v) for v in face) for face in faces]
+
+    def describe(self) -> Dict:
+        return {**super().describe(), 'scale_factor': self.scale_factor, 'min_neighbors': self.min_neighbors}
+
+
+class YuNetDetector(FaceDetector):
+    """
+    YuNet (cv2.FaceDetectorYN): red liviana pensada para CPU.
+    El tamaño de entrada se ajusta a cada imagen recibida.
+    """
+
+    name = 'yunet'
+
+    def __init__(self, model_path: str, score_threshold: float = FACE_SCORE_THRESHOLD,
+                 min_size: int = FACE_MIN_SIZE):
+        super().__init__(min_size)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"No existe el modelo YuNet {model_path}")
+        self.score_threshold = score_threshold
+        self.net = cv2.FaceDetectorYN.create(model_path, '', (320, 320), score_threshold,
+                                             NMS_THRESHOLD, YUNET_TOP_K)
+        self._input_size: Optional[Tuple[int, int]] = None
+
+    def detect(self, gray: np.ndarray) -> List[Box]:
+        height, width = gray.shape[:2]
+        if (width, height) != self._input_size:
+            self.net.setInputSize((width, height))
+            self._input_size = (width, height)
+
+        # La red espera 3 canales: el gris se replica
+        _, faces = self.net.detect(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+        if faces is None:
+            return []
+        return self._clip((face[:4] for face in faces), width, height)
+
+    def describe(self) -> Dict:
+        return {**super().describe(), 'score_threshold': self.score_threshold}
+
+
+class SsdDetector(FaceDetector):
+    """ResNet-10 SSD de OpenCV (Caffe) sobre cv2.dnn, entrada fija de 300x300"""
+
+    name = 'ssd'
+
+    def __init__(self, model_path: str, config_path: str,
+                 score_threshold: float = FACE_SCORE_THRESHOLD,
+                 min_size: int = FACE_MIN_SIZE):
+        super().__init__(min_size)
+        for path in (model_path, config_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No existe el modelo SSD {path}")
+        self.score_threshold = score_threshold
+        self.net = cv2.dnn.readNetFromCaffe(config_path, model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def detect(self, gray: np.ndarray) -> List[Box]:
+        height, width = gray.shape[:2]
+        image = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        blob = cv2.dnn.blobFromImage(cv2.resize(image, SSD_INPUT_SIZE), 1.0, SSD_INPUT_SIZE, SSD_MEAN)
+        self.net.setInput(blob)
+        detections = self.net.forward().reshape(-1, 7)
+
+        # Cada fila: [_, clase, puntaje, x0, y0, x1, y1] normalizados
+        detections = detections[detections[:, 2] >= self.score_threshold]
+        scale = np.array([width, height, width, height], dtype=np.float32)
+        boxes = []
+        for x0, y0, x1, y1 in detections[:, 3:7] * scale:
+            boxes.append((x0, y0, x1 - x0, y1 - y0))
+        return self._clip(boxes, width, height)
+
+    def describe(self) -> Dict:
+        return {**super().describe(), 'score_threshold': self.score_threshold}
+
+# ======================== FÁBRICA ========================
+
+FACE_DETECTORS = ('haar', 'lbp', 'yunet', 'ssd')
+
+
+def create_face_detector(name: str = FACE_DETECTOR, model_path: str = FACE_MODEL_PATH,
+                         config_path: str = FACE_MODEL_CONFIG, **params) -> FaceDetector:
+    """
+    Crea el detector configurado
+
+    Args:
+        name: 'haar', 'lbp', 'yunet' o 'ssd'
+        model_path: Modelo (vacío = el de DEFAULT_MODELS)
+        config_path: .prototxt del SSD (vacío = DEFAULT_SSD_CONFIG)
+        params: scale_factor, min_neighbors, min_size o score_threshold
+    """
+    if name not in FACE_DETECTORS:
+        raise ValueError(f"Detector de rostros desconocido: {name} (opciones: {', '.join(FACE_DETECTORS)})")
+
+    model_path = model_path or DEFAULT_MODELS[name]
+    if name in ('haar', 'lbp'):
+        return CascadeDetector(name, model_path, **params)
+    if name == 'yunet':
+        return YuNetDetector(model_path, **params)
+    return SsdDetector(model_path, config_path or DEFAULT_SSD_CONFIG, **params)
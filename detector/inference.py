@@ -0,0 +1,119 @@
+"""
+Ejecutor acotado para inferencia fuera del event loop
+Cola con límite y descarte del trabajo más antiguo
+"""
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from detector import metrics
+
+
+class FrameDropped(Exception):
+    """El trabajo fue descartado por uno más reciente antes de ejecutarse"""
+
+
+class InferenceExecutor:
+    """
+    Pool de hilos con cola acotada para trabajo de inferencia.
+
+    Cuando la cola está llena, el trabajo más antiguo que aún no empezó
+    se descarta (su futuro recibe FrameDropped): para video siempre es
+    preferible analizar el frame más reciente.
+    """
+
+    def __init__(self, max_workers: int = 1, max_queue: int = 2):
+        """
+        Args:
+            max_workers: Hilos de inferencia en paralelo
+            max_queue: Trabajos en espera antes de descartar el más antiguo
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix='inference')
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Trabajos en espera (sin contar los que están ejecutándose)"""
+        return len(self._pending)
+
+    def submit(self, fn: Callable, *args) -> asyncio.Future:
+        """
+        Encola un trabajo desde el event loop sin bloquearlo
+
+        Returns:
+            Futuro de asyncio con el resultado de fn(*args)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        with self._lock:
+            if len(self._pending) >= self.max_queue:
+                _, _, old_future, _ = self._pending.popleft()
+                self.dropped += 1
+                metrics.FRAMES_DROPPED.inc()
+                if not old_future.done():
+                    old_future.set_exception(FrameDropped())
+
+            self._pending.append((fn, args, future, loop))
+            self.submitted += 1
+
+        # Cada envío agenda un drenado; los descartados dejan drenados vacíos
+        self._pool.submit(self._run_next)
+        return future
+
+    def _run_next(self):
+        """Ejecuta el trabajo más antiguo de la cola (en un hilo del pool)"""
+        with self._lock:
+            if not self._pending:
+                return
+            fn, args, future, loop = self._pending.popleft()
+
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self.failed += 1
+            loop.call_soon_threadsafe(self._resolve, future, None, e)
+        else:
+            self.completed += 1
+            loop.call_soon_threadsafe(self._resolve, future, result, None)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def stats(self) -> Dict:
+        """Contadores del ejecutor"""
+        return {
+            'workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'queue_depth': self.queue_depth,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'dropped': self.dropped
+        }
+
+    def shutdown(self):
+        """Descarta lo pendiente y libera los hilos"""
+        with self._lock:
+            while self._pending:
+                _, _, future, loop = self._pending.popleft()
+                loop.call_soon_threadsafe(self._resolve, future, None, FrameDropped())
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,128 @@
+"""
+Métricas Prometheus del pipeline
+Histogramas de latencia por etapa y estado del sistema para /metrics
+(API) y para el puerto de métricas del detector por consola.
+
+prometheus_client es opcional: sin él todas las métricas son no-ops y
+el resto del código no cambia.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest, start_http_server
+    )
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+
+load_dotenv()
+
+# ======================== CONFIGURACIÓN ========================
+
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))  # puerto del detector por consola (0 = sin servidor)
+
+STAGES = ('capture', 'detect', 'infer', 'encode', 'send', 'db_write')
+
+# Etapas de milisegundos: de 0.5 ms a 1 s
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+MONGO_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# ======================== NO-OP ========================
+
+class _NoopMetric:
+    """Reemplazo de Histogram/Gauge/Counter cuando no hay prometheus_client"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def set_function(self, fn):
+        pass
+
+# ======================== MÉTRICAS ========================
+
+if METRICS_AVAILABLE:
+    STAGE_LATENCY = Histogram('emotion_stage_seconds', 'Latencia por etapa del pipeline',
+                              ['stage'], buckets=STAGE_BUCKETS)
+    MONGO_LATENCY = Histogram('emotion_mongo_operation_seconds', 'Latencia de operaciones de MongoDB',
+                              ['operation'], buckets=MONGO_BUCKETS)
+    FPS = Gauge('emotion_fps', 'Frames por segundo actuales', ['source'])
+    INFERENCE_QUEUE_DEPTH = Gauge('emotion_inference_queue_depth', 'Lotes esperando inferencia')
+    FRAMES_DROPPED = Counter('emotion_frames_dropped_total', 'Frames descartados por la cola de inferencia')
+    WEBSOCKET_CLIENTS = Gauge('emotion_websocket_clients', 'Clientes WebSocket conectados', ['channel'])
+    WEBHOOK_FAILURES = Counter('emotion_webhook_failures_total', 'Alertas que no se pudieron enviar')
+else:
+    STAGE_LATENCY = MONGO_LATENCY = FPS = INFERENCE_QUEUE_DEPTH = _NoopMetric()
+    FRAMES_DROPPED = WEBSOCKET_CLIENTS = WEBHOOK_FAILURES = _NoopMetric()
+
+# Hijos resueltos una sola vez: en el camino caliente no se buscan labels
+STAGE = {stage: STAGE_LATENCY.labels(stage=stage) for stage in STAGES}
+
+# ======================== AYUDANTES ========================
+
+@contextmanager
+def timer(metric):
+    """Observa la duración del bloque en un histograma (ya con labels)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric.observe(time.perf_counter() - start)
+
+
+def mongo_timer(operation: str):
+    return timer(MONGO_LATENCY.labels(operation=operation))
+
+
+class FpsMeter:
+    """Actualiza el gauge de FPS una vez por segundo (no en cada frame)"""
+
+    def __init__(self, source: str, interval: float = 1.0):
+        self.gauge = FPS.labels(source=source)
+        self.interval = interval
+        self._frames = 0
+        self._since = time.perf_counter()
+        self.fps = 0.0
+
+    def tick(self):
+        self._frames += 1
+        now = time.perf_counter()
+        if now - self._since >= self.interval:
+            self.fps = self._frames / (now - self._since)
+            self.gauge.set(self.fps)
+            self._frames = 0
+            self._since = now
+
+
+def start_metrics_server(port: int = METRICS_PORT) -> bool:
+    """Servidor HTTP de métricas para el detector por consola"""
+    if not port:
+        return False
+    if not METRICS_AVAILABLE:
+        print("⚠️  METRICS_PORT configurado pero prometheus_client no está instalado")
+        return False
+    start_http_server(port)
+    print(f"📈 Métricas en http://localhost:{port}/metrics")
+    return True
+
+
+def render() -> Optional[Tuple[bytes, str]]:
+    """Exposición para /metrics: (cuerpo, content-type) o None si no hay cliente"""
+    if not METRICS_AVAILABLE:
+        return None
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,506 @@
+"""
+Ingesta de varias cámaras con un servicio de inferencia compartido
+Cada fuente (cámara, archivo o URL RTSP, ver detector/capture.py) tiene
+su propio proceso que captura, detecta y sigue rostros; los recortes de
+48x48 llegan por una cola acotada a un único servicio que los clasifica
+en lotes con un solo modelo cargado. Cada resultado lleva su source_id
+y se guarda con EmotionDatabase.
+
+La captura y la detección escalan con los núcleos (un proceso por
+fuente); el modelo se carga una vez y aprovecha el lote entre fuentes.
+
+Uso:
+    python detector/multicam.py --sources 0 sala2=rtsp://127.0.0.1:8554/sala2 grabacion.mp4
+    python detector/multicam.py --sources pasillo.mp4 aula.mp4 --realtime --loop --duration 120
+    CAMERA_SOURCES="0,1" python detector/multicam.py
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+# Agregar el directorio padre al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector import metrics
+from detector.capture import VideoSource, open_capture, parse_sources
+from detector.emotion_model import INPUT_SIZE, EmotionEngine, get_engine
+from detector.face_detection import FaceDetectionPipeline
+from detector.face_detectors import create_face_detector
+from detector.scheduler import InferenceScheduler
+from detector.tracking import FaceTracker
+
+load_dotenv()
+
+# ======================== CONFIGURACIÓN ========================
+
+CONFIDENCE_THRESHOLD = float(os.getenv('CONFIDENCE_THRESHOLD', 0.5))
+MULTICAM_QUEUE_SIZE = int(os.getenv('MULTICAM_QUEUE_SIZE', 64))      # lotes de rostros en espera
+MULTICAM_MAX_BATCH = int(os.getenv('MULTICAM_MAX_BATCH', 32))        # rostros por pasada del modelo
+MULTICAM_MAX_WAIT = float(os.getenv('MULTICAM_MAX_WAIT', 0.02))      # segundos para completar un lote
+
+STATUS_INTERVAL = 1.0       # segundos entre reportes de cada proceso de captura
+RECONNECT_DELAY = 1.0       # primer reintento al perder una fuente en vivo
+RECONNECT_MAX_DELAY = 30.0  # tope del backoff
+JOIN_TIMEOUT = 5.0          # segundos para que termine cada proceso al detener
+
+# ======================== PROCESO DE CAPTURA ========================
+
+def _crop_faces(gray: np.ndarray, tracks) -> np.ndarray:
+    """Recortes (N, 48, 48) uint8: por la cola viajan 2 KB por rostro, no el frame"""
+    height, width = gray.shape[:2]
+    faces = np.zeros((len(tracks), INPUT_SIZE, INPUT_SIZE), dtype=np.uint8)
+    for i, (_, (x, y, w, h)) in enumerate(tracks):
+        roi = gray[max(0, y):min(height, y + h), max(0, x):min(width, x + w)]
+        if roi.size:
+            faces[i] = cv2.resize(roi, (INPUT_SIZE, INPUT_SIZE), interpolation=cv2.INTER_AREA)
+    return faces
+
+
+def capture_worker(source: VideoSource, faces_queue, status_queue, stop_event,
+                   realtime: bool = False, loop: bool = False):
+    """
+    Captura, detección y seguimiento de una fuente (proceso propio)
+
+    Envía a faces_queue un mensaje por cada frame que el planificador
+    decide clasificar; si la cola está llena lo descarta (el servicio de
+    inferencia va atrasado y el siguiente frame es más útil). Las
+    fuentes en vivo se reabren con backoff si se cortan.
+
+    Args:
+        source: Fuente a leer
+        faces_queue: Cola hacia el servicio de inferencia
+        status_queue: Cola de reportes periódicos
+        stop_event: Evento compartido para terminar
+        realtime: Leer los archivos a su FPS (simula una cámara)
+        loop: Volver a empezar los archivos al terminar
+    """
+    # Un hilo por proceso: el paralelismo lo dan los procesos
+    cv2.setNumThreads(1)
+
+    counters = {'frames': 0, 'batches': 0, 'faces': 0, 'dropped': 0, 'reconnects': 0}
+    status = {'source_id': source.source_id, 'connected': False, 'finished': False, 'fps': 0.0}
+
+    def report(**extra):
+        status.update(extra)
+        status_queue.put({**status, **counters})
+
+    try:
+        face_detector = create_face_detector()
+    except Exception as e:
+        report(finished=True, error=f"detector de rostros: {e}")
+        return
+
+    pipeline = FaceDetectionPipeline(face_detector.detect)
+    tracker = FaceTracker(pipeline.detect)
+    # Sin presupuesto local: la cola acotada regula el trabajo del servicio
+    scheduler = InferenceScheduler(budget_ms=0)
+
+    cap = open_capture(source)
+    delay = RECONNECT_DELAY
+    frame_interval = 0.0
+    last_report = time.monotonic()
+    frames_since_report = 0
+
+    try:
+        while not stop_event.is_set():
+            if not cap.isOpened():
+                report(connected=False, error=f"no se pudo abrir {source.uri}")
+                if not source.live or stop_event.wait(delay):
+                    break
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                counters['reconnects'] += 1
+                cap.release()
+                cap = open_capture(source)
+                continue
+
+            if not status['connected']:
+                fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+                frame_interval = 1.0 / fps if realtime and not source.live else 0.0
+                report(connected=True, error=None)
+
+            started = time.monotonic()
+            ret, frame = cap.read()
+            if not ret:
+                if source.live:
+                    # Stream cortado: reabrir en la próxima vuelta
+                    cap.release()
+                elif loop and counters['frames']:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    tracker.reset()
+                    pipeline.reset()
+                    continue
+                else:
+                    break
+                continue
+
+            delay = RECONNECT_DELAY
+            counters['frames'] += 1
+            frames_since_report += 1
+
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            tracks = tracker.update(gray, frame)
+
+            if scheduler.should_run(gray, tracks):
+                message = {
+                    'source_id': source.source_id,
+                    'frame': counters['frames'],
+                    'timestamp': time.time(),
+                    'tracks': tracks,
+                    'faces': _crop_faces(gray, tracks)
+                }
+                try:
+                    faces_queue.put_nowait(message)
+                    counters['batches'] += 1
+                    counters['faces'] += len(tracks)
+                except queue.Full:
+                    counters['dropped'] += 1
+
+            now = time.monotonic()
+            if now - last_report >= STATUS_INTERVAL:
+                report(fps=frames_since_report / (now - last_report))
+                last_report = now
+                frames_since_report = 0
+
+            if frame_interval:
+                stop_event.wait(max(0.0, frame_interval - (time.monotonic() - started)))
+
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+        report(connected=False, finished=True, fps=0.0)
+
+# ======================== SERVICIO DE INFERENCIA ========================
+
+class InferenceService:
+    """
+    Clasifica los rostros de todas las fuentes con un solo modelo.
+
+    Junta mensajes de la cola hasta `max_batch` rostros o hasta
+    `max_wait` segundos desde el primero, corre una sola pasada del
+    modelo y entrega a on_results cada mensaje con sus resultados.
+    """
+
+    def __init__(self, engine: EmotionEngine, faces_queue,
+                 on_results: Callable[[Dict, List], None],
+                 max_batch: int = MULTICAM_MAX_BATCH,
+                 max_wait: float = MULTICAM_MAX_WAIT):
+        self.engine = engine
+        self.queue = faces_queue
+        self.on_results = on_results
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.runs = 0
+        self.faces = 0
+        self.messages = 0
+        self.failed = 0
+        self._avg_inference = 0.0
+        self._avg_latency = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='multicam-inference', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = JOIN_TIMEOUT):
+        """Procesa lo que quedó en la cola y termina"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        return {
+            'runs': self.runs,
+            'messages': self.messages,
+            'faces': self.faces,
+            'failed': self.failed,
+            'avg_batch': round(self.faces / self.runs, 2) if self.runs else 0.0,
+            'avg_inference_ms': round(self._avg_inference * 1000, 2),
+            'avg_latency_ms': round(self._avg_latency * 1000, 2)
+        }
+
+    # ---------- Internos ----------
+
+    def _run(self):
+        while True:
+            try:
+                first = self.queue.get(timeout=0.2)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+
+            batch = [first]
+            count = len(first['tracks'])
+            deadline = time.monotonic() + self.max_wait
+            while count < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    message = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(message)
+                count += len(message['tracks'])
+
+            self._process(batch)
+
+    def _process(self, batch: List[Dict]):
+        faces = np.concatenate([message['faces'] for message in batch])
+        try:
+            start = time.perf_counter()
+            results = self.engine.classify(faces)
+            duration = time.perf_counter() - start
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"⚠️  Error en inferencia: {e}")
+            return
+
+        metrics.STAGE['infer'].observe(duration)
+        self.runs += 1
+        self.faces += len(faces)
+        self.messages += len(batch)
+        self._avg_inference = duration if not self._avg_inference else 0.8 * self._avg_inference + 0.2 * duration
+
+        offset = 0
+        now = time.time()
+        for message in batch:
+            size = len(message['tracks'])
+            latency = now - message['timestamp']
+            self._avg_latency = latency if not self._avg_latency else 0.9 * self._avg_latency + 0.1 * latency
+            try:
+                self.on_results(message, results[offset:offset + size])
+            except Exception as e:
+                print(f"⚠️  Error guardando resultados de {message['source_id']}: {e}")
+            offset += size
+
+# ======================== REGISTRO ========================
+
+class EmotionRecorder:
+    """
+    Guarda cada cambio de emoción por (source_id, track_id)
+
+    Con EmotionDatabase usa insert_emotion (escritura por lotes y spool
+    propio); sin base de datos, los documentos van al spool local.
+    """
+
+    def __init__(self, db=None, spool=None, session_id: Optional[str] = None,
+                 threshold: float = CONFIDENCE_THRESHOLD, verbose: bool = True):
+        self.db = db
+        self.spool = spool
+        self.session_id = session_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.threshold = threshold
+        self.verbose = verbose
+        if db is None:
+            from detector.database import build_emotion_document
+            self._build = build_emotion_document
+        self._last_emotions: Dict[str, Dict[int, str]] = {}
+        self.recorded: Dict[str, int] = {}
+
+    def __call__(self, message: Dict, results: List):
+        source_id = message['source_id']
+        last = self._last_emotions.setdefault(source_id, {})
+
+        for face_index, ((track_id, _), (emotion, confidence, all_emotions)) in enumerate(zip(message['tracks'], results)):
+            if not emotion or confidence < self.threshold or emotion == last.get(track_id):
+                continue
+            last[track_id] = emotion
+            self.recorded[source_id] = self.recorded.get(source_id, 0) + 1
+
+            metadata = {
+                'session_id': self.session_id,
+                'source_id': source_id,
+                'face_index': face_index,
+                'track_id': track_id,
+                'all_emotions': all_emotions,
+                'source': 'multicam'
+            }
+            if self.db:
+                with metrics.timer(metrics.STAGE['db_write']):
+                    self.db.insert_emotion(emotion, confidence, metadata)
+            elif self.spool:
+                self.spool.append([self._build(emotion, confidence, metadata)])
+
+            if self.verbose:
+                timestamp = datetime.fromtimestamp(message['timestamp']).strftime("%H:%M:%S")
+                print(f"[{timestamp}] {source_id:10} #{track_id} {emotion:12} ({confidence * 100:.1f}%)")
+
+        # Olvidar rostros que ya no se siguen en esa fuente
+        active_ids = {track_id for track_id, _ in message['tracks']}
+        for track_id in list(last):
+            if track_id not in active_ids:
+                del last[track_id]
+
+# ======================== ADMINISTRADOR ========================
+
+class MultiCameraManager:
+    """
+    Procesos de captura (uno por fuente) y el servicio de inferencia.
+
+    Los procesos se crean con 'spawn': no heredan el modelo ni los
+    hilos del proceso principal y solo importan OpenCV.
+    """
+
+    def __init__(self, sources: Sequence[VideoSource], on_results: Callable[[Dict, List], None],
+                 engine: Optional[EmotionEngine] = None,
+                 realtime: bool = False, loop: bool = False,
+                 queue_size: int = MULTICAM_QUEUE_SIZE,
+                 max_batch: int = MULTICAM_MAX_BATCH,
+                 max_wait: float = MULTICAM_MAX_WAIT):
+        self.sources = list(sources)
+        self.realtime = realtime
+        self.loop = loop
+
+        context = mp.get_context('spawn')
+        self._context = context
+        self.faces_queue = context.Queue(maxsize=queue_size)
+        self.status_queue = context.Queue()
+        self.stop_event = context.Event()
+        self.processes: Dict[str, mp.Process] = {}
+        self.status: Dict[str, Dict] = {
+            source.source_id: {'source_id': source.source_id, 'connected': False, 'finished': False,
+                               'fps': 0.0, 'frames': 0, 'batches': 0, 'faces': 0, 'dropped': 0,
+                               'reconnects': 0}
+            for source in self.sources
+        }
+        self.service = InferenceService(engine or get_engine(), self.faces_queue, on_results,
+                                        max_batch=max_batch, max_wait=max_wait)
+
+    @property
+    def running(self) -> bool:
+        return any(process.is_alive() for process in self.processes.values())
+
+    def start(self):
+        """Carga el modelo, inicia el servicio y después las capturas"""
+        self.service.engine.load()
+        self.service.start()
+        for source in self.sources:
+            process = self._context.Process(
+                target=capture_worker, name=f"capture-{source.source_id}",
+                args=(source, self.faces_queue, self.status_queue, self.stop_event,
+                      self.realtime, self.loop),
+                daemon=True
+            )
+            process.start()
+            self.processes[source.source_id] = process
+
+    def poll(self) -> Dict[str, Dict]:
+        """Lee los reportes pendientes de los procesos de captura"""
+        while True:
+            try:
+                report = self.status_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.status[report['source_id']].update(report)
+            metrics.FPS.labels(source=report['source_id']).set(report['fps'])
+        return self.status
+
+    def stop(self):
+        """Detiene las capturas, termina de clasificar lo encolado y libera todo"""
+        self.stop_event.set()
+        # El servicio sigue leyendo la cola mientras terminan (un put pendiente no bloquea el join)
+        for process in self.processes.values():
+            process.join(JOIN_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.service.stop()
+        self.poll()
+
+    def stats(self) -> Dict:
+        return {'sources': self.poll(), 'inference': self.service.stats()}
+
+# ======================== FUNCIÓN PRINCIPAL ========================
+
+def print_status(manager: MultiCameraManager, started: float):
+    stats = manager.stats()
+    elapsed = time.perf_counter() - started
+    print(f"\n📊 {elapsed:.0f}s")
+    for source_id, status in stats['sources'].items():
+        state = '✅' if status['connected'] else ('⏹️ ' if status['finished'] else '🔄')
+        error = f" ⚠️  {status['error']}" if status.get('error') else ''
+        print(f"   {state} {source_id:12} {status['fps']:5.1f} FPS | {status['frames']} frames | "
+              f"{status['faces']} rostros | {status['dropped']} descartados | "
+              f"{status['reconnects']} reconexiones{error}")
+    inference = stats['inference']
+    print(f"   🧠 {inference['runs']} lotes de {inference['avg_batch']} rostros | "
+          f"{inference['avg_inference_ms']} ms por lote | {inference['avg_latency_ms']} ms captura→resultado")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingesta de varias cámaras con inferencia compartida")
+    parser.add_argument('--sources', nargs='+', help="Fuentes ('0', 'sala=rtsp://...', 'video.mp4'); por defecto CAMERA_SOURCES")
+    parser.add_argument('--realtime', action='store_true', help="Leer los archivos a su FPS")
+    parser.add_argument('--loop', action='store_true', help="Repetir los archivos al terminar")
+    parser.add_argument('--duration', type=float, default=0, help="Segundos de ejecución (0 = hasta Ctrl+C)")
+    parser.add_argument('--queue-size', type=int, default=MULTICAM_QUEUE_SIZE)
+    parser.add_argument('--max-batch', type=int, default=MULTICAM_MAX_BATCH)
+    parser.add_argument('--max-wait', type=float, default=MULTICAM_MAX_WAIT)
+    parser.add_argument('--status-every', type=float, default=10.0, help="Segundos entre resúmenes")
+    parser.add_argument('--quiet', action='store_true', help="No imprimir cada detección")
+    args = parser.parse_args()
+
+    sources = parse_sources(args.sources or [])
+    print(f"📹 {len(sources)} fuentes: " + ", ".join(f"{s.source_id} ({s.uri})" for s in sources))
+
+    try:
+        from detector.database import EmotionDatabase
+        db = EmotionDatabase()
+        spool = None
+    except Exception as e:
+        from detector.spool import EmotionSpool
+        print(f"❌ Error de MongoDB: {e}")
+        print("⚠️  Continuando sin base de datos (detecciones en spool local)...")
+        db = None
+        spool = EmotionSpool()
+
+    recorder = EmotionRecorder(db, spool, verbose=not args.quiet)
+    manager = MultiCameraManager(sources, recorder, realtime=args.realtime, loop=args.loop,
+                                 queue_size=args.queue_size, max_batch=args.max_batch,
+                                 max_wait=args.max_wait)
+
+    print("🔄 Cargando modelo de IA...")
+    metrics.start_metrics_server()
+    started = time.perf_counter()
+    last_status = started
+
+    try:
+        manager.start()
+        print("✅ Capturando (Ctrl+C para salir)")
+        while manager.running:
+            time.sleep(0.5)
+            manager.poll()
+            now = time.perf_counter()
+            if args.duration and now - started >= args.duration:
+                break
+            if now - last_status >= args.status_every:
+                print_status(manager, started)
+                last_status = now
+    except KeyboardInterrupt:
+        print("\n👋 Detenido por usuario")
+    finally:
+        manager.stop()
+        print_status(manager, started)
+        if recorder.recorded:
+            print("   💾 Guardadas: " + ", ".join(f"{k}={v}" for k, v in recorder.recorded.items()))
+        if db:
+            db.close()
+        if spool:
+            spool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Planificador adaptativo de inferencia
+Decide en cada frame si vale la pena clasificar los rostros según cuánto
+cambiaron, el tiempo desde la última inferencia y un presupuesto de
+cómputo por segundo, en lugar de un intervalo fijo de frames
+"""
+
+import os
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ======================== CONFIGURACIÓN ========================
+
+INFERENCE_MIN_INTERVAL = float(os.getenv('INFERENCE_MIN_INTERVAL', 0.15))  # segundos
+INFERENCE_MAX_INTERVAL = float(os.getenv('INFERENCE_MAX_INTERVAL', 1.0))   # segundos
+INFERENCE_BUDGET_MS = float(os.getenv('INFERENCE_BUDGET_MS', 300))         # ms de inferencia por segundo
+ROI_CHANGE_THRESHOLD = float(os.getenv('ROI_CHANGE_THRESHOLD', 0.06))      # diferencia media (0-1)
+
+SIGNATURE_SIZE = 24     # lado de la miniatura con que se compara cada rostro
+BUDGET_WINDOW = 1.0     # segundos de la ventana del presupuesto
+
+# Decisiones posibles (claves de las métricas)
+RUN_REASONS = ('new_face', 'change', 'max_interval')
+SKIP_REASONS = ('no_faces', 'min_interval', 'budget', 'static')
+
+# ======================== PLANIFICADOR ========================
+
+class InferenceScheduler:
+    """
+    Decide cuándo correr el clasificador.
+
+    En orden:
+    - sin rostros, o menos de `min_interval` desde la última → no
+    - rostro nuevo (track_id sin firma) o más de `max_interval` sin
+      inferir → sí, aunque se pase del presupuesto
+    - si correr ahora excede `budget_ms` en la última ventana → no
+    - cambio del ROI mayor que `change_threshold` (diferencia media de
+      miniaturas) → sí
+    - en otro caso el rostro está quieto → no
+
+    La duración real de cada inferencia se informa con record(); el
+    costo de la siguiente se estima con el promedio reciente. Con la
+    ventana vacía siempre se permite correr: una inferencia más larga
+    que todo el presupuesto no frena las siguientes para siempre.
+    """
+
+    def __init__(self, min_interval: float = INFERENCE_MIN_INTERVAL,
+                 max_interval: float = INFERENCE_MAX_INTERVAL,
+                 budget_ms: float = INFERENCE_BUDGET_MS,
+                 change_threshold: float = ROI_CHANGE_THRESHOLD,
+                 clock=time.monotonic):
+        """
+        Args:
+            min_interval: Segundos mínimos entre inferencias
+            max_interval: Segundos máximos sin inferir si hay rostros
+            budget_ms: Milisegundos de inferencia permitidos por segundo
+            change_threshold: Cambio del ROI que dispara una inferencia
+            clock: Reloj en segundos (inyectable para benchmarks)
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget_ms = budget_ms
+        self.change_threshold = change_threshold
+        self.clock = clock
+
+        self._signatures: Dict[int, np.ndarray] = {}
+        self._last_run = float('-inf')
+        self._durations = deque()    # (fin, segundos) dentro de la ventana
+        self._avg_duration = 0.0
+
+        self.decisions = {reason: 0 for reason in RUN_REASONS + SKIP_REASONS}
+        self.last_change = 0.0
+
+    def should_run(self, gray: np.ndarray, tracks: List[Tuple[int, Tuple[int, int, int, int]]]) -> bool:
+        """
+        Args:
+            gray: Frame en gris donde están los rostros
+            tracks: Lista de (track_id, (x, y, w, h))
+
+        Returns:
+            True si hay que clasificar los rostros de este frame
+        """
+        now = self.clock()
+        reason = self._decide(now, gray, tracks)
+        self.decisions[reason] += 1
+
+        if reason not in RUN_REASONS:
+            return False
+
+        self._last_run = now
+        self._signatures = {track_id: self._signature(gray, box) for track_id, box in tracks}
+        return True
+
+    def record(self, duration: float):
+        """Informa cuánto tardó una inferencia (segundos)"""
+        self._durations.append((self.clock(), duration))
+        # Promedio móvil exponencial para estimar la próxima
+        self._avg_duration = duration if not self._avg_duration else 0.8 * self._avg_duration + 0.2 * duration
+
+    def utilization(self) -> float:
+        """Fracción del presupuesto usada en la última ventana"""
+        if self.budget_ms <= 0:
+            return 0.0
+        return self._spent(self.clock()) * 1000 / self.budget_ms
+
+    def stats(self) -> Dict:
+        runs = sum(self.decisions[reason] for reason in RUN_REASONS)
+        skips = sum(self.decisions[reason] for reason in SKIP_REASONS)
+        return {
+            'runs': runs,
+            'skips': skips,
+            'decisions': dict(self.decisions),
+            'budget_ms': self.budget_ms,
+            'budget_utilization': round(self.utilization(), 3),
+            'avg_inference_ms': round(self._avg_duration * 1000, 2),
+            'last_change': round(self.last_change, 4)
+        }
+
+    # ---------- Internos ----------
+
+    def _decide(self, now: float, gray: np.ndarray, tracks) -> str:
+        if not tracks:
+            self._signatures = {}
+            return 'no_faces'
+
+        elapsed = now - self._last_run
+        if elapsed < self.min_interval:
+            return 'min_interval'
+
+        if any(track_id not in self._signatures for track_id, _ in tracks):
+            return 'new_face'
+
+        if elapsed >= self.max_interval:
+            return 'max_interval'
+
+        spent = self._spent(now)
+        if self.budget_ms > 0 and spent > 0 and (spent + self._avg_duration) * 1000 > self.budget_ms:
+            return 'budget'
+
+        self.last_change = max(
+            float(np.mean(np.abs(self._signature(gray, box) - self._signatures[track_id])))
+            for track_id, box in tracks
+        )
+        if self.last_change >= self.change_threshold:
+            return 'change'
+
+        return 'static'
+
+    def _spent(self, now: float) -> float:
+        """Segundos de inferencia dentro de la ventana del presupuesto"""
+        while self._durations and now - self._durations[0][0] > BUDGET_WINDOW:
+            self._durations.popleft()
+        return sum(duration for _, duration in self._durations)
+
+    @staticmethod
+    def _signature(gray: np.ndarray, box) -> np.ndarray:
+        """Miniatura normalizada del rostro para medir cambios"""
+        x, y, w, h = box
+        roi = gray[max(0, y):y+h, max(0, x):x+w]
+        if roi.size == 0:
+            return np.zeros((SIGNATURE_SIZE, SIGNATURE_SIZE), dtype=np.float32)
+        thumbnail = cv2.resize(roi, (SIGNATURE_SIZE, SIGNATURE_SIZE), interpolation=cv2.INTER_AREA)
+        return thumbnail.astype(np.float32) / 255.0
@@ -0,0 +1,368 @@
+"""
+Spool local durable para emociones
+Segmentos JSONL append-only que guardan los documentos completos
+mientras MongoDB está caído o lento, y un replayer que los sube
+en orden cuando la conexión vuelve
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from bson import json_util
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+load_dotenv()
+
+# ======================== CONFIGURACIÓN ========================
+
+SPOOL_DIR = os.getenv('SPOOL_DIR', 'spool')
+SPOOL_SEGMENT_BYTES = int(os.getenv('SPOOL_SEGMENT_BYTES', 4 * 1024 * 1024))     # 4 MB
+SPOOL_MAX_BYTES = int(os.getenv('SPOOL_MAX_BYTES', 256 * 1024 * 1024))           # 256 MB
+SPOOL_SEGMENT_MAX_AGE = float(os.getenv('SPOOL_SEGMENT_MAX_AGE', 30))           # segundos
+SPOOL_REPLAY_INTERVAL = float(os.getenv('SPOOL_REPLAY_INTERVAL', 10))           # segundos
+
+FSYNC_EVERY = 50        # documentos entre fsync
+FSYNC_INTERVAL = 1.0    # segundos máximos sin fsync
+REPLAY_CHUNK = 500      # documentos por insert_many al reenviar
+
+ACTIVE_SUFFIX = '.jsonl.part'
+CLOSED_SUFFIX = '.jsonl'
+REWRITE_SUFFIX = '.jsonl.tmp'
+REPLAY_LOCK = '.replay.lock'
+
+# Campo que se guarda en MongoDB con los documentos reenviados; el
+# change stream los ignora para no publicarlos otra vez
+REPLAYED_FIELD = 'replayed'
+
+
+class PartialInsertError(Exception):
+    """
+    Corte de conexión a mitad de un insert: el servidor confirmó parte
+    del lote (`inserted`, ya sumado a los rollups) y el resto no (`remaining`)
+    """
+
+    def __init__(self, inserted: List[Dict], remaining: List[Dict], cause: Exception):
+        super().__init__(f"{len(inserted)} de {len(inserted) + len(remaining)} documentos escritos: {cause}")
+        self.inserted = inserted
+        self.remaining = remaining
+
+# ======================== SPOOL ========================
+
+class EmotionSpool:
+    """
+    Spool en disco con segmentos rotativos.
+
+    Se escribe siempre en un segmento activo (*.jsonl.part). Al superar
+    SPOOL_SEGMENT_BYTES o SPOOL_SEGMENT_MAX_AGE se cierra (*.jsonl) y
+    queda listo para reenviar. Si el total supera SPOOL_MAX_BYTES se
+    borran los segmentos cerrados más antiguos.
+    """
+
+    def __init__(self, directory: str = SPOOL_DIR,
+                 segment_bytes: int = SPOOL_SEGMENT_BYTES,
+                 max_bytes: int = SPOOL_MAX_BYTES,
+                 segment_max_age: float = SPOOL_SEGMENT_MAX_AGE):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.segment_max_age = segment_max_age
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._opened_at = 0.0
+        self._sequence = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        self.spooled = 0
+        self.evicted_segments = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._recover_orphans()
+
+    # ---------- Escritura ----------
+
+    def append(self, documents: List[Dict]):
+        """Agrega documentos completos al segmento activo"""
+        if not documents:
+            return
+
+        lines = ''.join(json_util.dumps(doc) + '\n' for doc in documents)
+
+        with self._lock:
+            if self._file is None:
+                self._open_segment()
+
+            self._file.write(lines)
+            self._file.flush()
+            self.spooled += len(documents)
+            self._unsynced += len(documents)
+
+            # fsync por lotes: cada N documentos o cada T segundos
+            if (self._unsynced >= FSYNC_EVERY or
+                    time.monotonic() - self._last_sync >= FSYNC_INTERVAL):
+                self._sync()
+
+            if self._file.tell() >= self.segment_bytes:
+                self._close_segment()
+
+    def maintain(self):
+        """fsync pendiente y cierre del segmento activo si es viejo"""
+        with self._lock:
+            if self._file is None:
+                return
+            if self._unsynced:
+                self._sync()
+            if time.monotonic() - self._opened_at >= self.segment_max_age:
+                self._close_segment()
+
+    def close(self):
+        """Cierra el segmento activo (queda listo para reenviar)"""
+        with self._lock:
+            if self._file is not None:
+                self._close_segment()
+
+    # ---------- Lectura ----------
+
+    def closed_segments(self) -> List[str]:
+        """Segmentos cerrados, del más antiguo al más reciente"""
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(CLOSED_SUFFIX))
+        return [os.path.join(self.directory, n) for n in names]
+
+    @staticmethod
+    def read_segment(path: str) -> List[Dict]:
+        """Lee un segmento; una última línea truncada (caída) se ignora"""
+        documents = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    documents.append(json_util.loads(line))
+                except ValueError:
+                    print(f"⚠️  Línea corrupta ignorada en {os.path.basename(path)}")
+        return documents
+
+    @staticmethod
+    def remove_segment(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Ya reenviado (o descartado) por otro proceso
+
+    @staticmethod
+    def rewrite_segment(path: str, documents: List[Dict]):
+        """Reemplaza un segmento cerrado por los documentos que aún faltan"""
+        if not documents:
+            EmotionSpool.remove_segment(path)
+            return
+        tmp = path[:-len(CLOSED_SUFFIX)] + REWRITE_SUFFIX
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(''.join(json_util.dumps(doc) + '\n' for doc in documents))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def stats(self) -> Dict:
+        """Estado del spool"""
+        segments = self.closed_segments()
+        return {
+            'segments': len(segments),
+            'bytes': self._total_bytes(),
+            'spooled': self.spooled,
+            'evicted_segments': self.evicted_segments
+        }
+
+    # ---------- Internos ----------
+
+    def _open_segment(self):
+        self._sequence += 1
+        name = f"spool-{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{os.getpid()}-{self._sequence:04d}"
+        self._path = os.path.join(self.directory, name + ACTIVE_SUFFIX)
+        self._file = open(self._path, 'a', encoding='utf-8')
+        self._opened_at = time.monotonic()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _close_segment(self):
+        self._sync()
+        self._file.close()
+        os.replace(self._path, self._path[:-len(ACTIVE_SUFFIX)] + CLOSED_SUFFIX)
+        self._file = None
+        self._path = None
+        self._enforce_limit()
+
+    def _recover_orphans(self):
+        """Cierra segmentos activos abandonados por procesos que ya no corren"""
+        max_age = self.segment_max_age * 10
+        for name in os.listdir(self.directory):
+            if not name.endswith(ACTIVE_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            if time.time() - os.path.getmtime(path) >= max_age:
+                os.replace(path, path[:-len(ACTIVE_SUFFIX)] + CLOSED_SUFFIX)
+
+    def _total_bytes(self) -> int:
+        total = 0
+        for name in os.listdir(self.directory):
+            try:
+                total += os.path.getsize(os.path.join(self.directory, name))
+            except OSError:
+                pass
+        return total
+
+    def _enforce_limit(self):
+        """Borra los segmentos cerrados más antiguos si se supera el límite"""
+        segments = self.closed_segments()
+        while segments and self._total_bytes() > self.max_bytes:
+            oldest = segments.pop(0)
+            try:
+                os.remove(oldest)
+            except FileNotFoundError:
+                continue
+            self.evicted_segments += 1
+            print(f"⚠️  Spool lleno: segmento descartado {os.path.basename(oldest)}")
+
+# ======================== REPLAYER ========================
+
+class ReplayLock:
+    """
+    Lock exclusivo entre procesos sobre un directorio de spool: la API
+    y el CLI pueden compartir SPOOL_DIR y solo uno debe reenviarlo a la vez
+    """
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, REPLAY_LOCK)
+        self._file = None
+
+    def acquire(self) -> bool:
+        """Sin bloquear: False si otro proceso está reenviando"""
+        f = open(self.path, 'a+')
+        try:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+
+class SpoolReplayer:
+    """
+    Hilo que reenvía los segmentos cerrados en orden.
+
+    Los documentos conservan su _id, así que un reenvío parcial o
+    repetido no genera duplicados. Si MongoDB se cae a mitad, el segmento
+    se reescribe con lo que falta y se reintenta en el próximo intervalo.
+    Un segmento que ya no existe lo reenvió otro proceso.
+    """
+
+    def __init__(self, spool: EmotionSpool, insert_fn: Callable[[List[Dict]], object],
+                 interval: float = SPOOL_REPLAY_INTERVAL):
+        """
+        Args:
+            spool: Spool a reenviar
+            insert_fn: Inserción idempotente de un lote (lanza excepción si falla)
+            interval: Segundos entre intentos
+        """
+        self.spool = spool
+        self.insert_fn = insert_fn
+        self.interval = interval
+        self.replayed = 0
+        self._failing = False
+        self._lock = ReplayLock(spool.directory)
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='spool-replayer', daemon=True)
+        self._thread.start()
+
+    def replay(self) -> int:
+        """
+        Reenvía todos los segmentos cerrados
+
+        Returns:
+            Documentos reenviados en esta pasada
+        """
+        self.spool.maintain()
+        if not self._lock.acquire():
+            return 0  # Otro proceso está reenviando este spool
+
+        sent = 0
+        try:
+            for path in self.spool.closed_segments():
+                try:
+                    documents = self.spool.read_segment(path)
+                except FileNotFoundError:
+                    continue
+                sent += self._replay_segment(path, documents)
+        finally:
+            self._lock.release()
+            self.replayed += sent
+
+        if sent:
+            print(f"✅ Spool: {sent} emociones reenviadas a MongoDB")
+        return sent
+
+    def _replay_segment(self, path: str, documents: List[Dict]) -> int:
+        """Reenvía un segmento; si falla, lo deja solo con lo no confirmado"""
+        for i in range(0, len(documents), REPLAY_CHUNK):
+            chunk = documents[i:i + REPLAY_CHUNK]
+            for doc in chunk:
+                doc[REPLAYED_FIELD] = True
+            try:
+                self.insert_fn(chunk)
+            except PartialInsertError as e:
+                self.spool.rewrite_segment(path, e.remaining + documents[i + REPLAY_CHUNK:])
+                raise
+            except Exception:
+                # Sin los lotes ya confirmados y con las marcas que dejó insert_fn
+                self.spool.rewrite_segment(path, documents[i:])
+                raise
+
+        self.spool.remove_segment(path)
+        return len(documents)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.replay()
+                self._failing = False
+            except Exception as e:
+                # Avisar una sola vez por caída, no en cada intento
+                if not self._failing:
+                    print(f"⚠️  Spool: MongoDB no disponible, reintentando ({e})")
+                self._failing = True
@@ -0,0 +1,265 @@
+"""
+Seguimiento de rostros entre detecciones
+La cascada Haar corre cada DETECT_EVERY frames (o cuando el seguimiento
+pierde confianza); en los frames intermedios cada rostro se sigue con un
+tracker barato y conserva un track_id persistente
+"""
+
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ======================== CONFIGURACIÓN ========================
+
+TRACKING_ENABLED = os.getenv('TRACKING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+DETECT_EVERY = int(os.getenv('DETECT_EVERY', 10))          # frames entre detecciones completas
+TRACKER_TYPE = os.getenv('TRACKER_TYPE', 'template')       # template | mosse | kcf | csrt
+TRACK_MIN_SCORE = float(os.getenv('TRACK_MIN_SCORE', 0.5)) # debajo de esto se vuelve a detectar
+
+IOU_MATCH = 0.3         # IoU mínimo para asociar una detección a un track
+SEARCH_PADDING = 0.5    # margen de búsqueda del template, en fracción del rostro
+MAX_MISSES = 1          # detecciones seguidas sin asociar antes de descartar un track
+
+Box = Tuple[int, int, int, int]
+
+# ======================== FUNCIONES ========================
+
+def iou(a: Box, b: Box) -> float:
+    """Intersección sobre unión de dos rectángulos (x, y, w, h)"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def clip_box(box, width: int, height: int) -> Optional[Box]:
+    """
+    Recorta el rectángulo al frame
+
+    Los trackers de OpenCV (KCF/MOSSE/CSRT) pueden devolver x/y negativos
+    o rectángulos que salen del borde; un índice negativo en el slicing
+    da un recorte vacío o del lado opuesto.
+
+    Returns:
+        (x, y, w, h) dentro del frame, o None si no queda área
+    """
+    x, y, w, h = (int(v) for v in box)
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(width, x + w), min(height, y + h)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def _create_opencv_tracker(tracker_type: str):
+    """Tracker de OpenCV si la build lo trae (KCF/MOSSE/CSRT vienen en contrib)"""
+    name = {'mosse': 'TrackerMOSSE_create',
+            'kcf': 'TrackerKCF_create',
+            'csrt': 'TrackerCSRT_create'}.get(tracker_type)
+    if name is None:
+        return None
+    for module in (getattr(cv2, 'legacy', None), cv2):
+        factory = getattr(module, name, None) if module is not None else None
+        if factory is not None:
+            return factory()
+    return None
+
+# ======================== TRACKS ========================
+
+class Track:
+    """Un rostro seguido entre frames"""
+
+    def __init__(self, track_id: int, box: Box):
+        self.track_id = track_id
+        self.box = box
+        self.score = 1.0
+        self.misses = 0
+        self.template: Optional[np.ndarray] = None
+        self.tracker = None
+
+    def init(self, gray: np.ndarray, image: np.ndarray, tracker_type: str):
+        """(Re)inicia el seguimiento desde una detección"""
+        x, y, w, h = self.box
+        self.score = 1.0
+        self.template = None
+        self.tracker = _create_opencv_tracker(tracker_type)
+        if self.tracker is not None:
+            self.tracker.init(image, self.box)
+        else:
+            self.template = gray[y:y+h, x:x+w].copy()
+
+    def follow(self, gray: np.ndarray, image: np.ndarray):
+        """Avanza un frame sin detector"""
+        if self.tracker is not None:
+            ok, box = self.tracker.update(image)
+            box = clip_box(box, gray.shape[1], gray.shape[0]) if ok else None
+            # Fuera del frame cuenta como perdido: se vuelve a detectar
+            self.score = 1.0 if box else 0.0
+            if box:
+                self.box = box
+            return
+
+        # Template matching en una ventana alrededor de la última posición
+        x, y, w, h = self.box
+        pad_x, pad_y = int(w * SEARCH_PADDING), int(h * SEARCH_PADDING)
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1 = min(gray.shape[1], x + w + pad_x)
+        y1 = min(gray.shape[0], y + h + pad_y)
+
+        window = gray[y0:y1, x0:x1]
+        th, tw = self.template.shape
+        if window.shape[0] < th or window.shape[1] < tw:
+            self.score = 0.0
+            return
+
+        result = cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (dx, dy) = cv2.minMaxLoc(result)
+        self.score = float(score)
+        self.box = (x0 + dx, y0 + dy, tw, th)
+
+# ======================== TRACKER ========================
+
+class FaceTracker:
+    """
+    Detecta cada `detect_every` frames y sigue los rostros en el resto.
+
+    Se vuelve a detectar antes de tiempo si algún track baja de
+    `min_score`. Las detecciones se asocian a los tracks existentes por
+    IoU, así el track_id se mantiene mientras la persona siga en cuadro.
+    Con `enabled=False` se detecta en todos los frames (mismos track_id).
+    """
+
+    def __init__(self, detect_fn: Callable[[np.ndarray], object],
+                 detect_every: int = DETECT_EVERY,
+                 tracker_type: str = TRACKER_TYPE,
+                 min_score: float = TRACK_MIN_SCORE,
+                 enabled: bool = TRACKING_ENABLED):
+        """
+        Args:
+            detect_fn: Detector sobre la imagen en gris, retorna (x, y, w, h)
+            detect_every: Frames entre detecciones completas
+            tracker_type: 'template' o un tracker de OpenCV (mosse, kcf, csrt)
+            min_score: Confianza mínima del seguimiento
+            enabled: False = detectar en cada frame
+        """
+        self.detect_fn = detect_fn
+        self.detect_every = max(1, detect_every)
+        self.tracker_type = tracker_type
+        self.min_score = min_score
+        self.enabled = enabled
+
+        if tracker_type != 'template' and _create_opencv_tracker(tracker_type) is None:
+            print(f"⚠️  Tracker '{tracker_type}' no disponible en esta build de OpenCV, usando template")
+            self.tracker_type = 'template'
+
+        self.tracks: List[Track] = []
+        self._next_id = 1
+        self._since_detection = 0
+
+        self.frames = 0
+        self.detections = 0
+
+    def update(self, gray: np.ndarray, image: Optional[np.ndarray] = None) -> List[Tuple[int, Box]]:
+        """
+        Procesa un frame
+
+        Args:
+            gray: Frame en escala de grises
+            image: Frame BGR para los trackers de OpenCV (por defecto gray)
+
+        Returns:
+            Lista de (track_id, (x, y, w, h)) dentro del frame, de izquierda a derecha
+        """
+        image = gray if image is None else image
+        self.frames += 1
+        self._since_detection += 1
+
+        needs_detection = (
+            not self.enabled
+            or not self.tracks
+            or self._since_detection >= self.detect_every
+            or any(track.score < self.min_score for track in self.tracks)
+        )
+
+        if needs_detection:
+            self._detect(gray, image)
+        else:
+            for track in self.tracks:
+                track.follow(gray, image)
+
+        return [(track.track_id, track.box)
+                for track in sorted(self.tracks, key=lambda t: (t.box[0], t.box[1]))]
+
+    def reset(self):
+        """Olvida todos los tracks (p. ej. al reabrir la cámara)"""
+        self.tracks = []
+        self._since_detection = 0
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'tracker': self.tracker_type,
+            'detect_every': self.detect_every,
+            'frames': self.frames,
+            'detections': self.detections,
+            'detection_ratio': round(self.detections / self.frames, 3) if self.frames else 0.0,
+            'active_tracks': len(self.tracks)
+        }
+
+    def _detect(self, gray: np.ndarray, image: np.ndarray):
+        """Detección completa y asociación greedy por IoU"""
+        self.detections += 1
+        self._since_detection = 0
+        height, width = gray.shape[:2]
+        boxes = [box for box in (clip_box(box, width, height) for box in self.detect_fn(gray)) if box]
+
+        pairs = sorted(
+            ((iou(track.box, box), t, b)
+             for t, track in enumerate(self.tracks)
+             for b, box in enumerate(boxes)),
+            reverse=True
+        )
+
+        matched_tracks, matched_boxes = set(), set()
+        for overlap, t, b in pairs:
+            if overlap < IOU_MATCH:
+                break
+            if t in matched_tracks or b in matched_boxes:
+                continue
+            matched_tracks.add(t)
+            matched_boxes.add(b)
+            track = self.tracks[t]
+            track.box = boxes[b]
+            track.misses = 0
+            track.init(gray, image, self.tracker_type)
+
+        # Tracks sin detección: se siguen un poco más antes de descartarlos
+        kept = []
+        for t, track in enumerate(self.tracks):
+            if t in matched_tracks:
+                kept.append(track)
+                continue
+            track.misses += 1
+            if track.misses <= MAX_MISSES and self.enabled:
+                track.follow(gray, image)
+                if track.score >= self.min_score:
+                    kept.append(track)
+
+        # Detecciones nuevas
+        for b, box in enumerate(boxes):
+            if b in matched_boxes:
+                continue
+            track = Track(self._next_id, box)
+            self._next_id += 1
+            track.init(gray, image, self.tracker_type)
+            kept.append(track)
+
+        self.tracks = kept
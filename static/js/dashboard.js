@@ -24,6 +24,10 @@ const EMOTION_COLORS = {
 
 let videoWs = null;
 let dataWs = null;
+let frameDecoding = false;
+let dataSeq = 0;
+let liveStats = null;
+let liveRecent = [];
 let emotionPieChart = null;
 let hourlyChart = null;
 
@@ -38,13 +42,9 @@ document.addEventListener('DOMContentLoaded', async () => {
     // Cargar datos iniciales
     await loadInitialData();
     
-    // Conectar WebSockets
+    // Conectar WebSockets (las estadísticas y recientes llegan por /ws/data)
     connectVideoWebSocket();
     connectDataWebSocket();
-    
-    // Actualizar cada 30 segundos
-    setInterval(loadStats, 30000);
-    setInterval(loadRecent, 30000);
 });
 
 // ==================== WEBSOCKET VIDEO ====================
@@ -57,6 +57,7 @@ function connectVideoWebSocket() {
     updateStatus('Conectando...', 'connecting');
     
     videoWs = new WebSocket(wsUrl);
+    videoWs.binaryType = 'blob';
     
     videoWs.onopen = () => {
         console.log('✅ WebSocket de video conectado');
@@ -65,16 +66,16 @@ function connectVideoWebSocket() {
     };
     
     videoWs.onmessage = (event) => {
+        // Mensajes binarios: JPEG crudo
+        if (event.data instanceof Blob) {
+            displayFrame(event.data);
+            return;
+        }
+        
         const data = JSON.parse(event.data);
         
-        if (data.type === 'frame') {
-            // Mostrar frame en canvas
-            displayFrame(data.frame);
-            
-            // Actualizar emoción si hay datos
-            if (data.emotion) {
-                updateCurrentEmotion(data.emotion);
-            }
+        if (data.type === 'emotion' && data.emotion) {
+            updateCurrentEmotion(data.emotion);
         }
     };
     
@@ -107,8 +108,15 @@ function connectDataWebSocket() {
     dataWs.onmessage = (event) => {
         const data = JSON.parse(event.data);
         
-        if (data.type === 'stats_update') {
-            updateStatsDisplay(data.data);
+        if (data.type === 'snapshot') {
+            applySnapshot(data);
+        } else if (data.type === 'delta') {
+            // Un salto en la secuencia significa que se perdió un delta
+            if (liveStats === null || data.seq !== dataSeq + 1) {
+                dataWs.send(JSON.stringify({ type: 'resync' }));
+                return;
+            }
+            applyDelta(data);
         }
     };
     
@@ -122,27 +130,63 @@ function connectDataWebSocket() {
     };
 }
 
-// ==================== MOSTRAR VIDEO ====================
+// ==================== ACTUALIZACIONES EN VIVO ====================
 
-function displayFrame(hexFrame) {
-    const canvas = document.getElementById('videoCanvas');
-    const ctx = canvas.getContext('2d');
+function applySnapshot(snapshot) {
+    dataSeq = snapshot.seq;
+    liveStats = snapshot.stats;
+    liveRecent = snapshot.recent || [];
     
-    // Convertir hex a bytes
-    const bytes = new Uint8Array(hexFrame.match(/.{1,2}/g).map(byte => parseInt(byte, 16)));
+    updateStatsDisplay(liveStats);
+    displayRecentEmotions(liveRecent.slice(0, 10));
+}
+
+function applyDelta(delta) {
+    dataSeq = delta.seq;
     
-    // Crear blob y convertir a imagen
-    const blob = new Blob([bytes], { type: 'image/jpeg' });
-    const url = URL.createObjectURL(blob);
+    // Contadores absolutos de las emociones que cambiaron
+    liveStats.emotions = liveStats.emotions || {};
+    Object.entries(delta.counters).forEach(([emotion, counter]) => {
+        if (counter.count > 0) {
+            liveStats.emotions[emotion] = counter;
+        } else {
+            delete liveStats.emotions[emotion];
+        }
+    });
+    liveStats.total_detections = delta.total_detections;
+    liveStats.dominant_emotion = delta.dominant_emotion;
+    updateStatsDisplay(liveStats);
+    
+    // Eventos nuevos al principio de la lista de recientes
+    if (delta.events.length > 0) {
+        liveRecent = delta.events.slice().reverse().concat(liveRecent).slice(0, 10);
+        displayRecentEmotions(liveRecent);
+    }
+}
+
+// ==================== MOSTRAR VIDEO ====================
+
+async function displayFrame(blob) {
+    // Si el frame anterior aún se decodifica, descartar este
+    if (frameDecoding) return;
+    frameDecoding = true;
     
-    const img = new Image();
-    img.onload = () => {
-        canvas.width = img.width;
-        canvas.height = img.height;
-        ctx.drawImage(img, 0, 0);
-        URL.revokeObjectURL(url);
-    };
-    img.src = url;
+    try {
+        const canvas = document.getElementById('videoCanvas');
+        const ctx = canvas.getContext('2d');
+        const bitmap = await createImageBitmap(blob);
+        
+        if (canvas.width !== bitmap.width || canvas.height !== bitmap.height) {
+            canvas.width = bitmap.width;
+            canvas.height = bitmap.height;
+        }
+        ctx.drawImage(bitmap, 0, 0);
+        bitmap.close();
+    } catch (error) {
+        console.error('Error decodificando frame:', error);
+    } finally {
+        frameDecoding = false;
+    }
 }
 
 // ==================== ACTUALIZAR EMOCIÓN ACTUAL ====================
@@ -0,0 +1,28 @@
+"""
+Configuración común de pytest: la raíz del repositorio en el path y las
+pruebas de integración opcionales (marca `integration`, se corren con
+RUN_INTEGRATION=1)
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RUN_INTEGRATION = os.getenv('RUN_INTEGRATION', 'false').lower() in ('1', 'true')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', "integration: necesita modelos exportados u otros recursos "
+                                       "fuera del repositorio; solo con RUN_INTEGRATION=1")
+
+
+def pytest_collection_modifyitems(config, items):
+    if RUN_INTEGRATION:
+        return
+    skip = pytest.mark.skip(reason="Prueba de integración: RUN_INTEGRATION=1 para correrla")
+    for item in items:
+        if 'integration' in item.keywords:
+            item.add_marker(skip)
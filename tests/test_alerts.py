@@ -0,0 +1,139 @@
+"""
+Pruebas de AlertDispatcher contra un servidor HTTP local de prueba
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api import alerts
+from api.alerts import AlertDispatcher
+
+
+class StubWebhook:
+    """Servidor local que responde con los códigos de `statuses` en orden (después 200)"""
+
+    def __init__(self):
+        self.statuses = []
+        self.requests = []  # (tiempo, ruta, cuerpo)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stub.requests.append((time.monotonic(), self.path, body))
+                self.send_response(stub.statuses.pop(0) if stub.statuses else 200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def url(self, path: str = '/webhook') -> str:
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def webhook():
+    stub = StubWebhook()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(alerts, 'RETRY_BASE_DELAY', 0.05)
+
+
+def dispatch(url: str, submissions, **options):
+    """Arranca el despachador, envía las alertas y espera a que termine"""
+    async def run():
+        dispatcher = AlertDispatcher(url=url, **{'rate_per_minute': 6000, **options})
+        dispatcher.start()
+        for emotion, confidence, metadata in submissions:
+            dispatcher.submit(emotion, confidence, metadata)
+        await dispatcher.stop(timeout=5)
+        return dispatcher
+
+    return asyncio.run(run())
+
+
+def test_alerts_within_window_are_coalesced(webhook):
+    dispatcher = dispatch(webhook.url(), [('Enojo', 0.9, {'track_id': i}) for i in range(5)],
+                          coalesce_window=0.2)
+
+    assert len(webhook.requests) == 1
+    body = webhook.requests[0][2]
+    assert body['count'] == 5
+    assert [alert['track_id'] for alert in body['alerts']] == list(range(5))
+    assert dispatcher.stats()['coalesced'] == 4
+    assert dispatcher.stats()['sent'] == 1
+
+
+def test_server_error_is_retried_with_backoff(webhook):
+    webhook.statuses = [503, 500]
+    dispatcher = dispatch(webhook.url(), [('Miedo', 0.8, None)], coalesce_window=0, max_retries=3)
+
+    assert len(webhook.requests) == 3
+    times = [t for t, _, _ in webhook.requests]
+    first_gap, second_gap = times[1] - times[0], times[2] - times[1]
+    assert first_gap >= alerts.RETRY_BASE_DELAY
+    assert second_gap >= 2 * alerts.RETRY_BASE_DELAY
+    assert dispatcher.stats()['retries'] == 2
+    assert dispatcher.stats()['sent'] == 1
+    assert dispatcher.stats()['failed'] == 0
+
+
+def test_client_error_is_not_retried(webhook):
+    webhook.statuses = [400]
+    dispatcher = dispatch(webhook.url(), [('Tristeza', 0.7, None)], coalesce_window=0, max_retries=3)
+
+    assert len(webhook.requests) == 1
+    assert dispatcher.stats()['retries'] == 0
+    assert dispatcher.stats()['failed'] == 1
+
+
+def test_full_queue_drops_without_blocking(webhook):
+    async def run():
+        # Sin start(): nadie consume la cola
+        dispatcher = AlertDispatcher(url=webhook.url(), queue_size=2)
+        start = time.perf_counter()
+        results = [dispatcher.submit('Enojo', 0.9) for _ in range(5)]
+        return dispatcher, results, time.perf_counter() - start
+
+    dispatcher, results, elapsed = asyncio.run(run())
+
+    assert results == [True, True, False, False, False]
+    assert dispatcher.stats()['dropped'] == 3
+    assert dispatcher.stats()['queued'] == 2
+    assert elapsed < 0.05
+    assert webhook.requests == []
+
+
+def test_configured_url_and_emotion_filter(webhook):
+    url = webhook.url('/hooks/aula-3')
+    dispatcher = AlertDispatcher(url=url, emotions=['Miedo'])
+    assert dispatcher.should_alert('Miedo')
+    assert not dispatcher.should_alert('Enojo')
+
+    dispatch(url, [('Miedo', 0.9, None)], emotions=['Miedo'], coalesce_window=0)
+    assert [path for _, path, _ in webhook.requests] == ['/hooks/aula-3']
+    assert webhook.requests[0][2]['emotion'] == 'Miedo'
+
+
+def test_empty_url_disables_alerts():
+    dispatcher = AlertDispatcher(url='')
+    assert not dispatcher.enabled
+    assert not dispatcher.should_alert('Enojo')
+    assert dispatcher.submit('Enojo', 0.9) is False
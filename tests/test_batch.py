@@ -0,0 +1,87 @@
+"""
+Lotes con checkpoint: una tarea que falla no detiene el lote, queda
+registrada en el checkpoint y se reintenta al reanudar sin duplicar
+líneas en el JSONL. Sin modelo: process_task falso en un pool de hilos.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from detector import batch
+
+
+TASKS = [{'id': name} for name in ('a', 'b', 'c', 'd')]
+
+
+def fake_process(broken):
+    def process_task(task, stride):
+        if task['id'] in broken:
+            raise ValueError(f"video corrupto {task['id']}")
+        return {'id': task['id'], 'frames': 2,
+                'records': [{'source': task['id'], 'frame': frame} for frame in range(2)]}
+    return process_task
+
+
+def run(tmp_path, monkeypatch, broken=()):
+    """Un lote como en main(): checkpoint, tareas pendientes y JSONL"""
+    monkeypatch.setattr(batch, 'process_task', fake_process(set(broken)))
+    checkpoint_path = str(tmp_path / 'out.checkpoint.json')
+    checkpoint = batch.load_checkpoint(checkpoint_path)
+    pending = [task for task in TASKS if task['id'] not in set(checkpoint['completed'])]
+
+    sink = batch.JsonlSink(str(tmp_path / 'out.jsonl'), offset=checkpoint['offset'])
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            report = batch.run_tasks(pool, pending, sink, checkpoint_path, checkpoint, in_flight=2)
+    finally:
+        sink.close()
+    return report, batch.load_checkpoint(checkpoint_path)
+
+
+def output_sources(tmp_path):
+    with open(tmp_path / 'out.jsonl', encoding='utf-8') as f:
+        return sorted(json.loads(line)['source'] for line in f)
+
+
+def test_failed_task_is_recorded_and_batch_continues(tmp_path, monkeypatch):
+    report, checkpoint = run(tmp_path, monkeypatch, broken={'b'})
+
+    assert sorted(checkpoint['completed']) == ['a', 'c', 'd']
+    assert list(checkpoint['failed']) == ['b']
+    assert 'video corrupto b' in report['failed']['b']
+    assert report['frames'] == 6
+    assert output_sources(tmp_path) == ['a', 'a', 'c', 'c', 'd', 'd']
+
+
+def test_resume_retries_only_failed_tasks(tmp_path, monkeypatch):
+    run(tmp_path, monkeypatch, broken={'b'})
+    report, checkpoint = run(tmp_path, monkeypatch)
+
+    assert report == {'frames': 2, 'faces': 2, 'failed': {}}
+    assert sorted(checkpoint['completed']) == ['a', 'b', 'c', 'd']
+    assert checkpoint['failed'] == {}
+    assert output_sources(tmp_path) == ['a', 'a', 'b', 'b', 'c', 'c', 'd', 'd']
+
+
+def test_resume_truncates_lines_after_checkpoint(tmp_path, monkeypatch):
+    run(tmp_path, monkeypatch, broken={'b', 'c', 'd'})
+    # Un corte después de escribir pero antes de guardar el checkpoint
+    with open(tmp_path / 'out.jsonl', 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'source': 'b', 'frame': 0}) + '\n')
+
+    run(tmp_path, monkeypatch)
+    assert output_sources(tmp_path) == ['a', 'a', 'b', 'b', 'c', 'c', 'd', 'd']
+
+
+def test_jsonl_sink_drops_partial_task_on_error(tmp_path):
+    sink = batch.JsonlSink(str(tmp_path / 'out.jsonl'))
+    offset = sink.write({'id': 'a'}, [{'source': 'a'}])
+
+    with pytest.raises(TypeError):
+        sink.write({'id': 'b'}, [{'source': 'b'}, {'source': object()}])
+    assert sink.write({'id': 'c'}, [{'source': 'c'}]) > offset
+    sink.close()
+
+    assert output_sources(tmp_path) == ['a', 'c']
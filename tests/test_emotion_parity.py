@@ -0,0 +1,77 @@
+"""
+Consistencia de los backends de EmotionEngine con ONNX Runtime
+(integración, opcional: RUN_INTEGRATION=1)
+
+No es una garantía de paridad con el modelo original: tests/fixtures/faces
+tiene 16 rostros esquemáticos de 48x48 (boca, cejas y ojos distintos)
+dibujados con OpenCV, no rostros reales, y no hay salidas de Keras
+grabadas. Lo que comprueba es que cada backend disponible da la misma
+emoción principal que ONNX Runtime float32 y probabilidades cercanas
+sobre esas entradas. Necesita el modelo exportado
+(python detector/export_onnx.py), que no está en el repositorio: al
+pedirla sin el modelo falla en vez de saltearse. La paridad sobre
+rostros reales la verifica export_onnx.py con --calibration al exportar.
+La latencia y la memoria se miden con benchmarks/bench_emotion_backends.py.
+"""
+
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('onnxruntime')
+
+from detector.emotion_model import EMOTION_MODEL_PATH, EmotionEngine, preprocess_faces
+from detector.export_onnx import PARITY_TOLERANCE, load_face_images
+
+FACES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'faces')
+INT8_MODEL_PATH = os.path.join(os.path.dirname(EMOTION_MODEL_PATH), 'emotion_int8.onnx')
+
+# Mínimos por precisión: (coincidencia de la emoción principal, diferencia máxima)
+FLOAT32_LIMITS = (1.0, PARITY_TOLERANCE)
+INT8_LIMITS = (0.9, 0.15)
+
+pytestmark = pytest.mark.integration
+
+# Variante → (backend, modelo, límites)
+VARIANTS = {
+    'keras': ('keras', EMOTION_MODEL_PATH, FLOAT32_LIMITS),
+    'opencv': ('opencv', EMOTION_MODEL_PATH, FLOAT32_LIMITS),
+    'onnx-int8': ('onnx', INT8_MODEL_PATH, INT8_LIMITS),
+    'opencv-int8': ('opencv', INT8_MODEL_PATH, INT8_LIMITS),
+}
+
+
+def probabilities(backend: str, model_path: str) -> np.ndarray:
+    faces = load_face_images(FACES_DIR)
+    engine = EmotionEngine(backend=backend, model_path=model_path, threads=1).load()
+    return engine.predict(preprocess_faces(faces))
+
+
+@pytest.fixture(scope='module')
+def reference() -> np.ndarray:
+    if not os.path.exists(EMOTION_MODEL_PATH):
+        pytest.fail(f"Sin {EMOTION_MODEL_PATH} (python detector/export_onnx.py)")
+    return probabilities('onnx', EMOTION_MODEL_PATH)
+
+
+@pytest.mark.parametrize('variant', list(VARIANTS))
+def test_backend_matches_onnx_runtime(variant, reference):
+    backend, model_path, (min_agreement, max_diff) = VARIANTS[variant]
+    if backend == 'keras' and not (importlib.util.find_spec('tensorflow') and importlib.util.find_spec('deepface')):
+        pytest.skip("Sin tensorflow/deepface")
+    if not os.path.exists(model_path):
+        pytest.skip(f"Sin {model_path}")
+
+    try:
+        result = probabilities(backend, model_path)
+    except Exception as e:
+        # El soporte de operadores cuantizados depende de la versión (p. ej. de cv2.dnn)
+        if model_path != INT8_MODEL_PATH:
+            raise
+        pytest.skip(f"{variant} no carga el modelo int8: {str(e).splitlines()[0][:120]}")
+
+    agreement = float((result.argmax(axis=1) == reference.argmax(axis=1)).mean())
+    assert agreement >= min_agreement, f"{variant}: coincidencia {agreement:.0%}"
+    assert float(np.abs(result - reference).max()) <= max_diff
@@ -0,0 +1,147 @@
+"""
+Eventos en vivo sin doble conteo: _id repetidos en el bus y
+reconciliación con MongoDB mientras el escritor tiene pendientes o
+cuando una lectura falla
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from detector.async_database import AsyncEmotionDatabase
+from detector.database import build_emotion_document
+from detector.events import EventBus, RecentIds, event_document
+from api.stats import StatsPublisher, TTLCache
+
+
+def emotion_event(document_id, emotion='Felicidad'):
+    return {'type': 'emotion', 'document': {'_id': document_id, 'emotion': emotion, 'confidence': 0.8}}
+
+
+def test_bus_publishes_each_document_once():
+    bus = EventBus()
+    received = []
+    bus.subscribe(received.append)
+
+    bus.publish(emotion_event('a'))  # insert_emotion
+    bus.publish(emotion_event('a'))  # change stream
+    bus.publish(emotion_event('b'))
+
+    assert [event['document']['_id'] for event in received] == ['a', 'b']
+    assert bus.duplicates == 1
+
+
+def test_event_keeps_camera_source_id():
+    bus = EventBus()
+    received = []
+    bus.subscribe(received.append)
+
+    for source_id in ('sala1', 'sala2'):
+        document = build_emotion_document('Felicidad', 0.9, {'source_id': source_id, 'track_id': 1})
+        bus.publish({'type': 'emotion', 'document': event_document(document)})
+
+    assert [event['document']['metadata']['source_id'] for event in received] == ['sala1', 'sala2']
+
+
+def test_recent_ids_expire_by_age_and_size():
+    ids = RecentIds(ttl=0.05, max_size=100)
+    assert not ids.check('a')
+    assert ids.check('a')
+    time.sleep(0.1)
+    assert not ids.check('a')
+
+    ids = RecentIds(ttl=60, max_size=2)
+    for key in ('a', 'b', 'c'):
+        ids.check(key)
+    assert len(ids) == 2
+    assert not ids.check('a')
+
+
+class FakeDatabase:
+    def __init__(self, count):
+        self.count = count
+
+    async def get_emotion_stats(self, hours=24):
+        return {'emotions': {'Felicidad': {'count': self.count, 'avg_confidence': 0.8}}}
+
+    async def get_recent_emotions(self, limit=50):
+        return []
+
+
+class FakeManager:
+    active_connections = []
+
+
+def test_reconcile_keeps_live_counts_while_writer_has_backlog():
+    backlog = {'pending': True}
+
+    async def scenario():
+        db = FakeDatabase(count=1)
+        publisher = StatsPublisher(db, TTLCache(ttl=0), FakeManager(), backlog=lambda: backlog['pending'])
+        for document_id in ('a', 'b', 'c'):
+            publisher.on_event(emotion_event(document_id))
+
+        # MongoDB solo tiene 1 de 3: no se baja el contador
+        await publisher.reconcile()
+        counts = [publisher._stats_message()['total_detections']]
+
+        # Sin pendientes, MongoDB manda
+        backlog['pending'] = False
+        db.count = 2
+        await publisher.reconcile()
+        counts.append(publisher._stats_message()['total_detections'])
+        await publisher.stop()
+        return counts
+
+    assert asyncio.run(scenario()) == [3, 2]
+
+
+class FailingDatabase(FakeDatabase):
+    fail = False
+
+    async def get_emotion_stats(self, hours=24):
+        if self.fail:
+            raise ConnectionError("MongoDB caído")
+        return await super().get_emotion_stats(hours)
+
+
+def test_failed_read_keeps_live_counters_and_is_not_cached():
+    async def scenario():
+        db = FailingDatabase(count=2)
+        cache = TTLCache(ttl=60)
+        publisher = StatsPublisher(db, cache, FakeManager())
+        await publisher.reconcile()
+        publisher.on_event(emotion_event('c'))
+
+        cache.invalidate()
+        db.fail = True
+        with pytest.raises(ConnectionError):
+            await publisher.reconcile()
+        counts = [publisher._stats_message()['total_detections']]
+        assert ('stats', StatsPublisher.PERIOD_HOURS) not in cache._entries
+
+        # MongoDB vuelve: se reconcilia normalmente
+        db.fail = False
+        db.count = 3
+        await publisher.reconcile()
+        counts.append(publisher._stats_message()['total_detections'])
+        await publisher.stop()
+        return counts
+
+    assert asyncio.run(scenario()) == [3, 3]
+
+
+class UnreachableCollection:
+    def find(self, *args, **kwargs):
+        raise ConnectionError("MongoDB caído")
+
+
+def test_async_reads_raise_instead_of_returning_empty():
+    adb = AsyncEmotionDatabase.__new__(AsyncEmotionDatabase)
+    adb.collection = adb.rollups = UnreachableCollection()
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(adb.get_emotion_stats(hours=24))
+    with pytest.raises(ConnectionError):
+        asyncio.run(adb.get_recent_emotions(limit=10))
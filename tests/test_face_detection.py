@@ -0,0 +1,76 @@
+"""
+FaceDetectionPipeline: detección sobre la imagen reducida, búsqueda en
+la ventana del último rostro y vuelta a coordenadas del frame original.
+Sin cascada: un detector falso encuentra el cuadrado blanco del frame.
+"""
+
+import numpy as np
+
+from detector.face_detection import FaceDetectionPipeline
+
+
+class BrightSquareDetector:
+    """Devuelve el rectángulo de los píxeles blancos y registra cada llamada"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, gray):
+        self.calls.append(gray.shape)
+        ys, xs = np.nonzero(gray > 200)
+        if len(xs) == 0:
+            return []
+        return [(xs.min(), ys.min(), xs.max() - xs.min() + 1, ys.max() - ys.min() + 1)]
+
+
+def frame_with_face(x, y, size=160, shape=(960, 1280)):
+    gray = np.zeros(shape, dtype=np.uint8)
+    gray[y:y+size, x:x+size] = 255
+    return gray
+
+
+def make_pipeline(**options):
+    detector = BrightSquareDetector()
+    settings = dict(detection_width=640, roi_padding=0.5, full_scan_every=5)
+    settings.update(options)
+    return FaceDetectionPipeline(detector, **settings), detector
+
+
+def test_face_in_window_maps_back_to_full_resolution():
+    pipeline, detector = make_pipeline()
+
+    assert pipeline.detect(frame_with_face(400, 300)) == [(400, 300, 160, 160)]
+    assert detector.calls[-1] == (480, 640)  # barrido completo de la imagen reducida
+
+    assert pipeline.detect(frame_with_face(420, 320)) == [(420, 320, 160, 160)]
+    assert detector.calls[-1] == (160, 160)  # solo la ventana alrededor del rostro
+    assert (pipeline.full_scans, pipeline.roi_scans) == (1, 1)
+
+
+def test_face_outside_window_falls_back_to_full_scan():
+    pipeline, detector = make_pipeline()
+    pipeline.detect(frame_with_face(400, 300))
+
+    # El rostro saltó lejos de su ventana: se barre el frame completo
+    assert pipeline.detect(frame_with_face(1000, 700)) == [(1000, 700, 160, 160)]
+    assert detector.calls[-2:] == [(160, 160), (480, 640)]
+    assert (pipeline.full_scans, pipeline.roi_scans) == (2, 0)
+
+
+def test_periodic_full_scan_finds_new_faces():
+    pipeline, detector = make_pipeline(full_scan_every=2)
+    gray = frame_with_face(400, 300)
+
+    pipeline.detect(gray)
+    pipeline.detect(gray)
+    pipeline.detect(gray)
+
+    assert [shape == (480, 640) for shape in detector.calls] == [True, False, True]
+    assert (pipeline.full_scans, pipeline.roi_scans) == (2, 1)
+
+
+def test_native_resolution_below_detection_width():
+    pipeline, detector = make_pipeline()
+
+    assert pipeline.detect(frame_with_face(100, 80, size=60, shape=(480, 640))) == [(100, 80, 60, 60)]
+    assert detector.calls == [(480, 640)]
@@ -0,0 +1,28 @@
+"""
+Interfaz de los detectores de rostros
+"""
+
+import numpy as np
+import pytest
+
+from detector.face_detectors import FaceDetector
+
+
+def test_backend_without_detect_fails_at_instantiation():
+    class Incomplete(FaceDetector):
+        name = 'incompleto'
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_backend_with_detect_is_usable_as_detect_fn():
+    class Fixed(FaceDetector):
+        name = 'fijo'
+
+        def detect(self, gray):
+            height, width = gray.shape[:2]
+            return self._clip([(-10, 5, 60, 60), (0, 0, 5, 5)], width, height)
+
+    detector = Fixed(min_size=20)
+    assert detector(np.zeros((100, 100), dtype=np.uint8)) == [(0, 5, 50, 60)]
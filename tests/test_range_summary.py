@@ -0,0 +1,70 @@
+"""
+Resumen por rango sobre los buckets horarios (mongomock) y validación
+del rango en /api/emotions/range
+"""
+
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+from detector.database import EmotionDatabase, build_emotion_document, rollup_updates, validate_range
+
+
+@pytest.fixture
+def database():
+    db = EmotionDatabase.__new__(EmotionDatabase)
+    db.rollups = mongomock.MongoClient().db.emotions_log_hourly
+    documents = [
+        build_emotion_document('Felicidad', 0.9, timestamp=datetime(2024, 1, 15, 14, 5)),
+        build_emotion_document('Felicidad', 0.8, timestamp=datetime(2024, 1, 15, 14, 40)),
+        build_emotion_document('Tristeza', 0.5, timestamp=datetime(2024, 1, 15, 15, 5)),
+        build_emotion_document('Felicidad', 0.7, timestamp=datetime(2024, 1, 17, 9, 0)),
+    ]
+    db.rollups.bulk_write(rollup_updates(documents), ordered=False)
+    return db
+
+
+def test_day_summary_includes_empty_days(database):
+    summary = database.get_range_summary(datetime(2024, 1, 15), datetime(2024, 1, 18), 'day')
+
+    assert summary == {
+        '2024-01-15': {'total': 3, 'emotions': {'Felicidad': 2, 'Tristeza': 1}},
+        '2024-01-16': {'total': 0, 'emotions': {}},
+        '2024-01-17': {'total': 1, 'emotions': {'Felicidad': 1}},
+    }
+
+
+def test_hour_summary(database):
+    summary = database.get_range_summary(datetime(2024, 1, 15, 13), datetime(2024, 1, 15, 16), 'hour')
+
+    assert summary == {
+        '2024-01-15T13': {'total': 0, 'emotions': {}},
+        '2024-01-15T14': {'total': 2, 'emotions': {'Felicidad': 2}},
+        '2024-01-15T15': {'total': 1, 'emotions': {'Tristeza': 1}},
+    }
+
+
+@pytest.mark.parametrize('start, end, granularity', [
+    (datetime(2024, 1, 16), datetime(2024, 1, 15), 'day'),    # invertido
+    (datetime(2024, 1, 1), datetime(2024, 6, 1), 'hour'),     # demasiado largo por hora
+    (datetime(2020, 1, 1), datetime(2024, 1, 1), 'day'),      # demasiado largo por día
+    (datetime(2024, 1, 1), datetime(2024, 1, 2), 'week'),
+])
+def test_invalid_ranges_are_rejected(start, end, granularity):
+    with pytest.raises(ValueError):
+        validate_range(start, end, granularity)
+
+
+def test_endpoint_rejects_inverted_and_oversized_ranges():
+    os.environ.setdefault('MONGODB_URI', 'mongodb://127.0.0.1:1')
+    from api import main
+
+    inverted = asyncio.run(main.get_range_summary(start='2024-01-16', end='2024-01-15'))
+    oversized = asyncio.run(main.get_range_summary(start='2020-01-01', end='2024-01-01', granularity='hour'))
+
+    assert inverted['success'] is False and 'start' in inverted['error']
+    assert oversized['success'] is False and 'máximo' in oversized['error']
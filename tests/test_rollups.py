@@ -0,0 +1,70 @@
+"""
+Buckets horarios: $inc al insertar, estadísticas y distribución horaria
+desde los buckets, y rebuild_rollups desde las detecciones crudas
+(mongomock)
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+from detector.database import EmotionDatabase, build_emotion_document
+
+
+@pytest.fixture
+def database():
+    client = mongomock.MongoClient()
+    db = EmotionDatabase.__new__(EmotionDatabase)
+    db.collection = client.db.emotions_log
+    db.rollups = client.db.emotions_log_hourly
+    db._flush_listeners = []
+    return db
+
+
+def insert(database, *detections):
+    documents = [build_emotion_document(emotion, confidence, timestamp=timestamp)
+                 for emotion, confidence, timestamp in detections]
+    database._insert_documents(documents)
+    return documents
+
+
+def test_inserts_increment_hourly_buckets(database):
+    insert(database,
+           ('Felicidad', 0.9, datetime(2024, 1, 15, 14, 5)),
+           ('Felicidad', 0.7, datetime(2024, 1, 15, 14, 50)),
+           ('Enojo', 0.6, datetime(2024, 1, 15, 15, 0)))
+
+    bucket = database.rollups.find_one({'_id': '2024-01-15T14'})
+    assert bucket['total'] == 2
+    assert bucket['emotions']['Felicidad']['count'] == 2
+    assert bucket['emotions']['Felicidad']['confidence_sum'] == pytest.approx(1.6)
+    assert database.get_hourly_distribution('2024-01-15') == {14: {'Felicidad': 2}, 15: {'Enojo': 1}}
+
+
+def test_stats_read_buckets_of_the_window(database):
+    now = datetime.now()
+    insert(database,
+           ('Felicidad', 0.9, now),
+           ('Felicidad', 0.5, now - timedelta(hours=2)),
+           ('Tristeza', 0.4, now - timedelta(hours=3)),
+           ('Tristeza', 0.4, now - timedelta(hours=48)))  # fuera de la ventana
+
+    stats = database.get_emotion_stats(hours=24)
+    assert stats['total_detections'] == 3
+    assert stats['dominant_emotion'] == 'Felicidad'
+    assert stats['emotions']['Felicidad'] == {'count': 2, 'avg_confidence': 0.7}
+
+
+def test_rebuild_matches_incremental_rollups(database):
+    insert(database,
+           ('Felicidad', 0.9, datetime(2024, 1, 15, 14, 5)),
+           ('Sorpresa', 0.8, datetime(2024, 1, 15, 14, 6)),
+           ('Felicidad', 0.7, datetime(2024, 1, 16, 9, 0)))
+    incremental = {doc['_id']: (doc['total'], doc['emotions']) for doc in database.rollups.find()}
+
+    database.rollups.delete_many({})
+    assert database.rebuild_rollups() == 2
+    rebuilt = {doc['_id']: (doc['total'], doc['emotions']) for doc in database.rollups.find()}
+    assert rebuilt == incremental
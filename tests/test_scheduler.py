@@ -0,0 +1,89 @@
+"""
+InferenceScheduler con reloj inyectado
+"""
+
+import numpy as np
+
+from detector.scheduler import InferenceScheduler
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+FACE = (10, 10, 40, 40)
+
+
+def still_frame():
+    return np.full((80, 80), 128, dtype=np.uint8)
+
+
+def make_scheduler(clock, **options):
+    settings = dict(min_interval=0.1, max_interval=1.0, budget_ms=300, change_threshold=0.05, clock=clock)
+    settings.update(options)
+    return InferenceScheduler(**settings)
+
+
+def test_inference_longer_than_budget_does_not_stop_scheduling():
+    clock = Clock()
+    scheduler = make_scheduler(clock)
+    gray = still_frame()
+
+    assert scheduler.should_run(gray, [(1, FACE)])
+    scheduler.record(0.4)  # más que todo el presupuesto
+
+    runs = 0
+    for _ in range(20):
+        clock.now += 0.25
+        runs += scheduler.should_run(gray, [(1, FACE)])
+    assert runs >= 4
+    assert scheduler.decisions['max_interval'] >= 4
+
+
+def test_new_face_runs_even_when_budget_is_spent():
+    clock = Clock()
+    scheduler = make_scheduler(clock)
+    gray = still_frame()
+
+    assert scheduler.should_run(gray, [(1, FACE)])
+    scheduler.record(0.29)
+    clock.now += 0.2
+
+    assert scheduler.should_run(gray, [(1, FACE), (2, (40, 40, 30, 30))])
+    assert scheduler.decisions['new_face'] == 2
+
+
+def test_budget_skips_changes_while_window_is_full():
+    clock = Clock()
+    scheduler = make_scheduler(clock)
+    gray = still_frame()
+
+    assert scheduler.should_run(gray, [(1, FACE)])
+    scheduler.record(0.29)
+    clock.now += 0.2
+
+    changed = gray.copy()
+    changed[10:50, 10:50] = 0
+    assert not scheduler.should_run(changed, [(1, FACE)])
+    assert scheduler.decisions['budget'] == 1
+
+    # Vencida la ventana, el cambio se clasifica
+    clock.now += 1.0
+    assert scheduler.should_run(changed, [(1, FACE)])
+
+
+def test_still_face_waits_for_max_interval():
+    clock = Clock()
+    scheduler = make_scheduler(clock, budget_ms=0)
+    gray = still_frame()
+
+    assert scheduler.should_run(gray, [(1, FACE)])
+    clock.now += 0.5
+    assert not scheduler.should_run(gray, [(1, FACE)])
+    assert scheduler.decisions['static'] == 1
+    clock.now += 0.6
+    assert scheduler.should_run(gray, [(1, FACE)])
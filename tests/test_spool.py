@@ -0,0 +1,166 @@
+"""
+Reenvío del spool: rollups solo con lo que MongoDB confirmó, cortes de
+conexión a mitad de un lote y dos procesos compartiendo SPOOL_DIR.
+Sin MongoDB: colecciones falsas en memoria.
+"""
+
+import os
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from detector import spool as spool_module
+from detector.database import UNCONFIRMED_FIELD, EmotionDatabase, build_emotion_document
+from detector.spool import REPLAYED_FIELD, EmotionSpool, PartialInsertError, SpoolReplayer
+
+
+class FakeCollection:
+    """insert_many(ordered=False) con corte de conexión tras `land` documentos"""
+
+    def __init__(self):
+        self.docs = {}
+        self.land = None        # documentos que llegan antes del corte
+        self.find_fails = False
+
+    def insert_many(self, documents, ordered=True):
+        errors = []
+        for i, doc in enumerate(documents):
+            if self.land is not None and self.land <= 0:
+                raise AutoReconnect("conexión cortada")
+            if doc['_id'] in self.docs:
+                errors.append({'index': i, 'code': 11000, 'errmsg': 'duplicate key'})
+                continue
+            self.docs[doc['_id']] = dict(doc)
+            if self.land is not None:
+                self.land -= 1
+        if errors:
+            raise BulkWriteError({'writeErrors': errors})
+
+    def find(self, query, projection=None):
+        if self.find_fails:
+            raise AutoReconnect("sin servidor")
+        return [{'_id': _id} for _id in query['_id']['$in'] if _id in self.docs]
+
+
+class FakeRollups:
+    def __init__(self):
+        self.total = 0
+
+    def bulk_write(self, updates, ordered=True):
+        self.total += sum(update._doc['$inc']['total'] for update in updates)
+
+
+@pytest.fixture
+def database():
+    db = EmotionDatabase.__new__(EmotionDatabase)
+    db.collection = FakeCollection()
+    db.rollups = FakeRollups()
+    db._flush_listeners = []
+    return db
+
+
+@pytest.fixture
+def replayer(tmp_path, database):
+    replayer = SpoolReplayer(EmotionSpool(str(tmp_path)), database._insert_documents, interval=3600)
+    yield replayer
+    replayer.stop()
+
+
+def make_documents(count):
+    return [build_emotion_document('Felicidad', 0.9) for _ in range(count)]
+
+
+def spool_segment(spool, documents):
+    spool.append(documents)
+    spool.close()
+    return spool.closed_segments()[-1]
+
+
+def test_reconnect_after_partial_insert_spools_only_missing(database):
+    documents = make_documents(10)
+    database.collection.land = 4
+    notified = []
+    database.add_flush_listener(notified.extend)
+
+    with pytest.raises(PartialInsertError) as error:
+        database._insert_documents(documents)
+
+    assert [doc['_id'] for doc in error.value.inserted] == [doc['_id'] for doc in documents[:4]]
+    assert [doc['_id'] for doc in error.value.remaining] == [doc['_id'] for doc in documents[4:]]
+    assert database.rollups.total == 4
+    assert len(notified) == 4
+
+    database.collection.land = None
+    database._insert_documents(error.value.remaining)
+    assert database.rollups.total == 10
+
+
+def test_unverifiable_insert_counts_duplicates_on_replay(database, replayer):
+    documents = make_documents(10)
+    database.collection.land = 4
+    database.collection.find_fails = True
+
+    with pytest.raises(AutoReconnect):
+        database._insert_documents(documents)
+    assert database.rollups.total == 0
+    assert all(doc[UNCONFIRMED_FIELD] for doc in documents)
+
+    spool_segment(replayer.spool, documents)
+    database.collection.land = None
+    database.collection.find_fails = False
+
+    assert replayer.replay() == 10
+    assert database.rollups.total == 10
+    assert len(database.collection.docs) == 10
+    assert not any(UNCONFIRMED_FIELD in doc for doc in database.collection.docs.values())
+    assert all(database.collection.docs[doc['_id']].get(REPLAYED_FIELD) for doc in documents[4:])
+    assert replayer.spool.closed_segments() == []
+
+
+def test_confirmed_duplicates_are_not_counted_twice(database):
+    documents = make_documents(5)
+    database._insert_documents(documents[:3])
+
+    assert len(database._insert_documents(documents)) == 2
+    assert database.rollups.total == 5
+
+
+def test_failed_replay_keeps_only_unconfirmed_documents(database, replayer, monkeypatch):
+    monkeypatch.setattr(spool_module, 'REPLAY_CHUNK', 4)
+    documents = make_documents(10)
+    path = spool_segment(replayer.spool, documents)
+    database.collection.land = 6  # primer lote entero y 2 del segundo
+
+    with pytest.raises(PartialInsertError):
+        replayer.replay()
+
+    pending = EmotionSpool.read_segment(path)
+    assert [doc['_id'] for doc in pending] == [doc['_id'] for doc in documents[6:]]
+    assert database.rollups.total == 6
+
+    database.collection.land = None
+    assert replayer.replay() == 4
+    assert database.rollups.total == 10
+
+
+def test_replay_skipped_while_another_process_holds_lock(database, replayer):
+    path = spool_segment(replayer.spool, make_documents(3))
+    other = spool_module.ReplayLock(replayer.spool.directory)
+    assert other.acquire()
+    try:
+        assert replayer.replay() == 0
+        assert os.path.exists(path)
+    finally:
+        other.release()
+
+    assert replayer.replay() == 3
+    assert database.rollups.total == 3
+
+
+def test_missing_segment_counts_as_replayed(database, replayer, monkeypatch):
+    path = spool_segment(replayer.spool, make_documents(3))
+    os.remove(path)  # lo reenvió otro proceso
+    monkeypatch.setattr(replayer.spool, 'closed_segments', lambda: [path])
+
+    assert replayer.replay() == 0
+    EmotionSpool.remove_segment(path)
@@ -0,0 +1,118 @@
+"""
+Pruebas de StartupState: reintentos de componentes que fallan al arrancar
+"""
+
+import asyncio
+import os
+
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+from api.startup import ERROR, READY, StartupState
+from detector import database
+
+
+def test_failed_component_is_retried_with_backoff():
+    async def run():
+        state = StartupState('database', retry_delay=0.01, max_delay=0.02)
+        attempts = []
+
+        async def connect():
+            attempts.append(asyncio.get_running_loop().time())
+            if len(attempts) < 4:
+                raise ConnectionError("sin conexión")
+
+        state.start('database', connect, retry=True)
+        assert await state.wait('database') is False
+        assert state.stats()['database']['status'] == ERROR
+
+        for _ in range(100):
+            if state.is_ready('database'):
+                break
+            await asyncio.sleep(0.01)
+        await state.cancel()
+        return state, attempts
+
+    state, attempts = asyncio.run(run())
+    info = state.stats()['database']
+    assert info['status'] == READY
+    assert info['attempts'] == 4
+    assert 'error' not in info
+    # Backoff creciente con tope
+    gaps = [b - a for a, b in zip(attempts, attempts[1:])]
+    assert gaps[0] >= 0.01 and gaps[1] >= 0.02 and gaps[2] >= 0.02
+
+
+def test_start_from_error_without_retry_runs_again():
+    async def run():
+        state = StartupState('model')
+        calls = []
+
+        async def load():
+            calls.append(1)
+            if len(calls) == 1:
+                raise FileNotFoundError("modelo")
+
+        state.start('model', load)
+        assert await state.wait('model') is False
+        state.start('model', load)
+        assert await state.wait('model') is True
+        # Ya listo: no se vuelve a cargar
+        state.start('model', load)
+        await asyncio.sleep(0)
+        return calls
+
+    assert len(asyncio.run(run())) == 2
+
+
+def test_start_is_ignored_while_loading():
+    async def run():
+        state = StartupState('writer')
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+
+        state.start('writer', load)
+        state.start('writer', load)
+        await state.wait('writer')
+        return calls
+
+    assert len(asyncio.run(run())) == 1
+
+
+class UnreachableClient:
+    """MongoClient cuyo ping falla; recuerda si se cerró"""
+    created = []
+
+    def __init__(self, *args, **kwargs):
+        self.closed = False
+        self.admin = self
+        UnreachableClient.created.append(self)
+
+    def command(self, name):
+        raise ServerSelectionTimeoutError("sin servidor")
+
+    def close(self):
+        self.closed = True
+
+
+def test_failed_connection_attempt_closes_its_client(monkeypatch):
+    monkeypatch.setenv('MONGODB_URI', 'mongodb://127.0.0.1:1')
+    monkeypatch.setattr(database, 'MongoClient', UnreachableClient)
+    UnreachableClient.created.clear()
+
+    for _ in range(3):
+        with pytest.raises(ServerSelectionTimeoutError):
+            database.EmotionDatabase()
+
+    assert len(UnreachableClient.created) == 3
+    assert all(client.closed for client in UnreachableClient.created)
+
+
+def test_api_import_does_not_create_database_clients():
+    os.environ.setdefault('MONGODB_URI', 'mongodb://127.0.0.1:1')
+    from api import main
+
+    assert main.adb is None and main.db is None
@@ -0,0 +1,93 @@
+"""
+TTLCache: una petición cancelada no cancela a las demás que esperan la
+misma clave, un error llega a todas y el caché tiene un tamaño acotado
+"""
+
+import asyncio
+import time
+
+from api.stats import TTLCache
+
+
+def test_cancelled_owner_does_not_cancel_waiters():
+    async def scenario():
+        cache = TTLCache(ttl=60)
+        started = asyncio.Event()
+        release = asyncio.Event()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            started.set()
+            await release.wait()
+            return 42
+
+        owner = asyncio.create_task(cache.get('stats', slow))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get('stats', slow))
+        await asyncio.sleep(0)
+
+        owner.cancel()  # el cliente que lanzó la consulta se desconecta
+        await asyncio.sleep(0)
+        release.set()
+
+        value = await asyncio.wait_for(waiter, timeout=1)
+        assert owner.cancelled()
+        assert not cache._inflight
+        assert await cache.get('stats', slow) == 42  # ya en caché
+        return value, len(calls)
+
+    assert asyncio.run(scenario()) == (42, 1)
+
+
+def test_entries_are_bounded():
+    async def scenario():
+        cache = TTLCache(ttl=60, max_entries=3)
+
+        async def value():
+            return 1
+
+        for hours in range(10):
+            await cache.get(('stats', hours), value)
+        return list(cache._entries)
+
+    assert asyncio.run(scenario()) == [('stats', 7), ('stats', 8), ('stats', 9)]
+
+
+def test_expired_entries_are_pruned_first():
+    async def scenario():
+        cache = TTLCache(ttl=60, max_entries=2)
+
+        async def value():
+            return 1
+
+        await cache.get('a', value)
+        await cache.get('b', value)
+        expires, data = cache._entries['a']
+        cache._entries['a'] = (time.monotonic() - 1, data)  # 'a' venció
+        await cache.get('c', value)
+        return sorted(cache._entries)
+
+    assert asyncio.run(scenario()) == ['b', 'c']
+
+
+def test_failed_compute_propagates_to_waiters():
+    async def scenario():
+        cache = TTLCache(ttl=60)
+        release = asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise RuntimeError("MongoDB caído")
+
+        owner = asyncio.create_task(cache.get('stats', failing))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get('stats', failing))
+        await asyncio.sleep(0)
+        release.set()
+
+        results = await asyncio.gather(owner, waiter, return_exceptions=True)
+        assert not cache._inflight
+        return [type(result) for result in results]
+
+    assert asyncio.run(scenario()) == [RuntimeError, RuntimeError]
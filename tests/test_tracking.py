@@ -0,0 +1,67 @@
+"""
+Pruebas de FaceTracker: los rectángulos siempre quedan dentro del frame
+"""
+
+import numpy as np
+
+from detector import tracking
+from detector.emotion_model import preprocess_faces
+from detector.tracking import FaceTracker, clip_box
+
+
+class DriftingTracker:
+    """Tracker de OpenCV falso que devuelve los rectángulos indicados"""
+
+    def __init__(self, boxes):
+        self.boxes = list(boxes)
+
+    def init(self, image, box):
+        pass
+
+    def update(self, image):
+        return True, self.boxes.pop(0)
+
+
+def make_tracker(monkeypatch, detections, followed):
+    monkeypatch.setattr(tracking, '_create_opencv_tracker', lambda name: DriftingTracker(followed))
+    return FaceTracker(lambda gray: detections, detect_every=10, tracker_type='kcf', min_score=0.5)
+
+
+def test_clip_box():
+    assert clip_box((-10, -5, 50, 40), 100, 80) == (0, 0, 40, 35)
+    assert clip_box((90, 70, 30, 30), 100, 80) == (90, 70, 10, 10)
+    assert clip_box((120, 10, 20, 20), 100, 80) is None
+    assert clip_box((-30, 10, 20, 20), 100, 80) is None
+
+
+def test_followed_boxes_are_clipped(monkeypatch):
+    gray = np.zeros((120, 160), dtype=np.uint8)
+    tracker = make_tracker(monkeypatch, [(10, 10, 40, 40)], [(-15, -8, 40, 40), (140, 100, 40, 40)])
+
+    tracker.update(gray)
+    for _ in range(2):
+        tracks = tracker.update(gray)
+        (_, (x, y, w, h)), = tracks
+        assert x >= 0 and y >= 0 and x + w <= 160 and y + h <= 120 and w > 0 and h > 0
+        # Los recortes llegan al modelo sin errores
+        preprocess_faces([gray[y:y+h, x:x+w] for _, (x, y, w, h) in tracks])
+
+
+def test_box_leaving_the_frame_forces_detection(monkeypatch):
+    gray = np.zeros((120, 160), dtype=np.uint8)
+    tracker = make_tracker(monkeypatch, [(10, 10, 40, 40)], [(200, 10, 40, 40)])
+
+    tracker.update(gray)
+    tracker.update(gray)
+    assert tracker.tracks[0].score == 0.0
+    assert tracker.tracks[0].box == (10, 10, 40, 40)
+
+    tracker.update(gray)
+    assert tracker.detections == 2
+
+
+def test_detections_are_clipped_and_empty_ones_dropped(monkeypatch):
+    gray = np.zeros((120, 160), dtype=np.uint8)
+    tracker = make_tracker(monkeypatch, [(-5, 100, 30, 30), (300, 10, 20, 20)], [])
+
+    assert [box for _, box in tracker.update(gray)] == [(0, 100, 25, 20)]
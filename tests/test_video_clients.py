@@ -0,0 +1,157 @@
+"""
+Clientes de /ws/video: niveles que se codifican, slot de un frame con
+descarte de los viejos y cajas de rostros escaladas a la resolución
+que recibe cada cliente
+"""
+
+import asyncio
+import time
+
+from api.video_clients import QUALITY_TIERS, EncodedFrame, VideoConnectionManager, VideoSubscriber, scale_emotion
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+
+def encoded(*tiers):
+    return {index: EncodedFrame(QUALITY_TIERS[index].name.encode(), QUALITY_TIERS[index].size)
+            for index in tiers}
+
+
+def emotion_with_box(box, frame_size=(1280, 960)):
+    face = {'face_index': 0, 'track_id': 1, 'box': box, 'emotion': 'Felicidad', 'confidence': 0.9}
+    return {'emotion': 'Felicidad', 'confidence': 0.9, 'faces': [face], 'frame_size': list(frame_size)}
+
+
+def manager_with(*tiers):
+    manager = VideoConnectionManager()
+    for tier in tiers:
+        subscriber = VideoSubscriber(FakeWebSocket(), tier=tier, adaptive=False)
+        manager.subscribers[subscriber.websocket] = subscriber
+    return manager
+
+
+def test_only_tiers_due_a_frame_are_encoded():
+    manager = manager_with(0, 3)
+    high, minimal = manager.subscribers.values()
+    now = time.monotonic()
+    # Hace 0.1 s: le toca a high (30 FPS), todavía no a minimal (6 FPS)
+    high._last_send = minimal._last_send = now - 0.1
+    assert manager.wanted_tiers() == {0}
+
+    minimal._last_send = now - 1
+    assert manager.wanted_tiers() == {0, 3}
+
+    high._sending = True  # envío en curso: recibe el siguiente al terminar
+    assert manager.wanted_tiers() == {3}
+
+
+def test_publish_fills_slots_of_due_clients_and_emotion_for_all():
+    manager = manager_with(0, 3)
+    high, minimal = manager.subscribers.values()
+    minimal._last_send = time.monotonic()
+
+    emotion = emotion_with_box([0, 0, 10, 10])
+    manager.publish(encoded(0), emotion)
+
+    assert high._frames is not None and minimal._frames is None
+    assert high._emotion is emotion and minimal._emotion is emotion
+
+
+def test_slot_keeps_latest_frame_and_counts_drops():
+    subscriber = VideoSubscriber(FakeWebSocket(), tier=0, adaptive=False)
+    first, second = encoded(0), encoded(0)
+    emotion = emotion_with_box([0, 0, 10, 10])
+
+    subscriber.offer(first, emotion)
+    subscriber.offer(second)
+
+    assert subscriber._frames is second
+    assert subscriber._emotion is emotion  # la emoción no se pierde con el frame
+    assert subscriber.dropped == 1
+
+
+def test_scale_emotion_to_tier_resolution():
+    emotion = emotion_with_box([640, 480, 128, 96])
+
+    scaled = scale_emotion(emotion, QUALITY_TIERS[3].size)
+
+    assert scaled['faces'][0]['box'] == [160, 120, 32, 24]
+    assert scaled['frame_size'] == [320, 240]
+    assert emotion['faces'][0]['box'] == [640, 480, 128, 96]  # el original no cambia
+    assert scale_emotion(None, (320, 240)) is None
+
+
+def send_one(subscriber, frames, emotion):
+    async def scenario():
+        subscriber.start()
+        subscriber.offer(frames, emotion)
+        for _ in range(10):
+            await asyncio.sleep(0)
+        subscriber.stop()
+        return subscriber.websocket.sent
+
+    return asyncio.run(scenario())
+
+
+def test_each_client_gets_boxes_for_the_frame_it_receives():
+    emotion = emotion_with_box([640, 480, 128, 96])
+
+    low = VideoSubscriber(FakeWebSocket(), binary=True, tier=2, adaptive=False)
+    message, jpeg = send_one(low, encoded(0, 2), emotion)
+    assert jpeg == b'low'
+    assert message['emotion']['faces'][0]['box'] == [240, 180, 48, 36]
+
+    # Cambió de nivel después de codificar: cajas del JPEG que se envía
+    legacy = VideoSubscriber(FakeWebSocket(), binary=False, tier=3, adaptive=False)
+    (message,) = send_one(legacy, encoded(0), emotion)
+    assert message['frame'] == b'high'.hex()
+    assert message['emotion']['frame_size'] == [640, 480]
+    assert message['emotion']['faces'][0]['box'] == [320, 240, 64, 48]
+
+
+class FakeScheduler:
+    def record(self, duration):
+        pass
+
+
+class FakeDatabase:
+    def insert_emotion(self, emotion, confidence, metadata):
+        pass
+
+
+class FakeAlerts:
+    def should_alert(self, emotion):
+        return False
+
+
+def test_producer_sends_native_boxes_with_frame_size():
+    from detector.capture import VideoSource
+    from api.stream import VideoStreamProducer
+
+    producer = VideoStreamProducer.__new__(VideoStreamProducer)
+    producer.scheduler, producer.db, producer.alerts = FakeScheduler(), FakeDatabase(), FakeAlerts()
+    producer.source = VideoSource('cam0', 0)
+    producer._last_emotions, producer._session_id = {}, 'test'
+
+    async def scenario():
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(([('Felicidad', 0.9, {})], 0.01))
+        await producer._handle_inference(future, [(1, (640, 480, 128, 96))], (1280, 960))
+        return producer._pending_emotion
+
+    emotion = asyncio.run(scenario())
+    assert emotion['frame_size'] == [1280, 960]
+    assert emotion['faces'][0]['box'] == [640, 480, 128, 96]
+    assert scale_emotion(emotion, QUALITY_TIERS[0].size)['faces'][0]['box'] == [320, 240, 64, 48]
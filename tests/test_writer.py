@@ -0,0 +1,65 @@
+"""
+BufferedWriter.flush: nunca se queda esperando a un hilo escritor que
+ya no corre ni pasa del timeout pedido
+"""
+
+import threading
+import time
+
+import pytest
+
+from detector.database import BufferedWriter
+
+
+def test_flush_writes_pending_documents():
+    written = []
+    writer = BufferedWriter(lambda batch: written.extend(batch) or batch, flush_interval=60)
+    writer.put({'n': 1})
+    writer.put({'n': 2})
+
+    assert writer.flush(timeout=5)
+    assert written == [{'n': 1}, {'n': 2}]
+    writer.close()
+
+
+def test_flush_after_close_returns_immediately():
+    writer = BufferedWriter(lambda batch: batch)
+    writer.close()
+
+    started = time.monotonic()
+    assert not writer.flush()
+    assert time.monotonic() - started < 0.1
+
+
+def test_flush_honours_timeout_while_writer_is_stuck():
+    gate = threading.Event()
+    writer = BufferedWriter(lambda batch: gate.wait() and batch, batch_size=1, max_queue=1)
+    writer.put({'n': 1})
+    writer.put({'n': 2})  # llena la cola mientras el primero está atascado
+
+    started = time.monotonic()
+    assert not writer.flush(timeout=0.3)
+    assert time.monotonic() - started < 1.0
+
+    gate.set()
+    writer.close()
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_flush_without_timeout_returns_when_writer_dies():
+    gate = threading.Event()
+
+    def write(batch):
+        gate.wait()
+        raise SystemExit  # termina el hilo sin pasar por on_error
+
+    writer = BufferedWriter(write, batch_size=1)
+    writer.put({'n': 1})
+    result = []
+    flusher = threading.Thread(target=lambda: result.append(writer.flush()))
+    flusher.start()
+
+    gate.set()
+    flusher.join(5)
+    assert not flusher.is_alive()
+    assert result == [False]